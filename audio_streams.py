@@ -0,0 +1,213 @@
+"""
+Audio input for the Speech SDK's pull streams.
+
+`AudioReaderCallback` fills the buffer the SDK passes to `read` in place with `readinto`, so
+a pull allocates nothing and copies the audio once. Sources are local files, HTTP(S) URLs
+(including blob SAS URLs) or any object with `readinto`. With `readahead` blocks a
+background thread keeps reading ahead into a fixed set of reusable buffers, which hides the
+latency of slow storage from the SDK's callback thread.
+
+`pcm_audio_config` is the alternative to the SDK's compressed input, which needs GStreamer
+and decodes inside every session: the audio is decoded once with pydub/ffmpeg (any format
+ffmpeg reads) to 16 kHz mono PCM, optionally stripped of silence, and written into a
+`PushAudioInputStream` in large frame-aligned blocks as fast as the SDK accepts them.
+"""
+import logging
+import os
+import queue
+import threading
+import requests
+import azure.cognitiveservices.speech as speechsdk
+import preprocess
+import vad
+from pydub import AudioSegment
+
+# blocks read ahead from URLs unless READAHEAD_BLOCKS says otherwise; local files are read directly
+DEFAULT_URL_READAHEAD = 4
+
+
+class _HttpSource:
+    def __init__(self, url, session=None, timeout=60):
+        self._response = (session or requests).get(url, stream=True, timeout=timeout)
+        self._response.raise_for_status()
+
+    def readinto(self, buffer):
+        return self._response.raw.readinto(buffer)
+
+    def close(self):
+        self._response.close()
+
+
+def open_source(source, session=None):
+    """
+    Open `source` (a path, an http(s) URL or an object with `readinto`) for `readinto` calls.
+    """
+    if not isinstance(source, str):
+        return source
+    if source.startswith(("http://", "https://")):
+        return _HttpSource(source, session)
+    # unbuffered, so readinto goes straight from the OS into the caller's buffer
+    return open(source, "rb", buffering=0)
+
+
+def _read_full(source, view):
+    filled = 0
+    while filled < len(view):
+        count = source.readinto(view[filled:])
+        if not count:
+            break
+        filled += count
+    return filled
+
+
+class _ReadAhead:
+    """
+    Reads `source` on a background thread into `blocks` reusable buffers of `block_size`.
+    """
+
+    def __init__(self, source, blocks, block_size):
+        self._source = source
+        self._free = queue.Queue()
+        self._filled = queue.Queue()
+        for _ in range(blocks):
+            self._free.put(memoryview(bytearray(block_size)))
+        self._view = None
+        self._position = 0
+        self._end = 0
+        self._eof = False
+        self._thread = threading.Thread(target=self._fill, name="readahead", daemon=True)
+        self._thread.start()
+
+    def _fill(self):
+        try:
+            while True:
+                view = self._free.get()
+                if view is None:
+                    return
+                count = _read_full(self._source, view)
+                self._filled.put((view, count))
+                if count == 0:
+                    return
+        except Exception as ex:
+            self._filled.put(ex)
+
+    def readinto(self, buffer):
+        if self._eof:
+            return 0
+        if self._position >= self._end:
+            if self._view is not None:
+                self._free.put(self._view)
+            item = self._filled.get()
+            if isinstance(item, Exception):
+                raise item
+            self._view, self._end = item
+            self._position = 0
+            if self._end == 0:
+                self._eof = True
+                return 0
+
+        count = min(buffer.nbytes, self._end - self._position)
+        buffer[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def close(self):
+        # wakes the reader thread if it waits for a free buffer
+        self._free.put(None)
+
+
+class AudioReaderCallback(speechsdk.audio.PullAudioInputStreamCallback):
+    """
+    Pull-stream callback reading `source` straight into the SDK's buffer; see the module
+    docstring. `readahead` is the number of `block_size` blocks to prefetch, by default
+    READAHEAD_BLOCKS, or DEFAULT_URL_READAHEAD for URLs and none for local files.
+    """
+
+    def __init__(self, source, readahead=None, block_size=256 * 1024, session=None):
+        super().__init__()
+        if readahead is None:
+            is_url = isinstance(source, str) and source.startswith(("http://", "https://"))
+            # READAHEAD_BLOCKS= as in .env.template means the default
+            readahead = int(os.getenv("READAHEAD_BLOCKS") or (DEFAULT_URL_READAHEAD if is_url else 0))
+        self._source = open_source(source, session)
+        self._reader = _ReadAhead(self._source, readahead, block_size) if readahead else self._source
+
+    def read(self, buffer: memoryview) -> int:
+        try:
+            return self._reader.readinto(buffer) or 0
+        except Exception as ex:
+            logging.info('Exception in `read`: {}'.format(ex))
+            raise
+
+    def close(self) -> None:
+        logging.info('closing audio source')
+        try:
+            if self._reader is not self._source:
+                self._reader.close()
+            self._source.close()
+        except Exception as ex:
+            logging.info('Exception in `close`: {}'.format(ex))
+            raise
+
+
+def pcm_format():
+    return speechsdk.audio.AudioStreamFormat(samples_per_second=preprocess.SAMPLE_RATE, bits_per_sample=16,
+                                             channels=1)
+
+
+def decode_pcm(source, strip_silence=False):
+    """
+    Decode `source` (a path or file-like object in any format ffmpeg reads) to 16 kHz mono
+    16-bit audio. With `strip_silence` the non-speech spans are cut out. Returns the segment and
+    the `vad.OffsetMap` of the cut, or None.
+    """
+    segment = preprocess.downmix(AudioSegment.from_file(source)).set_sample_width(2)
+    if strip_silence:
+        return vad.trim(segment)
+    return segment, None
+
+
+class PcmPushFeeder:
+    """
+    Writes the raw data of a 16 kHz mono 16-bit `segment` into `stream` on a background
+    thread, `block_ms` at a time, and closes the stream at the end.
+    """
+
+    def __init__(self, segment, stream, block_ms=1000):
+        self.segment = segment
+        self.stream = stream
+        # whole sample frames only
+        self.block_bytes = max(1, segment.frame_rate * block_ms // 1000) * segment.frame_width
+        self._thread = threading.Thread(target=self._feed, name="pcm-feeder", daemon=True)
+
+    def _feed(self):
+        data = self.segment.raw_data
+        try:
+            for offset in range(0, len(data), self.block_bytes):
+                self.stream.write(data[offset:offset + self.block_bytes])
+        except Exception as ex:
+            logging.info('Exception in `write`: {}'.format(ex))
+        finally:
+            self.stream.close()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+
+def pcm_audio_config(source, strip_silence=False, block_ms=1000):
+    """
+    Decode `source` once and return an `AudioConfig` fed from a push stream of its PCM.
+    """
+    segment, _ = decode_pcm(source, strip_silence)
+    return segment_audio_config(segment, block_ms)
+
+
+def segment_audio_config(segment, block_ms=1000):
+    """
+    Return an `AudioConfig` fed from a push stream of an already decoded `AudioSegment`.
+    """
+    segment = preprocess.downmix(segment).set_sample_width(2)
+    stream = speechsdk.audio.PushAudioInputStream(stream_format=pcm_format())
+    PcmPushFeeder(segment, stream, block_ms).start()
+    return speechsdk.audio.AudioConfig(stream=stream)
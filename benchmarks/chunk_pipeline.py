@@ -0,0 +1,198 @@
+"""
+Reproducible benchmark of the chunking and encoding stages of `cli_multiproc` on synthetic
+audio, so no private sample files are needed.
+
+The audio is speech-like (voiced harmonics under a syllable-rate envelope over a low noise
+floor) with a seeded pattern of pauses: `short` pauses stay under the 2 s silence threshold of
+`split_on_silence`, `long` pauses all exceed it and `mixed` draws from both. For every length
+and pattern the suite times MP3 decode, silence detection, each chunker and chunk export with
+both `process_chunk` (`AudioSegment.export`) and `encode_segment` (the `EncoderPool` path),
+and records the peak traced memory of every stage.
+
+Results are written to `benchmarks/results/<label>.json`; `--compare` prints the ratio of
+every stage against an earlier result file and flags regressions.
+
+    python benchmarks/chunk_pipeline.py --minutes 1 10 60 --patterns mixed long --label main
+    python benchmarks/chunk_pipeline.py --minutes 1 10 60 --compare benchmarks/results/main.json
+    python benchmarks/chunk_pipeline.py --minutes 480 --export-limit 50 --no-memory
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import chunk_worker  # noqa: E402
+import chunking  # noqa: E402
+import vad  # noqa: E402
+from pydub import AudioSegment  # noqa: E402
+from pydub.silence import detect_nonsilent, split_on_silence  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# pause length ranges in seconds for each silence pattern
+PAUSES = {
+    "short": [(0.2, 1.2)],
+    "long": [(2.5, 6.0)],
+    "mixed": [(0.2, 1.2), (0.2, 1.2), (2.5, 6.0)],
+}
+
+
+def synthesize(minutes, pattern="mixed", frame_rate=16000, seed=0, block_seconds=60):
+    """
+    Generate `minutes` of speech-like 16-bit mono audio with the pauses of `pattern`.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60 * frame_rate)
+    samples = np.empty(total, dtype=np.int16)
+    position = 0
+    while position < total:
+        # an utterance followed by a pause
+        speech_len = int(rng.lognormal(np.log(3.0), 0.5) * frame_rate)
+        low, high = PAUSES[pattern][rng.integers(len(PAUSES[pattern]))]
+        pause_len = int(rng.uniform(low, high) * frame_rate)
+
+        for start in range(0, speech_len, block_seconds * frame_rate):
+            length = min(block_seconds * frame_rate, speech_len - start, total - position)
+            if length <= 0:
+                break
+            t = np.arange(length) / frame_rate
+            f0 = rng.uniform(100, 250)
+            voiced = sum(np.sin(2 * np.pi * f0 * k * t + rng.uniform(0, np.pi)) / k for k in range(1, 6))
+            envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(3, 6) * t) ** 2
+            signal = 0.1 * voiced * envelope + rng.normal(0, 0.003, length)
+            samples[position:position + length] = np.clip(signal * 32767, -32768, 32767)
+            position += length
+
+        length = min(pause_len, total - position)
+        samples[position:position + length] = rng.normal(0, 0.0005, length) * 32767
+        position += length
+
+    return AudioSegment(samples.tobytes(), frame_rate=frame_rate, sample_width=2, channels=1)
+
+
+def measure(fn, memory=True):
+    """
+    Run `fn()` and return (result, seconds, peak traced MiB or None). Memory is traced in a
+    second run, since tracing slows the stage down.
+    """
+    gc.collect()
+    start_time = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start_time
+    peak = None
+    if memory:
+        del result
+        gc.collect()
+        tracemalloc.start()
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def export_chunks(chunks, encode):
+    return sum(len(encode(chunk)) for chunk in chunks)
+
+
+def run_case(minutes, pattern, args):
+    audio = synthesize(minutes, pattern, seed=args.seed)
+    rows = []
+
+    def record(stage, fn, **extra):
+        result, seconds, peak = measure(fn, memory=not args.no_memory)
+        rows.append(dict(minutes=minutes, pattern=pattern, stage=stage, seconds=round(seconds, 4),
+                         peak_mib=round(peak, 2) if peak is not None else None, **extra))
+        print(f"{minutes:>6g} min {pattern:<6} {stage:<18} {seconds:>9.3f}s"
+              + (f" {peak:>9.1f} MiB" if peak is not None else ""))
+        return result
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "source.mp3")
+        audio.export(source, format="mp3", bitrate="64k")
+        decoded = record("decode", lambda: AudioSegment.from_mp3(source))
+        del decoded
+
+    record("detect_nonsilent", lambda: detect_nonsilent(audio, min_silence_len=2000, silence_thresh=-32))
+    chunks = record("split_on_silence", lambda: split_on_silence(audio, min_silence_len=2000, silence_thresh=-32))
+    rows[-1]["chunks"] = len(chunks)
+    windows = record("fixed_windows", lambda: chunking.fixed_windows(audio))
+    rows[-1]["chunks"] = len(windows)
+    spans = record("planned", lambda: chunking.ChunkPlanner(audio).plan(target_ms=60000))
+    rows[-1]["chunks"] = len(spans)
+    record("vad_speech_spans", lambda: vad.speech_spans(audio))
+
+    exported = chunks[:args.export_limit] if args.export_limit else chunks
+    seconds_of_audio = sum(len(chunk) for chunk in exported) / 1000
+    record("process_chunk", lambda: export_chunks(
+        exported, lambda chunk: chunk_worker.process_chunk((0, chunk, False)).getbuffer().nbytes),
+        chunks=len(exported), audio_seconds=seconds_of_audio)
+    record("encode_segment", lambda: export_chunks(exported, chunk_worker.encode_segment),
+           chunks=len(exported), audio_seconds=seconds_of_audio)
+    return rows
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(rows, baseline_path, threshold):
+    with open(baseline_path, encoding="utf8") as f:
+        baseline = {(row["minutes"], row["pattern"], row["stage"]): row for row in json.load(f)["rows"]}
+
+    print(f"\nCompared with {baseline_path} (ratio > {threshold} marked)")
+    regressions = 0
+    for row in rows:
+        before = baseline.get((row["minutes"], row["pattern"], row["stage"]))
+        if not before or not before["seconds"]:
+            continue
+        ratio = row["seconds"] / before["seconds"]
+        flag = " REGRESSION" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"{row['minutes']:>6g} min {row['pattern']:<6} {row['stage']:<18} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 10, 60])
+    parser.add_argument("--patterns", nargs="+", choices=list(PAUSES), default=["mixed"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--export-limit", type=int, help="export only the first N chunks of every case")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced memory runs")
+    parser.add_argument("--label", help="result file name, the git revision by default")
+    parser.add_argument("--compare", help="earlier result file to compare with")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+
+    chunk_worker.init_worker()
+    rows = []
+    for minutes in args.minutes:
+        for pattern in args.patterns:
+            rows.extend(run_case(minutes, pattern, args))
+
+    revision = git_revision()
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{args.label or revision or int(time.time())}.json")
+    with open(path, "w", encoding="utf8") as f:
+        json.dump({"revision": revision, "python": platform.python_version(), "platform": platform.platform(),
+                   "cpu_count": os.cpu_count(), "time": time.time(), "args": vars(args), "rows": rows}, f, indent=2)
+    print(f"Results written to {path}")
+
+    if args.compare and compare(rows, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Chunk encoding benchmark: `AudioSegment.export` per chunk (a fresh ffmpeg process and temp
+files for every export) against `chunk_worker.EncoderPool` (long-lived workers, PCM in and MP3
+out over pipes).
+
+    python benchmarks/encode.py --chunks 200 --chunk-seconds 5 --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import chunk_worker  # noqa: E402
+from chunk_worker import EncoderPool  # noqa: E402
+from pydub.generators import WhiteNoise, Sine  # noqa: E402
+
+
+def make_chunks(count, seconds):
+    # a tone over a little noise, so the encoder has some real work to do
+    tone = Sine(220).to_audio_segment(duration=seconds * 1000, volume=-20)
+    noise = WhiteNoise().to_audio_segment(duration=seconds * 1000, volume=-40)
+    chunk = tone.overlay(noise).set_channels(1).set_frame_rate(44100)
+    return [chunk] * count
+
+
+def export_per_chunk(chunks, workers):
+    with ProcessPoolExecutor(max_workers=workers, initializer=chunk_worker.init_worker) as executor:
+        return [buffer.getbuffer().nbytes for buffer in
+                executor.map(chunk_worker.process_chunk, [(i, chunk, False) for i, chunk in enumerate(chunks)])]
+
+
+def encoder_pool(chunks, workers):
+    with EncoderPool(max_workers=workers) as encoder:
+        return [buffer.getbuffer().nbytes for buffer in encoder.map(chunks)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100)
+    parser.add_argument("--chunk-seconds", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks, args.chunk_seconds)
+    backend = "lameenc" if chunk_worker.lameenc is not None else "ffmpeg pipe"
+
+    timings = {}
+    for name, run in (("export", export_per_chunk), (f"pool/{backend}", encoder_pool)):
+        start_time = time.perf_counter()
+        sizes = run(chunks, args.workers)
+        timings[name] = time.perf_counter() - start_time
+        print(f"{name:>20}: {timings[name]:.2f} s, {args.chunks / timings[name]:.1f} chunks/s, "
+              f"{sum(sizes) / 1024:.0f} KiB encoded")
+
+    export_time, pool_time = timings.values()
+    print(f"speed-up: {export_time / pool_time:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
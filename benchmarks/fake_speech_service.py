@@ -0,0 +1,359 @@
+"""
+Local stand-in for the Speech-to-Text v3.1 batch transcription endpoints used by `speech.py`,
+so the client and the pipeline can be exercised without Azure.
+
+Transcriptions move from NotStarted to Running to Succeeded (or Failed) on a simulated clock:
+each job waits an exponentially distributed queueing delay, then runs for a jittered time.
+Creates beyond the concurrency quota, and a configurable share of all requests, are answered
+with 429. Listings are paged with `@nextLink`, and result files are served from the server
+itself. PUT requests under `/blob/` are accepted as blob uploads, so a connection string with
+`BlobEndpoint=<url>/blob/<account>` lets `cli_multiproc` upload its chunks here.
+
+    python benchmarks/fake_speech_service.py --port 8099 --queue-delay 2 --run-seconds 3
+    SPEECH_API_HOST=http://127.0.0.1:8099/speechtotext/v3.1 python cli_s2t_console.py
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+API_PATH = "/speechtotext/v3.1"
+
+
+def _timestamp(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FakeJob:
+    """
+    A transcription and its simulated timeline.
+    """
+
+    def __init__(self, definition, queue_seconds, run_seconds, fails):
+        self.id = str(uuid.uuid4())
+        self.definition = definition
+        self.created = time.time()
+        self.started = self.created + queue_seconds
+        self.finished = self.started + run_seconds
+        self.fails = fails
+
+    def status(self, now=None):
+        now = now or time.time()
+        if now < self.started:
+            return "NotStarted"
+        if now < self.finished:
+            return "Running"
+        return "Failed" if self.fails else "Succeeded"
+
+
+class FakeSpeechService:
+    """
+    Simulated transcription service on `http://host:port`; see the module docstring.
+
+    `queue_delay` is the mean queueing delay and `run_seconds` the mean run time in seconds.
+    `quota` limits the transcriptions that are not finished yet, `throttle_rate` and
+    `failure_rate` are the shares of requests answered with 429 and of jobs that fail.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, queue_delay=1.0, run_seconds=1.0, quota=None,
+                 throttle_rate=0.0, failure_rate=0.0, page_size=100, files_page_size=1, seed=None):
+        self.queue_delay = queue_delay
+        self.run_seconds = run_seconds
+        self.quota = quota
+        self.throttle_rate = throttle_rate
+        self.failure_rate = failure_rate
+        self.page_size = page_size
+        self.files_page_size = files_page_size
+        self.jobs = {}
+        self.blobs = {}
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def host(self):
+        """
+        Value for `SPEECH_API_HOST` / `speech.API_HOST`.
+        """
+        return self.url + API_PATH
+
+    def connection_string(self, account="fakeaccount"):
+        """
+        A blob connection string whose uploads land on this server.
+        """
+        key = base64.b64encode(b"fake-key").decode()
+        return (f"DefaultEndpointsProtocol=http;AccountName={account};AccountKey={key};"
+                f"BlobEndpoint={self.url}/blob/{account};")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def throttled(self):
+        with self._lock:
+            return self._random.random() < self.throttle_rate
+
+    def create(self, definition):
+        """
+        Create a job, or return None if the quota is used up.
+        """
+        with self._lock:
+            now = time.time()
+            active = sum(job.status(now) in ("NotStarted", "Running") for job in self.jobs.values())
+            if self.quota is not None and active >= self.quota:
+                return None
+            queue_seconds = self._random.expovariate(1 / self.queue_delay) if self.queue_delay else 0
+            run_seconds = self.run_seconds * self._random.uniform(0.5, 1.5)
+            job = FakeJob(definition, queue_seconds, run_seconds, self._random.random() < self.failure_rate)
+            self.jobs[job.id] = job
+            return job
+
+    def transcription(self, job):
+        status = job.status()
+        definition = job.definition
+        body = {
+            "self": f"{self.host}/transcriptions/{job.id}",
+            "displayName": definition.get("displayName") or "Fake transcription",
+            "locale": definition.get("locale") or "en-US",
+            "contentUrls": definition.get("contentUrls"),
+            "properties": dict(definition.get("properties") or {}),
+            "links": {"files": f"{self.host}/transcriptions/{job.id}/files"},
+            "status": status,
+            "createdDateTime": _timestamp(job.created),
+            "lastActionDateTime": _timestamp(min(time.time(), job.finished)),
+        }
+        if status == "Failed":
+            body["properties"]["error"] = {"code": "InvalidData", "message": "Simulated failure"}
+        return body
+
+    def files(self, job):
+        names = [f"contenturl_{i}.json" for i in range(len(job.definition.get("contentUrls") or [None]))]
+        files = [{"kind": "Transcription", "name": name} for name in names]
+        files.append({"kind": "TranscriptionReport", "name": "report.json"})
+        for file in files:
+            file["self"] = f"{self.host}/transcriptions/{job.id}/files/{file['name']}"
+            file["links"] = {"contentUrl": f"{self.url}/content/{job.id}/{file['name']}"}
+            file["createdDateTime"] = _timestamp(job.finished)
+        return files
+
+    def content(self, job, name):
+        if name == "report.json":
+            return {"successfulTranscriptionsCount": 1, "failedTranscriptionsCount": 0, "details": []}
+
+        urls = job.definition.get("contentUrls") or [""]
+        source = urls[int(name.split("_")[-1].split(".")[0]) % len(urls)]
+        audio_name = source.split("?")[0].split("/")[-1] or "audio"
+        text = f"Fake transcript of {audio_name}."
+        properties = job.definition.get("properties") or {}
+        best = {"confidence": 0.9, "lexical": text.lower(), "itn": text.lower(), "maskedITN": text.lower(),
+                "display": text}
+        if properties.get("wordLevelTimestampsEnabled"):
+            best["words"] = [{"word": word, "offsetInTicks": float(i * 5000000), "durationInTicks": 4000000.0}
+                             for i, word in enumerate(text.split())]
+            best["displayWords"] = [dict(word, displayText=word["word"]) for word in best["words"]]
+        return {
+            "source": source,
+            "timestamp": _timestamp(job.finished),
+            "durationInTicks": 10000000.0,
+            "combinedRecognizedPhrases": [{"channel": 0, "display": text}],
+            "recognizedPhrases": [{"recognitionStatus": "Success", "channel": 0, "speaker": 1, "offset": "PT0S",
+                                   "offsetInTicks": 0.0, "duration": "PT1S", "durationInTicks": 10000000.0,
+                                   "nBest": [best]}],
+        }
+
+    def page(self, items, url, query, default_top):
+        skip = int(query.get("skip", ["0"])[0])
+        top = int(query.get("top", [str(default_top)])[0])
+        body = {"values": items[skip:skip + top]}
+        if skip + top < len(items):
+            body["@nextLink"] = f"{url}?skip={skip + top}&top={top}"
+        return body
+
+
+def _handler(service: FakeSpeechService):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body=None, headers=None):
+            data = json.dumps(body).encode("utf8") if body is not None else b""
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            if body is not None:
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length else b""
+
+        def _route(self):
+            parts = urlsplit(self.path)
+            path = parts.path[len(API_PATH):] if parts.path.startswith(API_PATH) else parts.path
+            return [part for part in path.split("/") if part], parse_qs(parts.query)
+
+        def _job(self, job_id):
+            with service._lock:
+                job = service.jobs.get(job_id)
+            if job is None:
+                self._send(404, {"code": "NotFound", "message": f"Transcription {job_id} not found"})
+            return job
+
+        def _throttle(self):
+            if service.throttled():
+                service.count("throttled")
+                self._send(429, {"code": "TooManyRequests", "message": "Simulated throttling"},
+                           {"Retry-After": "1"})
+                return True
+            return False
+
+        def do_POST(self):
+            route, _ = self._route()
+            definition = json.loads(self._body() or b"{}")
+            service.count("POST /transcriptions")
+            if route != ["transcriptions"]:
+                return self._send(404)
+            if self._throttle():
+                return
+            job = service.create(definition)
+            if job is None:
+                service.count("throttled")
+                return self._send(429, {"code": "TooManyRequests", "message": "Concurrency quota exceeded"},
+                                  {"Retry-After": "1"})
+            service.count("created")
+            self._send(201, service.transcription(job), {"Location": f"{service.host}/transcriptions/{job.id}"})
+
+        def do_GET(self):
+            route, query = self._route()
+            if route and route[0] == "content" and len(route) == 3:
+                service.count("GET content")
+                job = self._job(route[1])
+                if job:
+                    body = service.content(job, route[2])
+                    service.count("bytes downloaded", len(json.dumps(body)))
+                    self._send(200, body)
+                return
+
+            if not route or route[0] != "transcriptions":
+                return self._send(404)
+            if self._throttle():
+                return
+
+            if len(route) == 1:
+                service.count("GET /transcriptions")
+                with service._lock:
+                    jobs = list(service.jobs.values())
+                return self._send(200, service.page([service.transcription(job) for job in jobs],
+                                                    f"{service.host}/transcriptions", query, service.page_size))
+
+            job = self._job(route[1])
+            if job is None:
+                return
+            if len(route) == 2:
+                service.count("GET /transcriptions/{id}")
+                return self._send(200, service.transcription(job))
+            if route[2] == "files":
+                service.count("GET /transcriptions/{id}/files")
+                files = service.files(job) if job.status() == "Succeeded" else []
+                if len(route) == 4:
+                    match = [file for file in files if file["name"] == route[3]]
+                    return self._send(200, match[0]) if match else self._send(404)
+                return self._send(200, service.page(files, f"{service.host}/transcriptions/{job.id}/files",
+                                                    query, service.files_page_size))
+            self._send(404)
+
+        def do_DELETE(self):
+            route, _ = self._route()
+            # the client sends "{}" with every delete; left unread it would prefix the next request
+            self._body()
+            service.count("DELETE /transcriptions/{id}")
+            if len(route) != 2 or route[0] != "transcriptions":
+                return self._send(404)
+            with service._lock:
+                job = service.jobs.pop(route[1], None)
+            if job is not None:
+                service.count("deleted")
+            self._send(204)
+
+        def do_PUT(self):
+            route, _ = self._route()
+            data = self._body()
+            if not route or route[0] != "blob":
+                return self._send(404)
+            service.count("PUT blob")
+            service.count("bytes uploaded", len(data))
+            with service._lock:
+                service.blobs["/".join(route[1:])] = len(data)
+            self._send(201, headers={
+                "ETag": f'"{uuid.uuid4().hex}"',
+                "Last-Modified": datetime.now(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S GMT"),
+                "Content-MD5": base64.b64encode(hashlib.md5(data).digest()).decode(),
+                "x-ms-request-id": str(uuid.uuid4()),
+                "x-ms-version": "2021-08-06",
+                "x-ms-request-server-encrypted": "true",
+            })
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--queue-delay", type=float, default=1.0)
+    parser.add_argument("--run-seconds", type=float, default=1.0)
+    parser.add_argument("--quota", type=int)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    service = FakeSpeechService(port=args.port, queue_delay=args.queue_delay, run_seconds=args.run_seconds,
+                                quota=args.quota, throttle_rate=args.throttle_rate, failure_rate=args.failure_rate)
+    print(f"SPEECH_API_HOST={service.host}")
+    print(f"BLOB_CONNECTION_STRING={service.connection_string()}")
+    with service:
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(dict(service.stats))
+
+
+if __name__ == '__main__':
+    main()
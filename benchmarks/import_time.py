@@ -0,0 +1,56 @@
+"""
+Cold-start benchmark for `python -c "import speech"`.
+
+Every sample runs in a fresh interpreter so nothing is cached in `sys.modules`. The lazy
+`swagger_client` package is compared against the previous eager behaviour, which is restored
+with SWAGGER_CLIENT_EAGER=1.
+
+    python benchmarks/import_time.py --runs 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(statement, eager, runs):
+    env = dict(os.environ)
+    env.pop("SWAGGER_CLIENT_EAGER", None)
+    if eager:
+        env["SWAGGER_CLIENT_EAGER"] = "1"
+
+    samples = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], cwd=ROOT, env=env, check=True)
+        samples.append(time.perf_counter() - start_time)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--statement", default="import speech")
+    args = parser.parse_args()
+
+    # the interpreter start-up itself, subtracted from both modes
+    baseline = statistics.median(measure("pass", False, args.runs))
+    print(f"interpreter start-up: {baseline * 1000:.1f} ms")
+
+    results = {}
+    for mode, eager in (("eager", True), ("lazy", False)):
+        samples = measure(args.statement, eager, args.runs)
+        results[mode] = statistics.median(samples) - baseline
+        print(f"{mode:>5}: median {results[mode] * 1000:.1f} ms, "
+              f"min {(min(samples) - baseline) * 1000:.1f} ms over {args.runs} runs")
+
+    print(f"lazy import saves {(results['eager'] - results['lazy']) * 1000:.1f} ms "
+          f"({(1 - results['lazy'] / results['eager']) * 100:.0f}%)")
+
+
+if __name__ == '__main__':
+    main()
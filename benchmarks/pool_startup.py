@@ -0,0 +1,86 @@
+"""
+Process pool spin-up time and per-worker RSS for the chunk encoding pool.
+
+`minimal` workers only import `chunk_worker`, which is how `cli_multiproc` starts its pool.
+`full` workers additionally import the modules the entry point loads (speech and blob
+clients, pydub, dotenv), which is what every worker paid for before. A spawn context is used
+so the modes behave the same on every platform.
+
+Spawned workers also re-run the main script of the parent. The `cli_multiproc` and
+`cli_batch` modes measure minimal workers as started by those scripts, i.e. with the script
+re-run in every worker as it is with `python cli_multiproc.py`.
+
+    python benchmarks/pool_startup.py --workers 4
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import chunk_worker  # noqa: E402
+
+FULL_IMPORTS = ["speech", "harvest", "journal", "pydub", "pydub.silence", "dotenv", "azure.storage.blob"]
+
+
+def init_full():
+    for module_name in FULL_IMPORTS:
+        importlib.import_module(module_name)
+    chunk_worker.init_worker()
+
+
+def sample_worker(delay):
+    # the delay keeps a worker busy so that every task lands on a different process
+    time.sleep(delay)
+    return os.getpid(), (chunk_worker.worker_rss(), len(sys.modules))
+
+
+@contextmanager
+def main_script(name):
+    # spawn re-runs the file of the parent's __main__ module in every worker
+    main = sys.modules["__main__"]
+    saved = main.__file__
+    main.__file__ = os.path.join(ROOT, f"{name}.py")
+    try:
+        yield
+    finally:
+        main.__file__ = saved
+
+
+def measure(initializer, workers, main=None):
+    start_time = time.perf_counter()
+    with main_script(main) if main else nullcontext(), \
+            ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                initializer=initializer) as executor:
+        samples = dict(executor.map(sample_worker, [0.2] * workers))
+        spin_up = time.perf_counter() - start_time - 0.2
+    return spin_up, list(samples.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    # workers find the pool functions by module name, and __main__ is not this file in the
+    # cli_multiproc and cli_batch modes
+    benchmark = importlib.import_module("pool_startup")
+    modes = (("full", benchmark.init_full, None), ("minimal", chunk_worker.init_worker, None),
+             ("cli_multiproc", chunk_worker.init_worker, "cli_multiproc"),
+             ("cli_batch", chunk_worker.init_worker, "cli_batch"))
+    for mode, initializer, main in modes:
+        spin_up, samples = benchmark.measure(initializer, args.workers, main)
+        rss = [value for value, _ in samples if value is not None]
+        average_rss = f"{sum(rss) / len(rss) / 1024:.1f} MB" if rss else "n/a"
+        modules = max(count for _, count in samples)
+        print(f"{mode:>13}: spin-up {spin_up * 1000:.0f} ms, average worker RSS {average_rss}, "
+              f"{modules} modules")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+End-to-end throughput of the batch client against `fake_speech_service`, without Azure.
+
+`transcribe` runs `speech.transcribe` for every job, `paginate` creates the jobs and then
+pages through the transcription list with `speech._paginate`, and `pipeline` runs the
+upload/submit/poll/download stage of `cli_multiproc` (`transcribe_chunk`) on synthetic
+chunks, uploading them to the fake blob endpoint. Reports jobs/sec, p50/p99 latency, errors
+and the request counts seen by the server.
+
+    python benchmarks/service_throughput.py --scenario all --jobs 200 --concurrency 20 \\
+        --queue-delay 0.5 --run-seconds 0.5 --throttle-rate 0.02 --failure-rate 0.01
+"""
+import argparse
+import io
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import speech  # noqa: E402
+from fake_speech_service import FakeSpeechService  # noqa: E402
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)] if ordered else float("nan")
+
+
+def timed(fn, *args):
+    """
+    Run `fn(*args)` and return (elapsed seconds, succeeded).
+    """
+    start_time = time.perf_counter()
+    try:
+        result = fn(*args)
+        ok = bool(result) and not isinstance(result, list)
+    except Exception:
+        ok = False
+    return time.perf_counter() - start_time, ok
+
+
+def run_jobs(fn, jobs, concurrency):
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(fn, range(jobs)))
+    elapsed = time.perf_counter() - start_time
+    latencies = [latency for latency, _ in outcomes]
+    return {
+        "jobs": jobs,
+        "seconds": round(elapsed, 3),
+        "jobs_per_second": round(jobs / elapsed, 2),
+        "p50": round(percentile(latencies, 0.5), 3),
+        "p99": round(percentile(latencies, 0.99), 3),
+        "errors": sum(not ok for _, ok in outcomes),
+    }
+
+
+def scenario_transcribe(args):
+    return run_jobs(lambda i: timed(speech.transcribe, f"https://fake.blob.core.windows.net/audio/audio{i}.wav"),
+                    args.jobs, args.concurrency)
+
+
+def scenario_paginate(args):
+    api = speech.create_api(pool_maxsize=args.concurrency)
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(lambda i: timed(speech.submit, f"https://fake.blob.core.windows.net/audio/audio{i}.wav",
+                                          None, api), range(args.jobs)))
+
+    start_time = time.perf_counter()
+    listed = sum(1 for _ in speech._paginate(api, api.transcriptions_list(top=args.page_size)))
+    elapsed = time.perf_counter() - start_time
+    return {"listed": listed, "pages": math.ceil(listed / args.page_size), "seconds": round(elapsed, 3)}
+
+
+def scenario_pipeline(args, service):
+    import cli_multiproc
+    from journal import JobJournal
+
+    cli_multiproc.connection_string = service.connection_string()
+    cli_multiproc.container_name = "chunks"
+    cli_multiproc.get_blob_service_client.cache_clear()
+    cli_multiproc.upload_semaphore = threading.Semaphore(args.concurrency)
+    api = speech.create_api(pool_maxsize=args.concurrency)
+    chunk = os.urandom(args.chunk_kb * 1024)
+
+    with tempfile.TemporaryDirectory() as directory:
+        journal = JobJournal(os.path.join(directory, "bench.journal.db"))
+        cancel_event = threading.Event()
+
+        def transcribe(i):
+            return timed(cli_multiproc.transcribe_chunk, journal, "bench", None, None, cancel_event, api,
+                         (i, (io.BytesIO(chunk), 1000)))
+
+        try:
+            return run_jobs(transcribe, args.jobs, args.concurrency)
+        finally:
+            journal.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=["transcribe", "paginate", "pipeline", "all"], default="all")
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--queue-delay", type=float, default=0.5)
+    parser.add_argument("--run-seconds", type=float, default=0.5)
+    parser.add_argument("--quota", type=int)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--chunk-kb", type=int, default=256)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    scenarios = ["transcribe", "paginate", "pipeline"] if args.scenario == "all" else [args.scenario]
+    results = {}
+    for scenario in scenarios:
+        # a fresh service per scenario, so the listings and counters only hold its own jobs
+        with FakeSpeechService(queue_delay=args.queue_delay, run_seconds=args.run_seconds, quota=args.quota,
+                               throttle_rate=args.throttle_rate, failure_rate=args.failure_rate,
+                               page_size=args.page_size) as service:
+            speech.API_HOST = service.host
+            speech.SUBSCRIPTION_KEY = "fake"
+            speech.LOCALE = speech.LOCALE or "en-US"
+            speech.POLL_INTERVAL = args.poll_interval
+
+            if scenario == "transcribe":
+                result = scenario_transcribe(args)
+            elif scenario == "paginate":
+                result = scenario_paginate(args)
+            else:
+                result = scenario_pipeline(args, service)
+            result["server"] = dict(service.stats)
+        results[scenario] = result
+        print(f"{scenario}: {json.dumps(result)}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            json.dump({"args": vars(args), "results": results, "time": time.time()}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Encoding worker for the `ProcessPoolExecutor` in `cli_multiproc`.
+
+Pool processes only import this module, so they do not pay for the blob and speech clients,
+the `.env` loading or the logging handlers of the entry point.
+
+`EncoderPool` keeps these processes alive for the whole run and streams raw PCM in and MP3
+bytes out through the pool's pipes. Encoding happens in-process with `lameenc`, a listed
+requirement; without it every chunk falls back to an ffmpeg process fed over stdin/stdout.
+Neither path needs temp files, unlike `AudioSegment.export`.
+"""
+import io
+import logging
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+import logqueue
+import profiling
+
+try:
+    import lameenc
+except ImportError:
+    lameenc = None
+
+temp_directory = "temp"
+
+# MP3 bitrate in kbps used by the encoder workers
+_bitrate = 128
+
+
+def init_worker(log_level=logging.WARNING, bitrate=128, log_queue=None):
+    """
+    Pool initializer. Workers log into the parent's `log_queue` when given (see `logqueue`),
+    otherwise to stderr only; the parent process owns the log file.
+    """
+    global _bitrate
+    if log_queue is not None:
+        logqueue.init_worker(log_queue, log_level)
+    else:
+        logging.basicConfig(level=log_level, format=logqueue.FORMAT)
+    os.makedirs(temp_directory, exist_ok=True)
+    _bitrate = bitrate
+    # PROFILE is inherited from the parent
+    profiling.configure()
+
+
+def worker_rss():
+    """
+    Resident set size of the calling process in kB, read from /proc (Linux only).
+    """
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return None
+
+
+def process_chunk(args):  # chunk, to_file=False):
+    i, chunk, to_file = args
+
+    if to_file:
+        chunk.export(f"{temp_directory}/chunk{i}.mp3", format="mp3")
+
+    buffer = io.BytesIO()
+    chunk.export(buffer, format="mp3")
+    buffer_copy = io.BytesIO(buffer.getvalue())
+    # initial position of read/write pointer at the beginning of the buffer
+    buffer.seek(0)
+    buffer.truncate(0)
+    return buffer_copy
+
+
+def _encode_lame(pcm, frame_rate, channels):
+    encoder = lameenc.Encoder()
+    encoder.set_bit_rate(_bitrate)
+    encoder.set_in_sample_rate(frame_rate)
+    encoder.set_channels(channels)
+    encoder.set_quality(2)
+    return bytes(encoder.encode(pcm) + encoder.flush())
+
+
+def _encode_ffmpeg(pcm, frame_rate, channels):
+    command = [shutil.which("ffmpeg") or "ffmpeg", "-loglevel", "error",
+               "-f", "s16le", "-ar", str(frame_rate), "-ac", str(channels), "-i", "pipe:0",
+               "-f", "mp3", "-b:a", f"{_bitrate}k", "pipe:1"]
+    completed = subprocess.run(command, input=pcm, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if completed.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to encode chunk: {completed.stderr.decode(errors='replace')}")
+    return completed.stdout
+
+
+def encode_pcm(args):
+    """
+    Encode 16-bit little endian PCM to MP3 and return the encoded bytes.
+    """
+    i, pcm, frame_rate, channels, to_file, prefix = args
+    with profiling.stage("encode"):
+        if lameenc is not None:
+            data = _encode_lame(pcm, frame_rate, channels)
+        else:
+            data = _encode_ffmpeg(pcm, frame_rate, channels)
+
+    if to_file:
+        # named like the uploaded blob, so recordings encoded side by side keep apart
+        path = os.path.join(temp_directory, *f"{prefix}chunk{i}.mp3".split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    return data
+
+
+def encode_segment(chunk):
+    """
+    Encode an `AudioSegment` in the calling process, as a pool worker would.
+    """
+    return encode_pcm(EncoderPool._pcm_args(0, chunk, False))
+
+
+class EncoderPool:
+    """
+    A small pool of long-lived encoder processes.
+
+        with EncoderPool(max_workers=4) as encoder:
+            for buffer in encoder.map(chunks):
+                ...
+    """
+
+    def __init__(self, max_workers=4, bitrate=128, to_file=False, log_queue=None):
+        self.to_file = to_file
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker,
+                                             initargs=(logging.WARNING, bitrate, log_queue))
+
+    @staticmethod
+    def _pcm_args(i, chunk, to_file, prefix=""):
+        # only the raw samples cross the pipe, the encoders need 16-bit input
+        chunk = chunk.set_sample_width(2)
+        return i, chunk.raw_data, chunk.frame_rate, chunk.channels, to_file, prefix
+
+    def submit(self, i, chunk, prefix=""):
+        """
+        Queue `chunk` (an `AudioSegment`) and return a future of its encoded bytes. With
+        `to_file` the copy is written to `temp/<prefix>chunk<i>.mp3`.
+        """
+        return self._executor.submit(encode_pcm, self._pcm_args(i, chunk, self.to_file, prefix))
+
+    def map(self, chunks):
+        """
+        Encode `chunks` and yield one `io.BytesIO` per chunk, in order.
+        """
+        args_list = (self._pcm_args(i, chunk, self.to_file) for i, chunk in enumerate(chunks))
+        for data in self._executor.map(encode_pcm, args_list):
+            yield io.BytesIO(data)
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
@@ -0,0 +1,211 @@
+"""
+Alternative chunkers for `cli_multiproc`.
+
+`split_on_silence` makes uneven chunks: a long monologue stays one chunk while quiet passages
+turn into many tiny jobs. `fixed_windows` instead cuts windows of a fixed length, snapping
+each cut to the quietest point nearby, and lets neighbouring windows overlap slightly so no
+word is lost at a cut. `stitch` merges the results and drops the duplicated words of the
+overlaps using word level timestamps.
+
+`ChunkPlanner` keeps the silence boundaries but plans the chunks: short neighbours are merged,
+long ones are split at their quietest internal pause, and the chunk size is chosen with a
+`CostModel` of per-job overhead that can be calibrated from the timings in the job journal.
+"""
+import heapq
+import math
+from collections import namedtuple
+import numpy as np
+from pydub.silence import detect_nonsilent
+import vad
+
+# A window covers [start_ms, end_ms) of the audio and owns the words starting in
+# [keep_from_ms, keep_to_ms); the rest of it is overlap owned by a neighbour.
+Window = namedtuple("Window", ["index", "start_ms", "end_ms", "keep_from_ms", "keep_to_ms"])
+
+# locales written without spaces between words
+_NO_SPACE_LANGUAGES = ("ja", "zh", "th", "lo", "my", "km")
+
+
+def word_separator(locale):
+    return "" if locale and locale.split("-")[0].lower() in _NO_SPACE_LANGUAGES else " "
+
+
+def _quietest(energy, frame_ms, low_ms, high_ms):
+    low, high = int(low_ms // frame_ms), max(int(high_ms // frame_ms), int(low_ms // frame_ms) + 1)
+    return (low + int(np.argmin(energy[low:high]))) * frame_ms + frame_ms // 2
+
+
+def fixed_windows(audio, window_ms=60000, overlap_ms=2000, snap_ms=5000, frame_ms=50):
+    """
+    Plan fixed-length windows over `audio`. Each cut is moved to the lowest-energy frame within
+    `snap_ms` of its nominal position, and windows extend `overlap_ms / 2` past both of their
+    cuts.
+    """
+    length = len(audio)
+    cuts = [0]
+    if length > window_ms:
+        energy = vad.frame_energy_db(audio, frame_ms)
+        while length - cuts[-1] > window_ms + window_ms // 4:
+            target = cuts[-1] + window_ms
+            low = max(cuts[-1] + window_ms // 2, target - snap_ms)
+            high = min(len(energy) * frame_ms, target + snap_ms)
+            cuts.append(_quietest(energy, frame_ms, low, high))
+    cuts.append(length)
+
+    half = overlap_ms // 2
+    return [Window(i, max(0, start - half), min(length, end + half), start, end)
+            for i, (start, end) in enumerate(zip(cuts, cuts[1:]))]
+
+
+def _absolute_ms(window, item):
+    return window.start_ms + item["offsetInTicks"] / vad.TICKS_PER_MS
+
+
+def stitch(windows, results, locale=None):
+    """
+    Merge the parsed results of `windows` into lines of text ordered by time. Words of the
+    overlapping parts are kept only by the window that owns them; phrases without word
+    timestamps are assigned by their own offset.
+    """
+    separator = word_separator(locale)
+    lines = []
+    for window, result in zip(windows, results):
+        if not result:
+            continue
+        for phrase in result.get("recognizedPhrases", []):
+            if phrase["recognitionStatus"] != "Success":
+                continue
+            best = phrase["nBest"][0]
+            words = best.get("displayWords") or best.get("words") or []
+            owned = [word for word in words
+                     if window.keep_from_ms <= _absolute_ms(window, word) < window.keep_to_ms]
+
+            if not words:
+                if window.keep_from_ms <= _absolute_ms(window, phrase) < window.keep_to_ms:
+                    lines.append((_absolute_ms(window, phrase), best["display"]))
+            elif len(owned) == len(words):
+                lines.append((_absolute_ms(window, phrase), best["display"]))
+            elif owned:
+                text = separator.join(word.get("displayText", word.get("word", "")) for word in owned)
+                lines.append((_absolute_ms(window, owned[0]), text))
+
+    return [text for _, text in sorted(lines, key=lambda line: line[0])]
+
+
+class CostModel:
+    """
+    Estimated wall time of a chunk job: a fixed per-job overhead (upload, create, queue wait,
+    polling, download) plus a processing time proportional to the audio duration.
+    """
+
+    def __init__(self, overhead_seconds=60.0, seconds_per_audio_second=0.2):
+        self.overhead_seconds = overhead_seconds
+        self.seconds_per_audio_second = seconds_per_audio_second
+
+    def job_seconds(self, duration_ms):
+        return self.overhead_seconds + self.seconds_per_audio_second * duration_ms / 1000
+
+    def makespan(self, durations_ms, concurrency):
+        """
+        Estimated wall time of running jobs of `durations_ms` on `concurrency` parallel slots,
+        longest jobs first.
+        """
+        slots = [0.0] * max(1, concurrency)
+        for duration_ms in sorted(durations_ms, reverse=True):
+            heapq.heappush(slots, heapq.heappop(slots) + self.job_seconds(duration_ms))
+        return max(slots)
+
+    @classmethod
+    def calibrate(cls, timings, default=None):
+        """
+        Fit the model to (audio duration in ms, elapsed seconds) pairs of past jobs, for
+        example `JobJournal.timings()`. Falls back to `default` with too few samples.
+        """
+        default = default or cls()
+        if len(timings) < 3 or len({duration_ms for duration_ms, _ in timings}) < 2:
+            return default
+        durations = np.array([duration_ms / 1000 for duration_ms, _ in timings])
+        elapsed = np.array([seconds for _, seconds in timings])
+        rate, overhead = np.polyfit(durations, elapsed, 1)
+        return cls(max(0.0, float(overhead)), max(0.0, float(rate)))
+
+
+class ChunkPlanner:
+    """
+    Turns the speech ranges between silences of `audio` into a chunk plan.
+    """
+
+    def __init__(self, audio, min_silence_len=2000, silence_thresh=-32, frame_ms=50):
+        self.ranges = detect_nonsilent(audio, min_silence_len=min_silence_len, silence_thresh=silence_thresh)
+        self.frame_ms = frame_ms
+        self.energy = vad.frame_energy_db(audio, frame_ms)
+
+    def _split_long(self, start, end, min_ms, max_ms):
+        pieces = []
+        while end - start > max_ms:
+            # the quietest point that leaves both sides at least min_ms long
+            low = start + min_ms
+            high = min(end - min_ms, start + max_ms)
+            cut = _quietest(self.energy, self.frame_ms, low, high) if high > low else start + max_ms
+            pieces.append((start, cut))
+            start = cut
+        pieces.append((start, end))
+        return pieces
+
+    def plan(self, target_ms, min_ms=5000, max_ms=600000):
+        """
+        Return (start_ms, end_ms) chunks. Ranges longer than `max_ms` are split, and consecutive
+        ranges are merged while the result stays within `target_ms`, or within `max_ms` while
+        one side is shorter than `min_ms`.
+        """
+        pieces = []
+        for start, end in self.ranges:
+            pieces.extend(self._split_long(start, end, min_ms, max_ms))
+
+        merged = []
+        for start, end in pieces:
+            if merged:
+                combined = end - merged[-1][0]
+                short = merged[-1][1] - merged[-1][0] < min_ms or end - start < min_ms
+                if combined <= target_ms or (short and combined <= max_ms):
+                    merged[-1][1] = end
+                    continue
+            merged.append([start, end])
+        return [(start, end) for start, end in merged]
+
+    def _plan_jobs(self, target_jobs, min_ms, max_ms, steps=20):
+        # merged chunks also span the silences between their ranges, so the chunk count is
+        # not the speech duration over the chunk size; search the smallest size that gives
+        # at most `target_jobs` chunks instead
+        spans = self.plan(max_ms, min_ms, max_ms)
+        if len(spans) > target_jobs:
+            return spans
+        low, high = min_ms, max_ms
+        for _ in range(steps):
+            target_ms = (low + high) / 2
+            candidate = self.plan(target_ms, min_ms, max_ms)
+            if len(candidate) <= target_jobs:
+                high, spans = target_ms, candidate
+            else:
+                low = target_ms
+        return spans
+
+    def optimize(self, model: CostModel, concurrency, target_jobs=None, min_ms=5000, max_ms=600000):
+        """
+        Plan chunks for `target_jobs` jobs if given, otherwise for the chunk size with the lowest
+        makespan under `model` with `concurrency` jobs in flight.
+        """
+        if not self.ranges:
+            return []
+        if target_jobs:
+            return self._plan_jobs(target_jobs, min_ms, max_ms)
+
+        best = None
+        for step in range(13):
+            # candidate sizes spaced geometrically between min_ms and max_ms
+            target_ms = min_ms * math.pow(max_ms / min_ms, step / 12)
+            spans = self.plan(target_ms, min_ms, max_ms)
+            makespan = model.makespan([end - start for start, end in spans], concurrency)
+            if best is None or makespan < best[0]:
+                best = (makespan, spans)
+        return best[1]
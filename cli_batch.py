@@ -0,0 +1,286 @@
+"""
+Batch transcription of many recordings with the `cli_multiproc` pipeline.
+
+All chunks of all recordings share one encoder pool, one memory budget and one pool of
+transcription threads, so the limits apply to the whole batch and the pools stay busy across
+file boundaries: the next recording is decoded and encoded while the last chunks of the
+previous one are still transcribing. Each recording is written to `<out-dir>/<name>.txt` as
+soon as its last chunk finishes, and a summary is printed at the end.
+
+Inputs are MP3 files, directories (every *.mp3 inside) or glob patterns; a manifest lists one
+input per line.
+
+With TRANSCRIBE_MODE=auto each recording goes to batch or to concurrent real-time sessions,
+whichever `router.LatencyRouter` expects to finish first; the real-time recordings are
+transcribed one after another next to the batch pools. TRANSCRIBE_MODE=realtime sends all of
+them to real-time sessions.
+
+    python cli_batch.py data/ "archive/2023-*.mp3" --manifest backlog.txt --out-dir results
+"""
+import argparse
+import glob
+import hashlib
+import logging
+import logqueue
+import os
+import threading
+import time
+import cli_multiproc
+import preprocess
+import profiling
+import telemetry
+import tuning
+from cli_multiproc import encoded_chunks, load_audio, load_chunks, transcribe_chunk, transcribe_realtime
+from chunk_worker import EncoderPool
+from functools import partial
+from journal import JobJournal
+from membudget import MemoryBudget
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# like cli_multiproc, this script is re-run by spawned encoder processes, so router, speech and
+# hedging are imported where they are used
+
+
+class FileJob:
+    """
+    A recording in the batch and the results of its chunks.
+    """
+
+    def __init__(self, path, out_dir):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.out_path = os.path.join(out_dir, f"{self.name}.txt")
+        self.source = cli_multiproc.journal_source(path)
+        # chunks of different recordings must not overwrite each other in the container
+        digest = hashlib.sha1(os.path.abspath(path).encode("utf8")).hexdigest()[:8]
+        self.prefix = f"{self.name}-{digest}/"
+        self.windows = None
+        self.results = []
+        self.remaining = 0
+        self.start_time = None
+        self.end_time = None
+        self.route = None
+        self.realtime = False
+        self.error = None
+
+    @property
+    def failed(self):
+        return sum(result is None for result in self.results)
+
+
+def expand_inputs(inputs, manifest=None):
+    """
+    Paths of the recordings named by `inputs` and the lines of `manifest`, without duplicates.
+    """
+    entries = list(inputs)
+    if manifest:
+        with open(manifest, encoding="utf8") as f:
+            entries.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+
+    paths = []
+    for entry in entries:
+        if os.path.isdir(entry):
+            matches = sorted(glob.glob(os.path.join(entry, "*.mp3")))
+        elif glob.has_magic(entry):
+            matches = sorted(glob.glob(entry))
+        else:
+            matches = [entry]
+        paths.extend(match for match in matches if match not in paths)
+    return paths
+
+
+def route_files(files, journal):
+    """
+    Mark the `files` to transcribe in real time, per TRANSCRIBE_MODE.
+    """
+    import router
+    if cli_multiproc.transcribe_mode == "realtime":
+        for job in files:
+            job.realtime = True
+    elif cli_multiproc.transcribe_mode == "auto":
+        latency_router = router.LatencyRouter.from_journal(journal, tuning.service_quota(),
+                                                           cli_multiproc.realtime_sessions)
+        for job in files:
+            job.route = latency_router.route(job.path, router.probe_duration_ms(job.path),
+                                             word_timestamps=cli_multiproc.word_timestamps)
+            job.realtime = job.route.mode == "realtime"
+
+
+class BatchScheduler:
+    """
+    Feeds the chunks of all `files` through the shared pools and assembles the results per file.
+    """
+
+    def __init__(self, files, journal, encode_workers, transcribe_workers):
+        self.files = files
+        self.journal = journal
+        self.encode_workers = encode_workers
+        self.transcribe_workers = transcribe_workers
+        self.budget = MemoryBudget()
+        self.cancel_event = threading.Event()
+        self.policy = None
+        if cli_multiproc.hedge_percentile:
+            from hedging import HedgePolicy
+            # the duplicate budget grows as recordings are loaded
+            self.policy = HedgePolicy(percentile=float(cli_multiproc.hedge_percentile), max_duplicates=0)
+        self.chunk_count = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def _work_items(self, encoder):
+        # recordings are decoded one at a time, when the encoder gets to them
+        for job in self.files:
+            if job.realtime:
+                continue
+            job.start_time = time.time()
+            try:
+                chunks, job.windows, _ = load_chunks(job.path, self.journal, job.source, self.transcribe_workers)
+            except Exception as e:
+                # one unreadable recording must not stop the rest of the batch
+                logging.error(f"Loading {job.path} failed: {e}")
+                job.error = repr(e)
+                self._finish(job)
+                continue
+            needed = {i for i in range(len(chunks)) if self.journal.get(job.source, i) is None}
+            with self._lock:
+                job.results = [None] * len(chunks)
+                job.remaining = len(chunks)
+                self.chunk_count += len(chunks)
+                if self.policy:
+                    self.policy.max_duplicates = max(1, int(self.chunk_count * cli_multiproc.hedge_budget))
+            if not chunks:
+                self._finish(job)
+                continue
+            for i, args in encoded_chunks(encoder, chunks, needed, self.budget,
+                                          ahead=self.encode_workers * 2, start_time=job.start_time,
+                                          prefix=job.prefix):
+                yield job, i, args
+
+    def _chunk_done(self, job, i, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            logging.error(f"Chunk {i} of {job.path} failed: {e}")
+            result = None
+        with self._lock:
+            job.results[i] = result
+            job.remaining -= 1
+            finished = job.remaining == 0
+        if finished:
+            self._finish(job)
+
+    def _run_realtime(self):
+        for job in self.files:
+            if self.cancel_event.is_set():
+                break
+            if not job.realtime:
+                continue
+            job.start_time = time.time()
+            lines = []
+            try:
+                audio, _ = load_audio(job.path)
+                lines = transcribe_realtime(audio, cli_multiproc.realtime_sessions, self.cancel_event)
+            except Exception as e:
+                logging.error(f"Real-time transcription of {job.path} failed: {e}")
+                job.error = repr(e)
+            self._finish(job, lines)
+
+    def _finish(self, job, lines=None):
+        if lines is None:
+            # a recording that failed to load has no results, and no windows to stitch them with
+            lines = [] if job.error else cli_multiproc.assemble_lines(job.results, job.windows)
+        with open(job.out_path, "w", encoding="utf8") as f:
+            for line in lines:
+                f.write(line + os.linesep)
+        job.end_time = time.time()
+        if job.route:
+            import router
+            error = job.error or (f"{job.failed} chunks failed" if job.failed else None)
+            router.record(job.route, job.end_time - job.start_time, error)
+        with self._lock:
+            self.completed += 1
+            status = f"error: {job.error}" if job.error else f"{len(job.results)} chunks, {job.failed} failed"
+            print(f"[{self.completed}/{len(self.files)}] {job.path}: {status}, "
+                  f"{job.end_time - job.start_time:.1f}s")
+
+    def run(self, bitrate=128, deadline=None):
+        # one client shared by all transcription threads, its connection pool sized to match
+        import speech
+        api = speech.create_api(pool_maxsize=self.transcribe_workers)
+        realtime = threading.Thread(target=self._run_realtime, name="realtime")
+        realtime.start()
+        with EncoderPool(max_workers=self.encode_workers, bitrate=bitrate, to_file=True,
+                         log_queue=logqueue.queue()) as encoder, \
+                ThreadPoolExecutor(max_workers=self.transcribe_workers) as executor:
+            futures = []
+            try:
+                for job, i, args in self._work_items(encoder):
+                    future = executor.submit(
+                        partial(transcribe_chunk, self.journal, job.source, self.policy, deadline,
+                                self.cancel_event, api, prefix=job.prefix), args)
+                    future.add_done_callback(partial(self._chunk_done, job, i))
+                    futures.append(future)
+                # wait here rather than in the executor's shutdown, so Ctrl+C reaches the handler
+                wait(futures)
+                realtime.join()
+            except KeyboardInterrupt:
+                # stop polling and delete the running jobs; finished chunks stay in the journal
+                self.cancel_event.set()
+                raise
+            finally:
+                realtime.join()
+
+    def summary(self):
+        lines = [f"{'file':<40} {'chunks':>7} {'failed':>7} {'seconds':>9}"]
+        for job in self.files:
+            seconds = job.end_time - job.start_time if job.end_time else float("nan")
+            line = f"{job.name[:40]:<40} {len(job.results):>7} {job.failed:>7} {seconds:>9.1f}"
+            lines.append(f"{line}  {job.error}" if job.error else line)
+        return os.linesep.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", help="MP3 files, directories or glob patterns")
+    parser.add_argument("--manifest", help="text file with one input per line")
+    parser.add_argument("--out-dir", default="results")
+    parser.add_argument("--encode-workers", type=int, default=tuning.DEFAULT_SIZES.encode_workers)
+    parser.add_argument("--transcribe-workers", type=int, default=tuning.service_quota(),
+                        help="transcriptions in flight across all files (default SPEECH_CONCURRENCY_QUOTA)")
+    parser.add_argument("--upload-slots", type=int, default=tuning.DEFAULT_SIZES.upload_slots)
+    args = parser.parse_args()
+
+    paths = expand_inputs(args.inputs, args.manifest)
+    if not paths:
+        parser.error("no recordings found")
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    cli_multiproc.upload_semaphore = threading.Semaphore(args.upload_slots)
+    journal = JobJournal(os.path.join(args.out_dir, "batch.journal.db"))
+    files = [FileJob(path, args.out_dir) for path in paths]
+    names = [job.name for job in files]
+    for job in files:
+        if names.count(job.name) > 1:
+            # recordings with the same name in different directories
+            job.out_path = os.path.join(args.out_dir, f"{job.prefix.rstrip('/')}.txt")
+    route_files(files, journal)
+    scheduler = BatchScheduler(files, journal, args.encode_workers, args.transcribe_workers)
+
+    print(f"Transcribing {len(files)} recordings")
+    start_time = time.time()
+    deadline = start_time + cli_multiproc.batch_timeout if cli_multiproc.batch_timeout else None
+    try:
+        scheduler.run(bitrate=preprocess.CHUNK_BITRATE if preprocess.enabled_codec() else 128, deadline=deadline)
+    finally:
+        journal.close()
+        telemetry.export()
+
+    print(scheduler.summary())
+    print(f"{scheduler.chunk_count} chunks in {time.time() - start_time:.1f}s")
+
+
+if __name__ == '__main__':
+    cli_multiproc.setup_logging()
+    telemetry.configure()
+    profiling.configure()
+    main()
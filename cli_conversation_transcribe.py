@@ -13,22 +13,16 @@ Conversation transcription samples for the Microsoft Cognitive Services Speech S
 """
 
 from dotenv import load_dotenv
+from functools import partial
+import glob
+import sys
 import time
 import os
 from os import path
 import logging
-# Logging configuration
-for handler in logging.root.handlers[:]:
-    logging.root.removeHandler(handler)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("output2.log", encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+import logqueue
+# Logging configuration; SDK callbacks only enqueue their records, see logqueue
+logqueue.start("output2.log")
 
 
 try:
@@ -40,9 +34,12 @@ except ImportError:
     https://docs.microsoft.com/azure/cognitive-services/speech-service/quickstart-python for
     installation instructions.
     """)
-    import sys
     sys.exit(1)
 
+import vad
+from audio_streams import AudioReaderCallback, pcm_audio_config
+from conversation import ConversationSession, SessionManager
+
 # Set up the subscription info for the Speech Service:
 # Replace with your own subscription key and service region (e.g., "centralus").
 # See the limitations in supported regions,
@@ -51,106 +48,62 @@ except ImportError:
 # This sample uses a wavfile which is captured using a supported Speech SDK devices (8 channel, 16kHz, 16-bit PCM)
 # See https://docs.microsoft.com/azure/cognitive-services/speech-service/speech-devices-sdk-microphone
 
-# Dictionary for speaker id management
-speaker_ids = set()
-emoji_list = ['😀', '😁', '😂', '🤣', '😃', '😄', '😅', '😆']
-
-
-class BinaryFileReaderCallback(speechsdk.audio.PullAudioInputStreamCallback):
-    def __init__(self, filename: str):
-        super().__init__()
-        self._file_h = open(filename, "rb")
-
-    def read(self, buffer: memoryview) -> int:
-        try:
-            size = buffer.nbytes
-            frames = self._file_h.read(size)
-            buffer[:len(frames)] = frames
-
-            return len(frames)
-        except Exception as ex:
-            logging.info('Exception in `read`: {}'.format(ex))
-            raise
-
-    def close(self) -> None:
-        logging.info('closing file')
-        try:
-            self._file_h.close()
-        except Exception as ex:
-            logging.info('Exception in `close`: {}'.format(ex))
-            raise
 
-
-def compressed_stream_helper(compressed_format,
-                             mp3_file_path,
-                             default_speech_auth):
-    callback = BinaryFileReaderCallback(mp3_file_path)
+def compressed_audio_config(compressed_format, mp3_file_path):
+    callback = AudioReaderCallback(mp3_file_path)
     stream = speechsdk.audio.PullAudioInputStream(
         stream_format=compressed_format, pull_stream_callback=callback)
+    return speechsdk.audio.AudioConfig(stream=stream)
+
 
+def create_speech_config(default_speech_auth):
     speech_config = speechsdk.SpeechConfig(**default_speech_auth)
     speech_config.speech_recognition_language = "ja-JP"
-    audio_config = speechsdk.audio.AudioConfig(stream=stream)
-
-    transcriber = speechsdk.transcription.ConversationTranscriber(
-        speech_config=speech_config, audio_config=audio_config)
+    return speech_config
 
-    done = False
 
-    def stop_cb(evt: speechsdk.SessionEventArgs):
-        """callback that signals to stop continuous transcription upon receiving an event `evt`"""
-        logging.info('CLOSING {}'.format(evt.session_id))
-        nonlocal done
-        done = True
-
-    # Subscribe to the events fired by the conversation transcriber
-    transcriber.transcribed.connect(conversation_transcriber_transcribed_cb)
-    transcriber.session_started.connect(
-        lambda evt: logging.info('SESSION STARTED: {}'.format(evt.session_id)))
-    transcriber.session_stopped.connect(
-        lambda evt: logging.info('SESSION STOPPED {}'.format(evt.session_id)))
-    transcriber.canceled.connect(lambda evt: logging.info(
-        'CANCELED {}'.format(evt.session_id)))
-    # stop continuous transcription on either session stopped or canceled events
-    transcriber.session_stopped.connect(stop_cb)
-    transcriber.canceled.connect(stop_cb)
-
-    # Start continuous speech recognition
-    transcriber.start_transcribing_async()
-    while not done:
-        time.sleep(.5)
-
-    transcriber.stop_transcribing_async()
+def compressed_stream_helper(compressed_format,
+                             mp3_file_path,
+                             default_speech_auth):
+    session = ConversationSession(mp3_file_path, create_speech_config(default_speech_auth),
+                                  compressed_audio_config(compressed_format, mp3_file_path))
+    # returns when the session stops or is canceled
+    return session.run()
 
 
-def pull_audio_input_stream_compressed_mp3(mp3_file_path: str,
-                                           default_speech_auth):
+def mp3_format():
     # Create a compressed format
-    compressed_format = speechsdk.audio.AudioStreamFormat(
+    return speechsdk.audio.AudioStreamFormat(
         compressed_stream_format=speechsdk.AudioStreamContainerFormat.MP3)
-    compressed_stream_helper(
-        compressed_format, mp3_file_path, default_speech_auth)
-
-
-def conversation_transcriber_transcribed_cb(evt: speechsdk.SpeechRecognitionEventArgs):
-    if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech:
-        # Speaker assignment
-        speaker_id = evt.result.speaker_id
-        if evt.result.speaker_id not in speaker_ids:
-            speaker_ids.add(evt.result.speaker_id)
 
-        speaker_ids_list = list(speaker_ids)
-        index = speaker_ids_list.index(speaker_id)
-        emoji = emoji_list[index % len(emoji_list)]
 
-        result = evt.result.text
-        if result:
-            logging.info(
-                f'Speaker ID: {speaker_id}, Emoji: {emoji}: {evt.result.text}')
-
-    elif evt.result.reason == speechsdk.ResultReason.NoMatch:
-        logging.info('NOMATCH: Speech could not be TRANSCRIBED: {}'.format(
-            evt.result.no_match_details))
+def pull_audio_input_stream_compressed_mp3(mp3_file_path: str,
+                                           default_speech_auth):
+    return compressed_stream_helper(
+        mp3_format(), mp3_file_path, default_speech_auth)
+
+
+def transcribe_files(mp3_file_paths, default_speech_auth, max_sessions=4):
+    """
+    Transcribe `mp3_file_paths` with up to `max_sessions` concurrent sessions and write each
+    transcript next to its recording as `<file>.txt`.
+    """
+    if os.getenv('REALTIME_INPUT', 'mp3').lower() == 'pcm':
+        # decoded once with ffmpeg and pushed as PCM, no GStreamer needed; VAD_TRIM strips silence
+        recordings = [(file_path, partial(pcm_audio_config, file_path, vad.enabled()))
+                      for file_path in mp3_file_paths]
+    else:
+        compressed_format = mp3_format()
+        recordings = [(file_path, partial(compressed_audio_config, compressed_format, file_path))
+                      for file_path in mp3_file_paths]
+
+    with SessionManager(create_speech_config(default_speech_auth), max_sessions) as manager:
+        for session in manager.run_all(recordings):
+            with open(f"{session.name}.txt", "w", encoding="utf8") as f:
+                for speaker_id, emoji, text, _ in session.lines:
+                    f.write(f"{emoji} {speaker_id}: {text}" + os.linesep)
+            logging.info(f"Finished {session.name}: {len(session.lines)} lines"
+                         + (f", error: {session.error}" if session.error else ""))
 
 
 if __name__ == '__main__':
@@ -167,9 +120,11 @@ if __name__ == '__main__':
 
     start_time = time.time()
 
-    # Set your mp3 file path
-    conversationfilename = os.path.join('data', 'short_64k.mp3')
-    pull_audio_input_stream_compressed_mp3(conversationfilename,
-                                           default_speech_auth)
+    # Set your mp3 file paths, or a directory of recordings, on the command line
+    conversationfilenames = []
+    for arg in sys.argv[1:] or [os.path.join('data', 'short_64k.mp3')]:
+        conversationfilenames.extend(sorted(glob.glob(os.path.join(arg, '*.mp3'))) if path.isdir(arg) else [arg])
+    transcribe_files(conversationfilenames, default_speech_auth,
+                     max_sessions=int(os.getenv('CONVERSATION_SESSIONS', '4')))
     end_time = time.time()
     logging.info(f"S2T Time taken: {end_time - start_time} seconds")
@@ -1,28 +1,32 @@
-import io
 import json
 import os
 import logging
+import logqueue
+import threading
 import time
-import speech
+import preprocess
+import profiling
+import telemetry
+import tuning
+from chunk_worker import EncoderPool, encode_segment
+from functools import lru_cache, partial
+from journal import JobJournal
+from membudget import MemoryBudget
 from pydub import AudioSegment
-from pydub.silence import split_on_silence
+from pydub.silence import detect_nonsilent, split_on_silence
 from os import path
 from dotenv import load_dotenv
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
-from azure.storage.blob import BlobServiceClient
-
-# Logging configuration
-for handler in logging.root.handlers[:]:
-    logging.root.removeHandler(handler)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("output.log", encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+from concurrent.futures import ThreadPoolExecutor
+
+# pool processes started with spawn or forkserver re-run this script, so the modules that load
+# the speech and blob clients or numpy (speech, hedging, harvest, router, chunking, vad and the
+# Azure SDK) are imported in the functions that use them; see benchmarks/pool_startup.py
+
+
+def setup_logging():
+    # Logging configuration; records go through a queue to one writer, see logqueue
+    return logqueue.start("output.log")
+
 
 dotenv_path = path.join(path.dirname(__file__), '.env')
 load_dotenv(dotenv_path, override=True)
@@ -32,19 +36,82 @@ speech_endpoint = os.getenv('SPEECH_ENDPOINT')
 connection_string = os.getenv("BLOB_CONNECTION_STRING")
 container_name = os.getenv("BLOB_CONTAINER_NAME")
 env_type = os.getenv('ENV_TYPE', 'dev')
-
-blob_service_client = BlobServiceClient.from_connection_string(
-    connection_string)
-temp_directory = "temp"
+# When set, the service writes results into this container and they are harvested in bulk
+results_container_uri = os.getenv("RESULTS_CONTAINER_URI")
+# When set, chunk transcriptions running past this percentile of finished ones get a duplicate
+hedge_percentile = os.getenv("HEDGE_PERCENTILE")
+# Share of the chunks that may be duplicated at most
+hedge_budget = float(os.getenv("HEDGE_BUDGET", "0.1"))
+# Optional limits in seconds for a single chunk transcription and for the whole S2T stage
+chunk_timeout = float(os.getenv("CHUNK_TIMEOUT")) if os.getenv("CHUNK_TIMEOUT") else None
+batch_timeout = float(os.getenv("BATCH_TIMEOUT")) if os.getenv("BATCH_TIMEOUT") else None
+# "silence" splits with split_on_silence, "fixed" cuts overlapping fixed-length windows,
+# "planned" merges and splits the silence ranges into chunks sized by a calibrated cost model
+chunk_mode = os.getenv("CHUNK_MODE", "silence")
+chunk_target_jobs = int(os.getenv("CHUNK_TARGET_JOBS")) if os.getenv("CHUNK_TARGET_JOBS") else None
+chunk_window_seconds = float(os.getenv("CHUNK_WINDOW_SECONDS", "60"))
+chunk_overlap_seconds = float(os.getenv("CHUNK_OVERLAP_SECONDS", "2"))
+# overlapping windows are stitched with word level timestamps
+word_timestamps = chunk_mode == "fixed"
+# "batch" submits the chunks as batch transcriptions, "realtime" streams them to concurrent
+# real-time conversation transcription sessions instead, "auto" picks the faster one per file
+# with router.LatencyRouter
+transcribe_mode = os.getenv("TRANSCRIBE_MODE", "batch")
+realtime_sessions = int(os.getenv("REALTIME_SESSIONS", "8"))
+
+
+@lru_cache(maxsize=None)
+def get_blob_service_client():
+    # created on first use, so processes that never upload do not build a client
+    from azure.storage.blob import BlobServiceClient
+    return BlobServiceClient.from_connection_string(connection_string)
+
+
+@lru_cache(maxsize=None)
+def get_result_session():
+    # one keep-alive pool for the result downloads of all transcription threads
+    import speech
+    return speech.create_session(tuning.service_quota())
+
+
+# limits concurrent uploads to what the bandwidth can feed; resized by tuning in proc()
+upload_semaphore = threading.Semaphore(tuning.DEFAULT_SIZES.upload_slots)
+
+
+def payload_size(data):
+    """
+    Size in bytes of `data`: bytes, a `BudgetBuffer` or a seekable stream such as `io.BytesIO`.
+    """
+    if hasattr(data, "__len__"):
+        return len(data)
+    if hasattr(data, "getbuffer"):
+        return data.getbuffer().nbytes
+    position = data.tell()
+    size = data.seek(0, os.SEEK_END)
+    data.seek(position)
+    return size
 
 
 def upload_audio_file(audio_data, filename):
-    container_client = blob_service_client.get_container_client(container_name)
+    container_client = get_blob_service_client().get_container_client(container_name)
     blob_client = container_client.get_blob_client(filename)
-    blob_client.upload_blob(audio_data, overwrite=True)
+    with upload_semaphore, telemetry.span("upload", blob=filename), profiling.stage("upload"):
+        blob_client.upload_blob(audio_data, overwrite=True)
+    if telemetry.enabled():
+        telemetry.count("bytes_uploaded", payload_size(audio_data))
+
+
+def delete_blob(filename):
+    from azure.core.exceptions import ResourceNotFoundError
+    container_client = get_blob_service_client().get_container_client(container_name)
+    try:
+        container_client.delete_blob(filename)
+    except ResourceNotFoundError:
+        pass
 
 
 def transcribe_audio_file(blob_url):
+    import speech
     contents = speech.transcribe(blob_url)
     return contents
 
@@ -52,20 +119,152 @@ def transcribe_audio_file(blob_url):
 def extract_recognized_phrases(contents):
     if not contents:
         return []
-    results = json.loads(contents)
+    results = json.loads(contents) if isinstance(contents, str) else contents
     if 'recognizedPhrases' not in results:
         return []
     else:
         return [msg['nBest'][0]['display'] for msg in results['recognizedPhrases'] if msg['recognitionStatus'] == 'Success']
 
 
-def transcribe_chunk(args):
-    i, buffer = args
-    upload_audio_file(buffer, f"chunk{i}.mp3")
-    rtn = transcribe_audio_file(
-        f"https://{blob_service_client.account_name}.blob.core.windows.net/{container_name}/chunk{i}.mp3")
-    extract_transcribe = extract_recognized_phrases(rtn)
-    return extract_transcribe
+def chunk_blob_name(i, prefix=""):
+    return f"{prefix}chunk{i}.mp3"
+
+
+def chunk_url(i, prefix=""):
+    return f"https://{get_blob_service_client().account_name}.blob.core.windows.net/{container_name}/{chunk_blob_name(i, prefix)}"
+
+
+def _release(buffer):
+    if buffer is not None:
+        buffer.close()
+
+
+def _ensure_submitted(journal, source, api, i, buffer, duration_ms, destination_container_url=None, prefix=""):
+    """
+    Upload and submit chunk `i` unless the journal shows it was already done by an earlier run.
+    The encoded `buffer` is released once this returns.
+    """
+    import speech
+    try:
+        entry = journal.get(source, i) or {}
+        # duplicates left running by an interrupted run are not needed any more, unless one of
+        # them won and the journal points at it
+        for duplicate_id in journal.hedges(source, i):
+            if duplicate_id != entry.get("transcription_id"):
+                speech.cancel(api, duplicate_id)
+        journal.clear_hedges(source, i)
+
+        if entry.get("transcription_id") and entry.get("status") not in ("Failed", "Canceled"):
+            if speech.exists(api, entry["transcription_id"]):
+                logging.info(f"Reattaching chunk {i} to transcription {entry['transcription_id']}")
+                return entry["transcription_id"]
+            # deleted or expired on the service; the chunk is still uploaded, so resubmit it
+            logging.info(f"Transcription {entry['transcription_id']} of chunk {i} is gone, resubmitting")
+            entry["status"] = "Failed"
+
+        if entry.get("status") in ("Failed", "Canceled"):
+            telemetry.count("retries", reason="resubmit")
+        if entry.get("status") is None:
+            upload_audio_file(buffer, chunk_blob_name(i, prefix))
+            journal.mark_uploaded(source, i, chunk_blob_name(i, prefix), duration_ms)
+    finally:
+        _release(buffer)
+
+    transcription_id = speech.submit(chunk_url(i, prefix), destination_container_url, api=api,
+                                     word_timestamps=word_timestamps)
+    journal.mark_submitted(source, i, transcription_id)
+    return transcription_id
+
+
+def transcribe_chunk(journal, source, policy, batch_deadline, cancel_event, api, args, prefix=""):
+    """
+    Transcribe chunk `i` and return its parsed result, or None if it failed or ran out of time.
+    Chunks are uploaded as `<prefix>chunk<i>.mp3`.
+    """
+    i, (buffer, duration_ms) = args
+    with telemetry.span("transcribe", source=source, chunk=i, duration_ms=duration_ms):
+        return _transcribe_chunk(journal, source, policy, batch_deadline, cancel_event, api, i, buffer,
+                                 duration_ms, prefix)
+
+
+def _transcribe_chunk(journal, source, policy, batch_deadline, cancel_event, api, i, buffer, duration_ms, prefix):
+    import speech
+    from hedging import wait_hedged
+    entry = journal.get(source, i)
+    if entry and entry["status"] == "Downloaded":
+        return json.loads(entry["result"])
+
+    # chunks that are still queued when the batch runs out of time are not submitted at all
+    deadline = min(filter(None, (batch_deadline, time.time() + chunk_timeout if chunk_timeout else None)),
+                   default=None)
+    if cancel_event.is_set() or (deadline is not None and time.time() >= deadline):
+        _release(buffer)
+        return None
+
+    transcription_id = _ensure_submitted(journal, source, api, i, buffer, duration_ms, prefix=prefix)
+    if policy:
+        transcription = wait_hedged(
+            api, transcription_id, partial(speech.submit, chunk_url(i, prefix), api=api, word_timestamps=word_timestamps), policy,
+            on_status=partial(journal.mark_status, source, i), deadline=deadline, cancel_event=cancel_event,
+            on_hedge=partial(journal.mark_hedged, source, i),
+            # a winning duplicate replaces the original in the journal before the original is deleted
+            on_winner=partial(journal.mark_submitted, source, i))
+        # the duplicate, if any, either won or has been deleted
+        journal.clear_hedges(source, i)
+    else:
+        transcription = speech.wait_for_completion(
+            api, transcription_id, on_status=partial(journal.mark_status, source, i),
+            deadline=deadline, cancel_event=cancel_event)
+
+    if transcription is None:
+        logging.warning(f"Chunk {i} did not finish in time")
+        return None
+
+    if transcription.status != "Succeeded":
+        logging.info(f"Transcription of chunk {i} failed: {transcription.properties.error.message}")
+        return None
+    # the winner of a hedged chunk may be the duplicate
+    winner_id = transcription._self.split("/")[-1]
+    for _, parsed in speech.collect_results(api, winner_id, kinds=("Transcription",), session=get_result_session()):
+        journal.mark_downloaded(source, i, json.dumps(parsed))
+        return parsed
+    return None
+
+
+def harvest_chunks(journal, source, api, chunk_args, workers=5, deadline=None):
+    """
+    Submit all chunks with a destination container and collect their results in one sweep.
+    Returns the parsed result of every chunk; jobs still running at `deadline` are canceled
+    and left out of the sweep.
+    """
+    import speech
+    from harvest import Harvester
+
+    def submit_chunk(args):
+        i, (buffer, duration_ms) = args
+        return _ensure_submitted(journal, source, api, i, buffer, duration_ms, results_container_uri)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        job_ids = list(executor.map(submit_chunk, chunk_args))
+
+    # the jobs run concurrently on the service side, so waiting on them in order is enough
+    results = {job_id: None for job_id in job_ids}
+    pending = []
+    for i, job_id in enumerate(job_ids):
+        entry = journal.get(source, i)
+        if entry["status"] == "Downloaded":
+            results[job_id] = json.loads(entry["result"])
+            continue
+        if speech.wait_for_completion(api, job_id, on_status=partial(journal.mark_status, source, i),
+                                      deadline=deadline):
+            pending.append(job_id)
+
+    for job_id, blob_name, parsed in Harvester(results_container_uri).sweep(pending):
+        # the report blob of a job has no phrases
+        if 'recognizedPhrases' in parsed:
+            results[job_id] = parsed
+            journal.mark_downloaded(source, job_ids.index(job_id), json.dumps(parsed))
+    return [results[job_id] for job_id in job_ids]
 
 
 def remove_temp_files(folder):
@@ -78,22 +277,222 @@ def remove_temp_files(folder):
             print('Failed to delete %s. Reason: %s' % (file_path, e))
 
 
-def process_chunk(args):  # chunk, to_file=False):
-    i, chunk, to_file = args
+def assemble_lines(results, windows=None):
+    """
+    Lines of text of a file from the parsed results of its chunks, in chunk order.
+    """
+    if chunk_mode == "fixed":
+        import chunking
+        import speech
+        return chunking.stitch(windows, results, speech.LOCALE)
+    if chunk_mode == "planned":
+        # planned chunks span several phrases
+        return [phrase for result in results for phrase in extract_recognized_phrases(result)]
+    return [phrases[0] for phrases in map(extract_recognized_phrases, results) if phrases]
+
+
+def split_audio(audio, journal, source=None, concurrency=None):
+    """
+    Split `audio` with the chunker selected by CHUNK_MODE. Returns the chunks and the windows
+    of the fixed chunker (or None). The planned chunker sizes the chunks for `concurrency`
+    transcriptions in flight, by default `tuning.transcribe_workers()`, saves its plan under
+    `source` in the journal and replays it on resume.
+    """
+    import chunking
+    windows = None
+    if chunk_mode == "fixed":
+        windows = chunking.fixed_windows(audio, window_ms=int(chunk_window_seconds * 1000),
+                                         overlap_ms=int(chunk_overlap_seconds * 1000))
+        chunks = [audio[window.start_ms:window.end_ms] for window in windows]
+    elif chunk_mode == "planned":
+        # chunk sizes are tuned with the timings of earlier runs recorded in the journal; those
+        # change between runs, so a resumed run reuses the plan its journaled chunks belong to
+        spans = journal.plan(source) if source else None
+        if spans is None:
+            model = chunking.CostModel.calibrate(journal.timings())
+            spans = chunking.ChunkPlanner(audio).optimize(model, concurrency or tuning.transcribe_workers(),
+                                                          target_jobs=chunk_target_jobs)
+            if source:
+                journal.save_plan(source, spans)
+        chunks = [audio[start:end] for start, end in spans]
+    else:
+        # 1s == 1000 ms
+        chunks = split_on_silence(audio, min_silence_len=2000, silence_thresh=-32)
+    return chunks, windows
+
 
-    if to_file:
-        chunk.export(f"{temp_directory}/chunk{i}.mp3", format="mp3")
+def load_audio(file_path):
+    """
+    Decode `file_path` and apply the optional preprocessing and VAD trim. Returns the audio and
+    the preprocessing codec (or None).
+    """
+    # https://unix.stackexchange.com/questions/545946/trim-an-audio-file-into-multiple-segments-using-ffmpeg-with-a-single-command
+    with telemetry.span("decode", file=file_path), profiling.stage("decode"):
+        audio = AudioSegment.from_mp3(file_path, parameters=["-c", "copy"])
+    print(f"Transcribing audio {len(audio)}")
 
-    buffer = io.BytesIO()
-    chunk.export(buffer, format="mp3")
-    buffer_copy = io.BytesIO(buffer.getvalue())
-    # initial position of read/write pointer at the beginning of the buffer
-    buffer.seek(0)
-    buffer.truncate(0)
-    return buffer_copy
+    # optional 16 kHz mono downmix; chunks are then encoded at a speech bitrate
+    codec = preprocess.enabled_codec()
+    if codec:
+        audio = preprocess.downmix(audio)
+
+    # optional voice-activity trimming; only the text is written, so the offset map is not needed
+    import vad
+    if vad.enabled():
+        audio, _ = vad.trim(audio)
+        logging.info(f"VAD kept {len(audio) / 1000:.1f}s of audio")
+    return audio, codec
+
+
+def journal_source(file_path, name=None):
+    """
+    Journal key of the recording at `file_path`, named by its absolute path unless `name` is
+    given. Chunk indexes only match between runs with the same chunker on the same audio, so
+    the chunker and the size and modification time of the file are part of the key.
+    """
+    try:
+        stat = os.stat(file_path)
+        stamp = f"{stat.st_size}-{stat.st_mtime_ns}"
+    except OSError:
+        # the recording fails to load anyway
+        stamp = "missing"
+    return f"{name or os.path.abspath(file_path)}#{chunk_mode}#{stamp}"
+
+
+def discard_changed(journal, source, chunks):
+    """
+    Drop the journal entries of `source` whose recorded duration differs from the chunk now at
+    their index, e.g. after the VAD, preprocessing or window settings changed the boundaries.
+    Those chunks are uploaded and transcribed again.
+    """
+    for entry in journal.chunks(source):
+        i = entry["idx"]
+        if entry["duration_ms"] is None:
+            continue
+        if i >= len(chunks) or round(entry["duration_ms"]) != len(chunks[i]):
+            logging.info(f"Chunk {i} of {source} changed since the last run, transcribing it again")
+            journal.discard(source, i)
+
+
+def load_chunks(file_path, journal, source=None, concurrency=None):
+    """
+    Decode `file_path`, apply the optional preprocessing and VAD trim, and split it with the
+    configured chunker. Returns the chunks, the windows of the fixed chunker (or None) and the
+    preprocessing codec (or None). `source` is the journal key of the recording; journaled
+    chunks that no longer match are discarded. `concurrency` is passed to `split_audio`.
+    """
+    audio, codec = load_audio(file_path)
+    with telemetry.span("split", file=file_path, mode=chunk_mode) as span, profiling.stage("chunking"):
+        chunks, windows = split_audio(audio, journal, source, concurrency)
+        span.set(chunks=len(chunks))
+    if source:
+        discard_changed(journal, source, chunks)
+    return chunks, windows, codec
+
+
+def silence_spans(audio, min_silence_len=2000, silence_thresh=-32, keep_silence=100):
+    """
+    The (start_ms, end_ms) ranges of the chunks `split_on_silence` cuts with the same settings.
+    """
+    spans = [[max(0, start - keep_silence), min(len(audio), end + keep_silence)]
+             for start, end in detect_nonsilent(audio, min_silence_len, silence_thresh)]
+    for previous, following in zip(spans, spans[1:]):
+        # padding never makes neighbours overlap, they meet halfway
+        if previous[1] > following[0]:
+            previous[1] = following[0] = (previous[1] + following[0]) // 2
+    return [(start, end) for start, end in spans]
+
+
+def transcribe_realtime(audio, sessions=8, cancel_event=None):
+    """
+    Transcribe the silence-split chunks of `audio` with up to `sessions` concurrent real-time
+    conversation sessions fed from push streams. Skips the batch queue, so short and medium
+    recordings finish much sooner. Returns the lines of text ordered by their offset in `audio`.
+    Setting `cancel_event` drops the chunks that have not started yet.
+    """
+    # the Speech SDK is only needed in this mode
+    import azure.cognitiveservices.speech as speechsdk
+    import vad
+    from audio_streams import segment_audio_config
+    from conversation import SessionManager
+
+    speech_config = speechsdk.SpeechConfig(subscription=speech_subscription_key,
+                                           region=os.getenv("SPEECH_SERVICE_REGION"))
+    speech_config.speech_recognition_language = os.getenv("LOCALE")
+
+    spans = silence_spans(audio)
+    starts = {f"chunk{i}": start for i, (start, _) in enumerate(spans)}
+    recordings = [(f"chunk{i}", partial(segment_audio_config, audio[start:end]))
+                  for i, (start, end) in enumerate(spans)]
+    print(f"Transcribing {len(spans)} chunks in real time")
+
+    lines = []
+    with SessionManager(speech_config, max_sessions=sessions, timeout=chunk_timeout) as manager:
+        for session in manager.run_all(recordings):
+            if cancel_event and cancel_event.is_set():
+                manager.shutdown(cancel_futures=True)
+                break
+            if session.error:
+                logging.warning(f"{session.name} did not finish: {session.error}")
+            # speaker ids are per session, so only the text is kept
+            lines.extend((starts[session.name] + offset / vad.TICKS_PER_MS, text)
+                         for _, _, text, offset in session.lines)
+    return [text for _, text in sorted(lines)]
+
+
+def _record_encode(i, start, future):
+    telemetry.record_span("encode", start, time.time(), chunk=i)
+
+
+def encoded_chunks(encoder, chunks, needed, budget, ahead, start_time, prefix=""):
+    """
+    Yield (i, (buffer, duration_ms)) for every chunk in order, with at most `ahead` chunks being
+    encoded at a time. Chunks not in `needed` were uploaded by an earlier run and get no buffer.
+    Storing a buffer blocks while `budget` is exhausted. `prefix` is the blob name prefix of the
+    recording, also used for the encoder's temp files.
+    """
+    futures = {}
+    pending = iter(sorted(needed))
+    for i, chunk in enumerate(chunks):
+        while len(futures) < ahead:
+            j = next(pending, None)
+            if j is None:
+                break
+            futures[j] = encoder.submit(j, chunks[j], prefix)
+            if telemetry.enabled():
+                # the span covers the wait for a free worker as well as the encoding
+                futures[j].add_done_callback(partial(_record_encode, j, time.time()))
+
+        buffer = budget.store(futures.pop(i).result()) if i in futures else None
+        yield i, (buffer, len(chunk))
+
+    logging.info(f"Chunks Time taken: {time.time() - start_time} seconds")
+
+
+def tune_pools(blob_name, chunks, durations):
+    """
+    Pool sizes for this run; fixed defaults unless AUTO_TUNE is set.
+    """
+    global upload_semaphore
+    if not tuning.enabled():
+        return tuning.DEFAULT_SIZES
+
+    encode_rate = upload_mbps = None
+    if tuning.calibration_enabled() and chunks:
+        encode_rate = tuning.calibrate_encode(chunks[0], encode_segment)
+        upload_mbps = tuning.calibrate_upload(lambda data: upload_audio_file(data, "tuning-probe.bin"),
+                                              cleanup=partial(delete_blob, "tuning-probe.bin"))
+
+    sizes = tuning.auto_tune(durations, encode_rate, upload_mbps)
+    tuning.record(sizes, f"{blob_name}.tuning.json", cpu_count=os.cpu_count(), chunks=len(chunks),
+                  encode_seconds_per_audio_second=encode_rate, upload_mbps=upload_mbps,
+                  quota=tuning.service_quota())
+    upload_semaphore = threading.Semaphore(sizes.upload_slots)
+    return sizes
 
 
 def proc():
+    import router
     # Set the file path and blob name
     file_path = os.path.join(
         "data", "sample_64k.mp3")
@@ -101,44 +500,101 @@ def proc():
 
     # remove_temp_files(temp_directory)
 
+    # chunks uploaded by an earlier, interrupted run of the same file are not encoded again
+    # JOURNAL_FILE shares one journal across recordings, which also gives router.py the history
+    # and in-flight load of all of them
+    journal = JobJournal(os.getenv("JOURNAL_FILE") or f"{blob_name}.journal.db")
+    source = journal_source(file_path, blob_name)
+
     start_time = time.time()
-    # https://unix.stackexchange.com/questions/545946/trim-an-audio-file-into-multiple-segments-using-ffmpeg-with-a-single-command
-    audio = AudioSegment.from_mp3(file_path, parameters=["-c", "copy"])
-    print(f"Transcribing audio {len(audio)}")
+    route = None
+    mode = transcribe_mode
+    if mode == "auto":
+        route = router.LatencyRouter.from_journal(journal, tuning.service_quota(), realtime_sessions).route(
+            file_path, router.probe_duration_ms(file_path), word_timestamps=word_timestamps)
+        mode = route.mode
+
+    error = None
+    try:
+        if mode == "realtime":
+            proc_realtime(file_path, blob_name)
+        else:
+            proc_batch(file_path, blob_name, journal, source, start_time)
+    except BaseException as e:
+        error = repr(e)
+        raise
+    finally:
+        journal.close()
+        telemetry.export()
+        end_time = time.time()
+        if route:
+            router.record(route, end_time - start_time, error)
 
-    # 1s == 1000 ms
-    chunks = split_on_silence(audio, min_silence_len=2000, silence_thresh=-32)
+    logging.info(f"S2T Time taken: {end_time - start_time} seconds")
 
-    # Create a ThreadPoolExecutor and process the chunks in parallel
-    logging.getLogger().setLevel(logging.WARNING)
 
-    with ProcessPoolExecutor(max_workers=4) as executor:
-        args_list = [(i, chunk, True) for i, chunk in enumerate(chunks)]
-        buffers = list(executor.map(process_chunk, args_list))
+def proc_realtime(file_path, blob_name):
+    audio, _ = load_audio(file_path)
+    lines = transcribe_realtime(audio, realtime_sessions)
+    with open(f"{blob_name}.txt", "w", encoding="utf8") as f:
+        for line in lines:
+            f.write(line + os.linesep)
 
-    end_time = time.time()
 
-    logging.getLogger().setLevel(logging.INFO)
-    logging.info(f"Chunks Time taken: {end_time - start_time} seconds")
-    logging.getLogger().setLevel(logging.WARNING)
+def proc_batch(file_path, blob_name, journal, source, start_time):
+    import speech
+    from hedging import HedgePolicy
+    chunks, windows, codec = load_chunks(file_path, journal, source)
+    durations = [len(chunk) for chunk in chunks]
+    sizes = tune_pools(blob_name, chunks, durations)
 
-    start_time = time.time()
     # Create a ThreadPoolExecutor and process the chunks in parallel
-    print(f"Transcribing {len(buffers)} chunks")
-    with open(f"{blob_name}.txt", "w", encoding="utf8") as f:
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            # executor.submit does not guarantee any specific order in which the results are returned.
-            # tasks = [executor.submit(transcribe_chunk, i, bytes) for i, bytes in enumerate(buffers)]
-            tasks = list(executor.map(transcribe_chunk, enumerate(buffers)))
-            for result in tasks:
-                if len(result) > 0:
-                    f.write(result[0] + os.linesep)
-
-    end_time = time.time()
-
-    logging.getLogger().setLevel(logging.INFO)
-    logging.info(f"S2T Time taken: {end_time - start_time} seconds")
+    # Encoding and transcription overlap: chunks are handed to the transcription threads as
+    # they are encoded, and encoding pauses while the memory budget is exhausted.
+    budget = MemoryBudget()
+    needed = {i for i in range(len(chunks)) if journal.get(source, i) is None}
+
+    print(f"Transcribing {len(chunks)} chunks")
+    # workers only import chunk_worker and stay alive for all chunks; see chunk_worker.EncoderPool
+    with EncoderPool(max_workers=sizes.encode_workers, bitrate=preprocess.CHUNK_BITRATE if codec else 128, to_file=True,
+                     log_queue=logqueue.queue()) as encoder, \
+            open(f"{blob_name}.txt", "w", encoding="utf8") as f:
+        chunk_args = encoded_chunks(encoder, chunks, needed, budget, ahead=sizes.encode_workers * 2,
+                                    start_time=start_time)
+        batch_deadline = time.time() + batch_timeout if batch_timeout else None
+        # one client shared by all transcription threads, its connection pool sized to match
+        api = speech.create_api(pool_maxsize=sizes.connection_pool_maxsize)
+        if results_container_uri:
+            tasks = harvest_chunks(journal, source, api, chunk_args, sizes.transcribe_workers, batch_deadline)
+        else:
+            policy = None
+            if hedge_percentile:
+                policy = HedgePolicy(percentile=float(hedge_percentile),
+                                     max_duplicates=max(1, int(len(chunks) * hedge_budget)))
+            cancel_event = threading.Event()
+            with ThreadPoolExecutor(max_workers=sizes.transcribe_workers) as executor:
+                # executor.submit does not guarantee any specific order in which the results are returned.
+                # tasks = [executor.submit(transcribe_chunk, i, bytes) for i, bytes in enumerate(buffers)]
+                try:
+                    tasks = list(executor.map(
+                        partial(transcribe_chunk, journal, source, policy, batch_deadline, cancel_event, api),
+                        chunk_args))
+                except KeyboardInterrupt:
+                    # stop polling and delete the running jobs; finished chunks stay in the journal
+                    cancel_event.set()
+                    raise
+
+        if codec and needed:
+            preprocess.report_reduction(os.path.getsize(file_path), budget.stored_bytes)
+        logging.info(f"Peak chunk memory {budget.peak_bytes / 1024 / 1024:.1f} MiB, "
+                     f"{budget.spilled_bytes / 1024 / 1024:.1f} MiB spilled to disk")
+
+        for line in assemble_lines(tasks, windows):
+            f.write(line + os.linesep)
 
 
 if __name__ == '__main__':
+    setup_logging()
+    telemetry.configure()
+    profiling.configure()
     proc()
@@ -1,24 +1,21 @@
 from azure.storage.blob import BlobServiceClient
 import speech
+import preprocess
+import profiling
+import telemetry
+import vad
+from pydub import AudioSegment
 from dotenv import load_dotenv
 from os import path
 import os
+import io
 import json
 import logging
+import logqueue
 import time
 
-# Logging configuration
-for handler in logging.root.handlers[:]:
-    logging.root.removeHandler(handler)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("output3.log", encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# Logging configuration; records go through a queue to one writer, see logqueue
+logqueue.start("output3.log")
 
 
 dotenv_path = path.join(path.dirname(__file__), '.env')
@@ -68,14 +65,34 @@ def main():
     # file_path = os.path.join('data', 'short_64k.mp3')
     filename = os.path.basename(file_path)
 
-    with open(file_path, 'rb') as audio_data:
-        upload_audio_file(audio_data, filename)
+    offset_map = None
+    if vad.enabled():
+        # cut non-speech spans; result offsets are mapped back to the original file below
+        audio = AudioSegment.from_file(file_path)
+        trimmed, offset_map = vad.trim(audio)
+        logging.info(f"VAD kept {len(trimmed) / 1000:.1f}s of {len(audio) / 1000:.1f}s")
+        source = io.BytesIO()
+        trimmed.export(source, format="mp3")
+        source.seek(0)
+    else:
+        source = open(file_path, 'rb')
+
+    codec = preprocess.enabled_codec()
+    with source:
+        if codec:
+            audio_data, extension = preprocess.preprocess_file(source, codec)
+            filename = path.splitext(filename)[0] + extension
+            upload_audio_file(audio_data, filename)
+        else:
+            upload_audio_file(source, filename)
 
     primary_endpoint = f"https://{blob_service_client.account_name}.blob.core.windows.net"
     blob_url = f"{primary_endpoint}/{container_name}/{filename}"
 
     print(blob_url, filename)
     contents = transcribe_audio_file(blob_url)
+    if offset_map and isinstance(contents, str):
+        contents = json.dumps(vad.remap_result(json.loads(contents), offset_map), ensure_ascii=False, indent=2)
 
     if contents:
         # check if contents is a list
@@ -98,7 +115,10 @@ def main():
 
 
 if __name__ == '__main__':
+    telemetry.configure()
+    profiling.configure()
     start_time = time.time()
     main()
+    telemetry.export()
     end_time = time.time()
     logging.info(f"S2T Time taken: {end_time - start_time} seconds")
@@ -0,0 +1,163 @@
+"""
+Concurrent real-time conversation transcription sessions.
+
+A `ConversationSession` runs one `ConversationTranscriber` with its own transcript and speaker
+map, and signals completion through a `threading.Event` set by the SDK's session_stopped and
+canceled callbacks instead of a sleep loop. `SessionManager` runs up to `max_sessions` of them
+at once and hands back a future per recording, so a directory of recordings takes roughly
+1/N of the sequential time.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import azure.cognitiveservices.speech as speechsdk
+
+EMOJIS = ['😀', '😁', '😂', '🤣', '😃', '😄', '😅', '😆']
+
+
+class SpeakerMap:
+    """
+    Assigns each speaker id of one session an emoji, in order of first appearance.
+    """
+
+    def __init__(self, emojis=EMOJIS):
+        self.emojis = emojis
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def emoji(self, speaker_id):
+        with self._lock:
+            index = self._indexes.setdefault(speaker_id, len(self._indexes))
+        return self.emojis[index % len(self.emojis)]
+
+
+class ConversationSession:
+    """
+    One recording transcribed by its own `ConversationTranscriber`. `lines` collects
+    (speaker id, emoji, text, offset in ticks) tuples; `on_line(session, line)` is called for
+    each of them on the SDK's callback thread.
+    """
+
+    def __init__(self, name, speech_config, audio_config, on_line=None):
+        self.name = name
+        self.speakers = SpeakerMap()
+        self.lines = []
+        self.error = None
+        self.done = threading.Event()
+        self.on_line = on_line
+        self.transcriber = speechsdk.transcription.ConversationTranscriber(
+            speech_config=speech_config, audio_config=audio_config)
+
+        self.transcriber.transcribed.connect(self._transcribed)
+        self.transcriber.session_started.connect(
+            lambda evt: logging.info(f'[{self.name}] SESSION STARTED: {evt.session_id}'))
+        self.transcriber.session_stopped.connect(self._stopped)
+        self.transcriber.canceled.connect(self._canceled)
+
+    def _transcribed(self, evt):
+        if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech:
+            if not evt.result.text:
+                return
+            speaker_id = evt.result.speaker_id
+            line = (speaker_id, self.speakers.emoji(speaker_id), evt.result.text, evt.result.offset)
+            self.lines.append(line)
+            logging.info(f'[{self.name}] Speaker ID: {speaker_id}, Emoji: {line[1]}: {evt.result.text}')
+            if self.on_line:
+                self.on_line(self, line)
+        elif evt.result.reason == speechsdk.ResultReason.NoMatch:
+            logging.info(f'[{self.name}] NOMATCH: Speech could not be TRANSCRIBED: {evt.result.no_match_details}')
+
+    def _stopped(self, evt):
+        logging.info(f'[{self.name}] SESSION STOPPED {evt.session_id}')
+        self.done.set()
+
+    def _canceled(self, evt):
+        details = evt.cancellation_details
+        # the end of the audio also cancels the session, only errors are failures
+        if details.reason == speechsdk.CancellationReason.Error:
+            self.error = details.error_details
+            logging.error(f'[{self.name}] CANCELED {evt.session_id}: {details.error_details}')
+        else:
+            logging.info(f'[{self.name}] CANCELED {evt.session_id}')
+        self.done.set()
+
+    def run(self, timeout=None):
+        """
+        Transcribe until the session stops, is canceled or `timeout` seconds pass. Returns self.
+        """
+        self.transcriber.start_transcribing_async().get()
+        if not self.done.wait(timeout):
+            self.error = f"timed out after {timeout} seconds"
+        self.transcriber.stop_transcribing_async().get()
+        return self
+
+
+class FailedSession:
+    """
+    Stands in for a `ConversationSession` that could not be created, e.g. because its audio
+    could not be opened.
+    """
+
+    def __init__(self, name, error):
+        self.name = name
+        self.speakers = SpeakerMap()
+        self.lines = []
+        self.error = error
+
+
+class SessionManager:
+    """
+    Runs up to `max_sessions` conversation sessions concurrently.
+
+        with SessionManager(speech_config, max_sessions=4) as manager:
+            futures = [manager.submit(path, lambda: audio_config_for(path)) for path in paths]
+    """
+
+    def __init__(self, speech_config, max_sessions=4, timeout=None):
+        self.speech_config = speech_config
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_sessions, thread_name_prefix="session")
+
+    def _run(self, name, make_audio_config, on_line):
+        # the audio is opened only once a session slot is free
+        try:
+            session = ConversationSession(name, self.speech_config, make_audio_config(), on_line)
+        except Exception as ex:
+            logging.error(f'[{name}] could not start: {ex}')
+            return FailedSession(name, repr(ex))
+        # one failing recording must not stop the others
+        try:
+            return session.run(self.timeout)
+        except Exception as ex:
+            logging.error(f'[{name}] failed: {ex}')
+            session.error = repr(ex)
+            return session
+
+    def submit(self, name, make_audio_config, on_line=None):
+        """
+        Queue the recording `name`; `make_audio_config()` returns its `AudioConfig`. Returns a
+        future of the finished `ConversationSession`, or of a `FailedSession`. Errors are kept
+        in the session's `error` rather than raised.
+        """
+        return self._executor.submit(self._run, name, make_audio_config, on_line)
+
+    def run_all(self, recordings, on_line=None):
+        """
+        Transcribe (name, make_audio_config) pairs and yield the sessions as they finish, also
+        those that failed.
+        """
+        futures = [self.submit(name, make_audio_config, on_line) for name, make_audio_config in recordings]
+        for future in as_completed(futures):
+            yield future.result()
+
+    def shutdown(self, cancel_futures=False):
+        """
+        Wait for the running sessions; with `cancel_futures` the queued ones never start.
+        """
+        self._executor.shutdown(cancel_futures=cancel_futures)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
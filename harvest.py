@@ -0,0 +1,79 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from azure.storage.blob import ContainerClient
+
+
+class Harvester:
+    """
+    Collects transcription results that the service wrote into our own container
+    (`properties.destination_container_url`). A single blob listing covers all jobs, and blobs
+    already present in `out_dir` with the same size are read from disk instead of downloaded
+    again.
+    """
+
+    def __init__(self, container_uri: str, out_dir="results", max_workers=8):
+        self.container_client = ContainerClient.from_container_url(container_uri)
+        self.out_dir = out_dir
+        self.max_workers = max_workers
+
+    def _local_path(self, blob_name):
+        return os.path.join(self.out_dir, *blob_name.split("/"))
+
+    def _is_pulled(self, blob):
+        local_path = self._local_path(blob.name)
+        return os.path.isfile(local_path) and os.path.getsize(local_path) == blob.size
+
+    def _job_of(self, blob_name, job_ids):
+        # result blobs are stored below a folder named after the transcription id
+        for part in blob_name.split("/"):
+            if part in job_ids:
+                return part
+        return None
+
+    def _download(self, blob_name):
+        local_path = self._local_path(blob_name)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+
+        data = self.container_client.download_blob(blob_name).readall()
+        # write to a temporary name first so an interrupted sweep never leaves a partial file
+        with open(f"{local_path}.part", "wb") as f:
+            f.write(data)
+        os.replace(f"{local_path}.part", local_path)
+        return data
+
+    def _read_local(self, blob_name):
+        with open(self._local_path(blob_name), "rb") as f:
+            return f.read()
+
+    def sweep(self, job_ids):
+        """
+        List the container once and download every new result blob of `job_ids` in parallel.
+        Yields (job id, blob name, parsed result) as each download finishes. Blobs pulled by an
+        earlier, interrupted sweep are yielded from disk as well, so their results still reach
+        the caller.
+        """
+        job_ids = set(job_ids)
+        pending = []
+        pulled = 0
+        for blob in self.container_client.list_blobs():
+            job_id = self._job_of(blob.name, job_ids)
+            if job_id is None or not blob.name.endswith(".json"):
+                continue
+            if self._is_pulled(blob):
+                pulled += 1
+                pending.append((job_id, blob.name, self._read_local))
+            else:
+                pending.append((job_id, blob.name, self._download))
+
+        logging.info(f"Harvesting {len(pending) - pulled} result blobs ({pulled} already pulled)")
+        if not pending:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            tasks = {executor.submit(fetch, blob_name): (job_id, blob_name)
+                     for job_id, blob_name, fetch in pending}
+            for task in as_completed(tasks):
+                job_id, blob_name = tasks[task]
+                yield job_id, blob_name, json.loads(task.result().decode('utf-8'))
@@ -0,0 +1,116 @@
+import logging
+import math
+import threading
+import time
+import speech
+import telemetry
+
+
+class HedgePolicy:
+    """
+    Decides when a slow transcription gets a duplicate.
+
+    Durations of finished jobs are tracked, and once at least `min_samples` are known a job still
+    running past the `percentile` of that distribution (times `slack`) is considered a straggler.
+    At most `max_duplicates` duplicates are submitted over the lifetime of the policy, which caps
+    the extra transcription cost.
+    """
+
+    def __init__(self, percentile=0.9, min_samples=5, slack=1.0, max_duplicates=1):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.slack = slack
+        self.max_duplicates = max_duplicates
+        self.duplicates = 0
+        self._durations = []
+        self._lock = threading.Lock()
+
+    def record(self, duration):
+        with self._lock:
+            self._durations.append(duration)
+
+    def threshold(self):
+        """
+        Return the straggler threshold in seconds, or None while there are too few samples.
+        """
+        with self._lock:
+            if len(self._durations) < self.min_samples:
+                return None
+            durations = sorted(self._durations)
+        index = min(len(durations) - 1, math.ceil(self.percentile * len(durations)) - 1)
+        return durations[index] * self.slack
+
+    def try_hedge(self, elapsed):
+        """
+        Return True and consume one duplicate from the budget if a job running for `elapsed`
+        seconds should be duplicated.
+        """
+        threshold = self.threshold()
+        if threshold is None or elapsed <= threshold:
+            return False
+        with self._lock:
+            if self.duplicates >= self.max_duplicates:
+                return False
+            self.duplicates += 1
+            return True
+
+
+def wait_hedged(api, transcription_id, resubmit, policy: HedgePolicy, on_status=None, poll_interval=None,
+                deadline=None, cancel_event=None, on_hedge=None, on_winner=None):
+    """
+    Poll `transcription_id` like `speech.wait_for_completion`, but once it turns into a straggler
+    according to `policy`, call `resubmit()` to create a duplicate job. Whichever job succeeds
+    first is returned and the other one is deleted. On `deadline` or `cancel_event` all jobs are
+    deleted and None is returned. `poll_interval` defaults to `speech.POLL_INTERVAL`.
+    `on_hedge` is called with the id of the duplicate as soon as it is created, so it can be
+    recorded and deleted later if the caller dies before the jobs settle. `on_winner` is called
+    with the id of the duplicate when it wins, before the original is deleted.
+    """
+    poll_interval = poll_interval or speech.POLL_INTERVAL
+    start_time = time.time()
+    jobs = [transcription_id]
+    last_status = None
+    failed = None
+    hedged = False
+
+    while True:
+        if not speech.pause(poll_interval, deadline, cancel_event):
+            for job_id in jobs:
+                speech.cancel(api, job_id)
+            if on_status:
+                on_status("Canceled")
+            return None
+
+        for job_id in list(jobs):
+            transcription = api.transcriptions_get(job_id)
+            telemetry.count("api_calls", operation="get")
+            telemetry.count("polls")
+
+            if job_id == transcription_id and on_status and transcription.status != last_status:
+                on_status(transcription.status)
+                last_status = transcription.status
+
+            if transcription.status == "Succeeded":
+                policy.record(time.time() - start_time)
+                if job_id != transcription_id and on_winner:
+                    on_winner(job_id)
+                for loser in jobs:
+                    if loser != job_id:
+                        speech.cancel(api, loser)
+                return transcription
+
+            if transcription.status == "Failed":
+                jobs.remove(job_id)
+                failed = transcription
+
+        if not jobs:
+            return failed
+
+        if not hedged and policy.try_hedge(time.time() - start_time):
+            hedged = True
+            duplicate_id = resubmit()
+            if on_hedge:
+                on_hedge(duplicate_id)
+            telemetry.count("retries", reason="hedge")
+            logging.info(f"Transcription {transcription_id} is a straggler, hedging with {duplicate_id}")
+            jobs.append(duplicate_id)
@@ -0,0 +1,177 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class JobJournal:
+    """
+    Durable record of the chunks of a batch run, stored in SQLite.
+
+    Every chunk is keyed by its source file and chunk index. The journal keeps whether the chunk
+    was uploaded, the transcription id returned in the `location` header, the latest status and
+    the downloaded result, so a restarted run can reattach to in-flight transcriptions and skip
+    completed chunks instead of submitting everything again.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                source TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                blob TEXT,
+                duration_ms REAL,
+                transcription_id TEXT,
+                status TEXT,
+                result TEXT,
+                updated REAL,
+                PRIMARY KEY (source, idx)
+            )""")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                source TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                transcription_id TEXT,
+                status TEXT NOT NULL,
+                at REAL NOT NULL
+            )""")
+        # duplicates submitted by hedging, until the chunk settles
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS hedges (
+                source TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                transcription_id TEXT NOT NULL
+            )""")
+        # chunk spans of the planned chunker, which depend on the timings at planning time
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS plans (
+                source TEXT PRIMARY KEY,
+                spans TEXT NOT NULL
+            )""")
+        # journals written before chunk durations were recorded
+        columns = [row["name"] for row in self._conn.execute("PRAGMA table_info(chunks)")]
+        if "duration_ms" not in columns:
+            self._conn.execute("ALTER TABLE chunks ADD COLUMN duration_ms REAL")
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _record(self, source, idx, status, transcription_id=None, **fields):
+        now = time.time()
+        columns = dict(fields, status=status, updated=now)
+        if transcription_id is not None:
+            columns["transcription_id"] = transcription_id
+        assignments = ", ".join(f"{name} = ?" for name in columns)
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("INSERT OR IGNORE INTO chunks (source, idx) VALUES (?, ?)", (source, idx))
+            self._conn.execute(f"UPDATE chunks SET {assignments} WHERE source = ? AND idx = ?",
+                               (*columns.values(), source, idx))
+            self._conn.execute("INSERT INTO events SELECT source, idx, transcription_id, ?, ? FROM chunks "
+                               "WHERE source = ? AND idx = ?", (status, now, source, idx))
+            self._conn.execute("COMMIT")
+
+    def get(self, source, idx):
+        rows = self._execute("SELECT * FROM chunks WHERE source = ? AND idx = ?", (source, idx))
+        return dict(rows[0]) if rows else None
+
+    def chunks(self, source):
+        return [dict(row) for row in self._execute(
+            "SELECT * FROM chunks WHERE source = ? ORDER BY idx", (source,))]
+
+    def events(self, source=None):
+        if source is None:
+            return [dict(row) for row in self._execute("SELECT * FROM events ORDER BY at")]
+        return [dict(row) for row in self._execute(
+            "SELECT * FROM events WHERE source = ? ORDER BY at", (source,))]
+
+    def timings(self):
+        """
+        (audio duration in ms, seconds from submission to downloaded result) of every chunk that
+        completed, across all sources. Used to calibrate `chunking.CostModel`.
+        """
+        rows = self._execute("""
+            SELECT c.duration_ms,
+                   MAX(CASE WHEN e.status = 'Downloaded' THEN e.at END)
+                   - MIN(CASE WHEN e.status = 'Submitted' THEN e.at END) AS elapsed
+            FROM chunks c JOIN events e ON c.source = e.source AND c.idx = e.idx
+            WHERE c.duration_ms IS NOT NULL
+            GROUP BY c.source, c.idx""")
+        return [(row["duration_ms"], row["elapsed"]) for row in rows if row["elapsed"] is not None]
+
+    def queue_waits(self, since=None):
+        """
+        Seconds every transcription waited between submission and running on the service,
+        across all sources; only those submitted after `since` when given.
+        """
+        rows = self._execute("""
+            SELECT MIN(CASE WHEN status = 'Submitted' THEN at END) AS submitted,
+                   MIN(CASE WHEN status = 'Running' THEN at END) AS running
+            FROM events
+            WHERE transcription_id IS NOT NULL
+            GROUP BY source, idx, transcription_id""")
+        return [row["running"] - row["submitted"] for row in rows
+                if row["submitted"] is not None and row["running"] is not None
+                and (since is None or row["submitted"] >= since)]
+
+    def in_flight(self, since=None):
+        """
+        Number of chunks submitted but not yet finished, updated after `since` when given, so
+        chunks of abandoned runs can be left out.
+        """
+        rows = self._execute(
+            "SELECT COUNT(*) AS n FROM chunks WHERE status IN ('Submitted', 'NotStarted', 'Running') "
+            "AND updated >= ?", (since or 0,))
+        return rows[0]["n"]
+
+    def mark_uploaded(self, source, idx, blob, duration_ms=None):
+        self._record(source, idx, "Uploaded", blob=blob, result=None, duration_ms=duration_ms)
+
+    def mark_submitted(self, source, idx, transcription_id):
+        self._record(source, idx, "Submitted", transcription_id)
+
+    def mark_status(self, source, idx, status):
+        self._record(source, idx, status)
+
+    def mark_downloaded(self, source, idx, result):
+        self._record(source, idx, "Downloaded", result=result)
+
+    def discard(self, source, idx):
+        """
+        Forget chunk `idx` of `source`, so it is uploaded and submitted again. Its hedges are kept
+        until then, so they are still deleted on the service.
+        """
+        self._execute("DELETE FROM chunks WHERE source = ? AND idx = ?", (source, idx))
+
+    def plan(self, source):
+        """
+        The (start_ms, end_ms) chunk spans saved for `source`, or None.
+        """
+        rows = self._execute("SELECT spans FROM plans WHERE source = ?", (source,))
+        return [tuple(span) for span in json.loads(rows[0]["spans"])] if rows else None
+
+    def save_plan(self, source, spans):
+        self._execute("INSERT OR REPLACE INTO plans VALUES (?, ?)", (source, json.dumps(list(spans))))
+
+    def mark_hedged(self, source, idx, transcription_id):
+        self._execute("INSERT INTO hedges VALUES (?, ?, ?)", (source, idx, transcription_id))
+
+    def hedges(self, source, idx):
+        """
+        Duplicate transcriptions of the chunk that were not cleaned up, e.g. after a crash.
+        """
+        return [row["transcription_id"] for row in self._execute(
+            "SELECT transcription_id FROM hedges WHERE source = ? AND idx = ?", (source, idx))]
+
+    def clear_hedges(self, source, idx):
+        self._execute("DELETE FROM hedges WHERE source = ? AND idx = ?", (source, idx))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,86 @@
+"""
+Queue-based logging for the entry points, their pool workers and Speech SDK callbacks.
+
+`start` puts a `QueueHandler` on the root logger and moves the file and console handlers
+behind a `QueueListener` thread, so a log call only enqueues the record: pool workers and SDK
+callback threads never wait on disk I/O, and one writer keeps lines from several processes
+whole. Pool workers attach to the same queue with `init_worker`; forked workers inherit it.
+
+Chatty third-party loggers are kept at WARNING instead of raising the root level around
+timed sections.
+"""
+import atexit
+import logging
+import logging.handlers
+import multiprocessing
+
+FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+# libraries that log every HTTP request at INFO
+QUIET_LOGGERS = ("azure", "urllib3")
+
+_queue = None
+_listener = None
+
+
+def _reset_root():
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+
+
+def start(path, level=logging.INFO, console=True, fmt=FORMAT):
+    """
+    Route all logging of this process through a queue to `path` and, with `console`, stderr.
+    Returns the queue, to hand to pool initializers.
+    """
+    global _queue, _listener
+    stop()
+    _reset_root()
+
+    formatter = logging.Formatter(fmt)
+    handlers = [logging.FileHandler(path, encoding="utf-8")]
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # a multiprocessing queue, so spawned workers can be given it as well
+    _queue = multiprocessing.Queue(-1)
+    _listener = logging.handlers.QueueListener(_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    logging.root.addHandler(logging.handlers.QueueHandler(_queue))
+    logging.root.setLevel(level)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+    atexit.register(stop)
+    return _queue
+
+
+def queue():
+    """
+    The queue of the running listener, or None when `start` was not called.
+    """
+    return _queue
+
+
+def init_worker(log_queue, level=logging.INFO):
+    """
+    Send the logging of a pool worker to `log_queue`, the queue returned by `start`.
+    """
+    _reset_root()
+    logging.root.addHandler(logging.handlers.QueueHandler(log_queue))
+    logging.root.setLevel(level)
+
+
+def stop():
+    """
+    Write out the queued records and close the handlers.
+    """
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
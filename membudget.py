@@ -0,0 +1,86 @@
+"""
+Memory budget for encoded chunks waiting to be uploaded.
+
+Encoded chunks larger than the spill threshold are written to a temporary file straight
+away. Smaller ones stay in memory and are counted against the budget; a producer storing a
+chunk blocks while the budget is exhausted, until uploads release their buffers. Peak memory
+of the pipeline then stays bounded however long the input is.
+
+MEMORY_BUDGET_MB and SPILL_THRESHOLD_MB configure the limits.
+"""
+import os
+import threading
+from tempfile import SpooledTemporaryFile
+
+
+class BudgetBuffer:
+    """
+    A readable chunk buffer that gives its share of the budget back when closed.
+    """
+
+    def __init__(self, file, budget, size, charged):
+        self._file = file
+        self._budget = budget
+        self._size = size
+        self._charged = charged
+        self._closed = False
+
+    def __len__(self):
+        return self._size
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._file.close()
+        self._budget.release(self._charged)
+
+
+class MemoryBudget:
+    """
+    Bounds the bytes of encoded chunks held in memory; see the module docstring.
+    """
+
+    def __init__(self, limit_bytes=None, spill_bytes=None):
+        self.limit_bytes = limit_bytes or int(float(os.getenv("MEMORY_BUDGET_MB", "512")) * 1024 * 1024)
+        self.spill_bytes = spill_bytes or int(float(os.getenv("SPILL_THRESHOLD_MB", "8")) * 1024 * 1024)
+        self.used_bytes = 0
+        self.peak_bytes = 0
+        self.stored_bytes = 0
+        self.spilled_bytes = 0
+        self._condition = threading.Condition()
+
+    def store(self, data: bytes):
+        """
+        Copy `data` into a buffer, spilling it to disk if it is larger than the spill threshold.
+        Blocks while the in-memory budget is exhausted. A chunk larger than the whole budget is
+        admitted once nothing else is held.
+        """
+        size = len(data)
+        charged = 0 if size > self.spill_bytes else size
+
+        with self._condition:
+            self._condition.wait_for(
+                lambda: charged == 0 or self.used_bytes == 0 or self.used_bytes + charged <= self.limit_bytes)
+            self.used_bytes += charged
+            self.peak_bytes = max(self.peak_bytes, self.used_bytes)
+            self.stored_bytes += size
+            if not charged:
+                self.spilled_bytes += size
+
+        # writing more than max_size rolls the file over to disk
+        file = SpooledTemporaryFile(max_size=self.spill_bytes)
+        file.write(data)
+        file.seek(0)
+        return BudgetBuffer(file, self, size, charged)
+
+    def release(self, nbytes):
+        with self._condition:
+            self.used_bytes -= nbytes
+            self._condition.notify_all()
@@ -0,0 +1,74 @@
+"""
+Optional preprocessing before upload: downmix to mono, resample to 16 kHz and re-encode with
+a low-bitrate speech codec. Recognition does not use more than 16 kHz mono, so this only
+shrinks upload time and blob egress.
+
+Enabled with PREPROCESS_AUDIO=opus (Opus in OGG) or PREPROCESS_AUDIO=mp3.
+"""
+import io
+import logging
+import os
+import shutil
+import subprocess
+
+SAMPLE_RATE = 16000
+
+# codec name -> (file extension, ffmpeg output arguments)
+CODECS = {
+    "opus": (".ogg", ["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg"]),
+    "mp3": (".mp3", ["-c:a", "libmp3lame", "-b:a", "32k", "-f", "mp3"]),
+}
+
+# kbps for chunk encoders when preprocessing is enabled
+CHUNK_BITRATE = 32
+
+
+def enabled_codec():
+    """
+    The codec selected with PREPROCESS_AUDIO, or None when preprocessing is off.
+    """
+    codec = os.getenv("PREPROCESS_AUDIO", "").strip().lower()
+    if not codec:
+        return None
+    if codec not in CODECS:
+        raise ValueError(f"PREPROCESS_AUDIO must be one of {', '.join(CODECS)}, got '{codec}'")
+    return codec
+
+
+def downmix(segment):
+    """
+    Downmix and resample a decoded `AudioSegment` to 16 kHz mono.
+    """
+    return segment.set_channels(1).set_frame_rate(SAMPLE_RATE)
+
+
+def preprocess_file(source, codec="opus"):
+    """
+    Stream `source` (a path or a binary file-like object) through ffmpeg, downmixing to 16 kHz
+    mono and encoding with `codec`. Returns an `io.BytesIO` with the result and the extension
+    the uploaded file should use.
+    """
+    extension, output_args = CODECS[codec]
+    command = [shutil.which("ffmpeg") or "ffmpeg", "-loglevel", "error",
+               "-i", source if isinstance(source, str) else "pipe:0",
+               "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), *output_args, "pipe:1"]
+
+    if isinstance(source, str):
+        original_size = os.path.getsize(source)
+        completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    else:
+        data = source.read()
+        original_size = len(data)
+        completed = subprocess.run(command, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    if completed.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to preprocess audio: {completed.stderr.decode(errors='replace')}")
+
+    report_reduction(original_size, len(completed.stdout))
+    return io.BytesIO(completed.stdout), extension
+
+
+def report_reduction(original_size, processed_size):
+    ratio = original_size / processed_size if processed_size else float("inf")
+    logging.info(f"Preprocessing reduced upload from {original_size / 1024:.0f} KiB to "
+                 f"{processed_size / 1024:.0f} KiB ({ratio:.1f}x smaller)")
@@ -0,0 +1,172 @@
+"""
+Opt-in profiling of pipeline stages with cProfile and tracemalloc.
+
+PROFILE=cpu, PROFILE=memory or PROFILE=cpu,memory turns it on. Every process, including the
+encoder pool workers, then writes one file per stage into the run directory (PROFILE_DIR, by
+default `profiles/<timestamp>`):
+
+- `<stage>-<pid>.prof`: cProfile data of all calls of the stage, for `pstats` or snakeviz,
+  with a `<stage>-<pid>.txt` summary of the top functions by cumulative time.
+- `<stage>-<pid>.alloc.txt`: the top allocation sites of the first calls of the stage, from
+  tracemalloc snapshots taken before and after them.
+
+A stage nested in another stage of the same thread is counted in the outer one. cProfile can
+only run one profiler at a time, so a stage that starts while another thread is being
+profiled is skipped; the totals are a sample when stages run concurrently.
+"""
+import cProfile
+import io
+import multiprocessing.util
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+_profiler = None
+_NOOP = nullcontext()
+
+
+class StageProfiler:
+    """
+    Per-process collection of stage profiles; see the module docstring.
+    """
+
+    def __init__(self, run_dir, cpu=True, memory=False, snapshots=1, top=30):
+        self.run_dir = run_dir
+        self.cpu = cpu
+        self.memory = memory
+        self.snapshots = snapshots
+        self.top = top
+        self.profiles = {}
+        self.allocations = {}
+        self.skipped = 0
+        self.pid = os.getpid()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        os.makedirs(run_dir, exist_ok=True)
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+
+    @contextmanager
+    def stage(self, name):
+        if getattr(self._local, "active", False):
+            yield
+            return
+        self._local.active = True
+        try:
+            profile = self._start_cpu(name) if self.cpu else None
+            before = self._snapshot(name) if self.memory else None
+            try:
+                yield
+            finally:
+                if profile is not None:
+                    profile.disable()
+                if before is not None:
+                    self._record_allocations(name, before)
+        finally:
+            self._local.active = False
+
+    def _start_cpu(self, name):
+        # one profiler per thread, merged when writing; a profiler must not run on two threads
+        with self._lock:
+            profile = self.profiles.setdefault((name, threading.get_ident()), cProfile.Profile())
+        try:
+            profile.enable()
+        except ValueError:
+            # another thread is being profiled
+            with self._lock:
+                self.skipped += 1
+            return None
+        return profile
+
+    def _snapshot(self, name):
+        with self._lock:
+            if len(self.allocations.setdefault(name, [])) >= self.snapshots:
+                return None
+        return tracemalloc.take_snapshot()
+
+    def _record_allocations(self, name, before):
+        stats = tracemalloc.take_snapshot().compare_to(before, "lineno")
+        with self._lock:
+            self.allocations[name].append(stats[:self.top])
+
+    def finish(self):
+        pid = self.pid
+        with self._lock:
+            names = {name for name, _ in self.profiles}
+            for name in names:
+                profiles = [profile for (stage, _), profile in self.profiles.items() if stage == name]
+                summary = io.StringIO()
+                stats = pstats.Stats(profiles[0], stream=summary)
+                for profile in profiles[1:]:
+                    stats.add(profile)
+                path = os.path.join(self.run_dir, f"{name}-{pid}")
+                stats.dump_stats(path + ".prof")
+                stats.sort_stats("cumulative").print_stats(self.top)
+                with open(path + ".txt", "w", encoding="utf8") as f:
+                    f.write(summary.getvalue())
+
+            for name, snapshots in self.allocations.items():
+                with open(os.path.join(self.run_dir, f"{name}-{pid}.alloc.txt"), "w", encoding="utf8") as f:
+                    for i, stats in enumerate(snapshots):
+                        f.write(f"# call {i + 1} of {name}\n")
+                        f.writelines(f"{stat}\n" for stat in stats)
+
+            if self.skipped:
+                with open(os.path.join(self.run_dir, f"skipped-{pid}.txt"), "w", encoding="utf8") as f:
+                    f.write(f"{self.skipped} stage calls were not profiled while another thread was\n")
+
+
+def configure():
+    """
+    Start profiling in this process if PROFILE is set. The run directory is passed on to
+    child processes through PROFILE_RUN_DIR, so pool workers calling `configure` write next
+    to the parent. Profiles are written when the process exits.
+    """
+    global _profiler
+    modes = {mode.strip() for mode in os.getenv("PROFILE", "").lower().split(",") if mode.strip()}
+    if not modes:
+        return False
+    # a forked worker inherits the parent's profiler but must collect its own
+    if _profiler is not None and _profiler.pid == os.getpid():
+        return True
+
+    run_dir = os.getenv("PROFILE_RUN_DIR") or os.path.join(
+        os.getenv("PROFILE_DIR", "profiles"), time.strftime("%Y%m%d-%H%M%S"))
+    os.environ["PROFILE_RUN_DIR"] = run_dir
+    _profiler = StageProfiler(run_dir, cpu="cpu" in modes, memory="memory" in modes,
+                              snapshots=int(os.getenv("PROFILE_SNAPSHOTS", "1")))
+    # multiprocessing runs its finalizers in pool workers too, where atexit handlers do not run
+    multiprocessing.util.Finalize(None, _profiler.finish, exitpriority=10)
+    return True
+
+
+def enabled():
+    return _profiler is not None
+
+
+def stage(name):
+    """
+    Context manager profiling the stage `name`, e.g. `with profiling.stage("upload"):`.
+    """
+    if _profiler is None:
+        return _NOOP
+    return _profiler.stage(name)
+
+
+def wrap(name, fn):
+    """
+    Return `fn` profiled as the stage `name`, or `fn` itself when profiling is off.
+    """
+    if _profiler is None:
+        return fn
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _profiler.stage(name):
+            return fn(*args, **kwargs)
+
+    return wrapper
@@ -38,6 +38,8 @@ setup(
     url="",
     keywords=["Swagger", "Speech Services API v3.1"],
     install_requires=REQUIRES,
+    # the package uses module level __getattr__ (PEP 562) to import apis and models lazily
+    python_requires=">=3.7",
     packages=find_packages(),
     include_package_data=True,
     long_description="""\
@@ -15,94 +15,100 @@
 
 from __future__ import absolute_import
 
-# import apis into sdk package
-from swagger_client.api.custom_speech_datasets_for_model_adaptation_api import CustomSpeechDatasetsForModelAdaptationApi
-from swagger_client.api.custom_speech_endpoints_api import CustomSpeechEndpointsApi
-from swagger_client.api.custom_speech_model_evaluations_api import CustomSpeechModelEvaluationsApi
-from swagger_client.api.custom_speech_models_api import CustomSpeechModelsApi
-from swagger_client.api.custom_speech_projects_api import CustomSpeechProjectsApi
-from swagger_client.api.custom_speech_transcriptions_api import CustomSpeechTranscriptionsApi
-from swagger_client.api.custom_speech_web_hooks_api import CustomSpeechWebHooksApi
-from swagger_client.api.service_health_api import ServiceHealthApi
+from swagger_client._lazy import install
 
-# import ApiClient
-from swagger_client.api_client import ApiClient
-from swagger_client.configuration import Configuration
-# import models into sdk package
-from swagger_client.models.base_model import BaseModel
-from swagger_client.models.base_model_deprecation_dates import BaseModelDeprecationDates
-from swagger_client.models.base_model_features import BaseModelFeatures
-from swagger_client.models.base_model_links import BaseModelLinks
-from swagger_client.models.base_model_properties import BaseModelProperties
-from swagger_client.models.block_kind import BlockKind
-from swagger_client.models.commit_blocks_entry import CommitBlocksEntry
-from swagger_client.models.component import Component
-from swagger_client.models.custom_model import CustomModel
-from swagger_client.models.custom_model_deprecation_dates import CustomModelDeprecationDates
-from swagger_client.models.custom_model_features import CustomModelFeatures
-from swagger_client.models.custom_model_links import CustomModelLinks
-from swagger_client.models.custom_model_properties import CustomModelProperties
-from swagger_client.models.dataset import Dataset
-from swagger_client.models.dataset_kind import DatasetKind
-from swagger_client.models.dataset_links import DatasetLinks
-from swagger_client.models.dataset_locales import DatasetLocales
-from swagger_client.models.dataset_properties import DatasetProperties
-from swagger_client.models.dataset_update import DatasetUpdate
-from swagger_client.models.detailed_error_code import DetailedErrorCode
-from swagger_client.models.diarization_properties import DiarizationProperties
-from swagger_client.models.diarization_speakers_properties import DiarizationSpeakersProperties
-from swagger_client.models.endpoint import Endpoint
-from swagger_client.models.endpoint_links import EndpointLinks
-from swagger_client.models.endpoint_properties import EndpointProperties
-from swagger_client.models.endpoint_properties_update import EndpointPropertiesUpdate
-from swagger_client.models.endpoint_update import EndpointUpdate
-from swagger_client.models.entity_error import EntityError
-from swagger_client.models.entity_reference import EntityReference
-from swagger_client.models.error import Error
-from swagger_client.models.error_code import ErrorCode
-from swagger_client.models.evaluation import Evaluation
-from swagger_client.models.evaluation_links import EvaluationLinks
-from swagger_client.models.evaluation_properties import EvaluationProperties
-from swagger_client.models.evaluation_update import EvaluationUpdate
-from swagger_client.models.file import File
-from swagger_client.models.file_kind import FileKind
-from swagger_client.models.file_links import FileLinks
-from swagger_client.models.file_properties import FileProperties
-from swagger_client.models.health_status import HealthStatus
-from swagger_client.models.inner_error import InnerError
-from swagger_client.models.language_identification_properties import LanguageIdentificationProperties
-from swagger_client.models.model_copy import ModelCopy
-from swagger_client.models.model_file import ModelFile
-from swagger_client.models.model_manifest import ModelManifest
-from swagger_client.models.model_update import ModelUpdate
-from swagger_client.models.paginated_base_models import PaginatedBaseModels
-from swagger_client.models.paginated_custom_models import PaginatedCustomModels
-from swagger_client.models.paginated_datasets import PaginatedDatasets
-from swagger_client.models.paginated_endpoints import PaginatedEndpoints
-from swagger_client.models.paginated_evaluations import PaginatedEvaluations
-from swagger_client.models.paginated_files import PaginatedFiles
-from swagger_client.models.paginated_projects import PaginatedProjects
-from swagger_client.models.paginated_transcriptions import PaginatedTranscriptions
-from swagger_client.models.paginated_web_hooks import PaginatedWebHooks
-from swagger_client.models.profanity_filter_mode import ProfanityFilterMode
-from swagger_client.models.project import Project
-from swagger_client.models.project_links import ProjectLinks
-from swagger_client.models.project_properties import ProjectProperties
-from swagger_client.models.project_update import ProjectUpdate
-from swagger_client.models.punctuation_mode import PunctuationMode
-from swagger_client.models.response_block import ResponseBlock
-from swagger_client.models.service_health import ServiceHealth
-from swagger_client.models.shared_model import SharedModel
-from swagger_client.models.shared_model_features import SharedModelFeatures
-from swagger_client.models.status import Status
-from swagger_client.models.transcription import Transcription
-from swagger_client.models.transcription_links import TranscriptionLinks
-from swagger_client.models.transcription_properties import TranscriptionProperties
-from swagger_client.models.transcription_update import TranscriptionUpdate
-from swagger_client.models.uploaded_blocks import UploadedBlocks
-from swagger_client.models.web_hook import WebHook
-from swagger_client.models.web_hook_events import WebHookEvents
-from swagger_client.models.web_hook_links import WebHookLinks
-from swagger_client.models.web_hook_properties import WebHookProperties
-from swagger_client.models.web_hook_properties_update import WebHookPropertiesUpdate
-from swagger_client.models.web_hook_update import WebHookUpdate
+# Apis and models are imported on first attribute access, see swagger_client._lazy
+_LAZY_ATTRS = {
+    # import apis into sdk package
+    'CustomSpeechDatasetsForModelAdaptationApi': 'swagger_client.api.custom_speech_datasets_for_model_adaptation_api',
+    'CustomSpeechEndpointsApi': 'swagger_client.api.custom_speech_endpoints_api',
+    'CustomSpeechModelEvaluationsApi': 'swagger_client.api.custom_speech_model_evaluations_api',
+    'CustomSpeechModelsApi': 'swagger_client.api.custom_speech_models_api',
+    'CustomSpeechProjectsApi': 'swagger_client.api.custom_speech_projects_api',
+    'CustomSpeechTranscriptionsApi': 'swagger_client.api.custom_speech_transcriptions_api',
+    'CustomSpeechWebHooksApi': 'swagger_client.api.custom_speech_web_hooks_api',
+    'ServiceHealthApi': 'swagger_client.api.service_health_api',
+    # import ApiClient
+    'ApiClient': 'swagger_client.api_client',
+    'Configuration': 'swagger_client.configuration',
+    # import models into sdk package
+    'BaseModel': 'swagger_client.models.base_model',
+    'BaseModelDeprecationDates': 'swagger_client.models.base_model_deprecation_dates',
+    'BaseModelFeatures': 'swagger_client.models.base_model_features',
+    'BaseModelLinks': 'swagger_client.models.base_model_links',
+    'BaseModelProperties': 'swagger_client.models.base_model_properties',
+    'BlockKind': 'swagger_client.models.block_kind',
+    'CommitBlocksEntry': 'swagger_client.models.commit_blocks_entry',
+    'Component': 'swagger_client.models.component',
+    'CustomModel': 'swagger_client.models.custom_model',
+    'CustomModelDeprecationDates': 'swagger_client.models.custom_model_deprecation_dates',
+    'CustomModelFeatures': 'swagger_client.models.custom_model_features',
+    'CustomModelLinks': 'swagger_client.models.custom_model_links',
+    'CustomModelProperties': 'swagger_client.models.custom_model_properties',
+    'Dataset': 'swagger_client.models.dataset',
+    'DatasetKind': 'swagger_client.models.dataset_kind',
+    'DatasetLinks': 'swagger_client.models.dataset_links',
+    'DatasetLocales': 'swagger_client.models.dataset_locales',
+    'DatasetProperties': 'swagger_client.models.dataset_properties',
+    'DatasetUpdate': 'swagger_client.models.dataset_update',
+    'DetailedErrorCode': 'swagger_client.models.detailed_error_code',
+    'DiarizationProperties': 'swagger_client.models.diarization_properties',
+    'DiarizationSpeakersProperties': 'swagger_client.models.diarization_speakers_properties',
+    'Endpoint': 'swagger_client.models.endpoint',
+    'EndpointLinks': 'swagger_client.models.endpoint_links',
+    'EndpointProperties': 'swagger_client.models.endpoint_properties',
+    'EndpointPropertiesUpdate': 'swagger_client.models.endpoint_properties_update',
+    'EndpointUpdate': 'swagger_client.models.endpoint_update',
+    'EntityError': 'swagger_client.models.entity_error',
+    'EntityReference': 'swagger_client.models.entity_reference',
+    'Error': 'swagger_client.models.error',
+    'ErrorCode': 'swagger_client.models.error_code',
+    'Evaluation': 'swagger_client.models.evaluation',
+    'EvaluationLinks': 'swagger_client.models.evaluation_links',
+    'EvaluationProperties': 'swagger_client.models.evaluation_properties',
+    'EvaluationUpdate': 'swagger_client.models.evaluation_update',
+    'File': 'swagger_client.models.file',
+    'FileKind': 'swagger_client.models.file_kind',
+    'FileLinks': 'swagger_client.models.file_links',
+    'FileProperties': 'swagger_client.models.file_properties',
+    'HealthStatus': 'swagger_client.models.health_status',
+    'InnerError': 'swagger_client.models.inner_error',
+    'LanguageIdentificationProperties': 'swagger_client.models.language_identification_properties',
+    'ModelCopy': 'swagger_client.models.model_copy',
+    'ModelFile': 'swagger_client.models.model_file',
+    'ModelManifest': 'swagger_client.models.model_manifest',
+    'ModelUpdate': 'swagger_client.models.model_update',
+    'PaginatedBaseModels': 'swagger_client.models.paginated_base_models',
+    'PaginatedCustomModels': 'swagger_client.models.paginated_custom_models',
+    'PaginatedDatasets': 'swagger_client.models.paginated_datasets',
+    'PaginatedEndpoints': 'swagger_client.models.paginated_endpoints',
+    'PaginatedEvaluations': 'swagger_client.models.paginated_evaluations',
+    'PaginatedFiles': 'swagger_client.models.paginated_files',
+    'PaginatedProjects': 'swagger_client.models.paginated_projects',
+    'PaginatedTranscriptions': 'swagger_client.models.paginated_transcriptions',
+    'PaginatedWebHooks': 'swagger_client.models.paginated_web_hooks',
+    'ProfanityFilterMode': 'swagger_client.models.profanity_filter_mode',
+    'Project': 'swagger_client.models.project',
+    'ProjectLinks': 'swagger_client.models.project_links',
+    'ProjectProperties': 'swagger_client.models.project_properties',
+    'ProjectUpdate': 'swagger_client.models.project_update',
+    'PunctuationMode': 'swagger_client.models.punctuation_mode',
+    'ResponseBlock': 'swagger_client.models.response_block',
+    'ServiceHealth': 'swagger_client.models.service_health',
+    'SharedModel': 'swagger_client.models.shared_model',
+    'SharedModelFeatures': 'swagger_client.models.shared_model_features',
+    'Status': 'swagger_client.models.status',
+    'Transcription': 'swagger_client.models.transcription',
+    'TranscriptionLinks': 'swagger_client.models.transcription_links',
+    'TranscriptionProperties': 'swagger_client.models.transcription_properties',
+    'TranscriptionUpdate': 'swagger_client.models.transcription_update',
+    'UploadedBlocks': 'swagger_client.models.uploaded_blocks',
+    'WebHook': 'swagger_client.models.web_hook',
+    'WebHookEvents': 'swagger_client.models.web_hook_events',
+    'WebHookLinks': 'swagger_client.models.web_hook_links',
+    'WebHookProperties': 'swagger_client.models.web_hook_properties',
+    'WebHookPropertiesUpdate': 'swagger_client.models.web_hook_properties_update',
+    'WebHookUpdate': 'swagger_client.models.web_hook_update',
+}
+
+install(globals(), _LAZY_ATTRS)
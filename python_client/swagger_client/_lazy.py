@@ -0,0 +1,47 @@
+# coding: utf-8
+
+"""
+Lazy attributes (PEP 562) for the generated packages, so importing a package does not load
+every generated module. Set SWAGGER_CLIENT_EAGER=1 to import all of them upfront.
+"""
+
+from __future__ import absolute_import
+
+import importlib
+import os
+
+
+def install(module_globals, lazy_attrs):
+    """
+    Give the package with the globals `module_globals` a `__getattr__` and `__dir__` that import
+    each name of `lazy_attrs` from its module (name -> module name) on first access, and an
+    `__all__` listing them.
+    """
+    package = module_globals["__name__"]
+
+    def __getattr__(name):
+        module_name = lazy_attrs.get(name)
+        if module_name is None:
+            if name.startswith("__"):
+                raise AttributeError("module %r has no attribute %r" % (package, name))
+            # plain submodules such as `rest` resolve to the module itself
+            try:
+                return importlib.import_module("%s.%s" % (package, name))
+            except ModuleNotFoundError as exc:
+                # only a missing submodule means a missing attribute; a failing import inside an
+                # existing submodule, such as a missing dependency, is raised as it is
+                if exc.name != "%s.%s" % (package, name):
+                    raise
+                raise AttributeError("module %r has no attribute %r" % (package, name)) from exc
+        value = getattr(importlib.import_module(module_name), name)
+        module_globals[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(module_globals) | set(lazy_attrs))
+
+    module_globals.update(__all__=list(lazy_attrs), __getattr__=__getattr__, __dir__=__dir__)
+
+    if os.environ.get("SWAGGER_CLIENT_EAGER"):
+        for name in lazy_attrs:
+            __getattr__(name)
@@ -0,0 +1,172 @@
+"""
+Chooses batch or real-time transcription per recording by its expected completion time.
+
+The batch estimate is `chunking.CostModel` fitted to the journal's past chunk timings, shifted
+by how much longer (or shorter) the service queue has been recently than on average, with the
+chunks spread over the part of the concurrency quota not already in use. The real-time
+estimate spreads the same chunks over REALTIME_SESSIONS sessions that each transcribe about
+REALTIME_FACTOR seconds per audio second. Both paths diarize; recordings that need word
+timestamps, or are longer than REALTIME_MAX_SECONDS, always go to batch.
+
+The queue latency and the load in flight are only what the given journal has seen. With a
+per-recording journal that is one file, so `cli_multiproc` can share one journal across
+recordings through JOURNAL_FILE, as `cli_batch` does. Until the journal holds MIN_HISTORY
+completed chunks there is nothing to fit, and recordings go to batch.
+
+Every decision is appended to ROUTER_LOG as a JSON line with both predictions and, once the
+recording is done, the measured time. The router scales its predictions by the median ratio
+of measured to predicted time of the recent outcomes of each mode, so the log tunes the model
+as it grows.
+"""
+import json
+import logging
+import math
+import os
+import statistics
+import time
+from collections import namedtuple
+import chunking
+from pydub import AudioSegment
+from pydub.utils import mediainfo
+
+Route = namedtuple("Route", ["path", "mode", "reason", "duration_ms", "batch_seconds", "realtime_seconds",
+                             "expected_seconds", "inputs"])
+
+# assumptions used until outcomes were recorded
+DEFAULT_REALTIME_FACTOR = 1.0
+# connecting a session and its first results
+REALTIME_START_SECONDS = 3.0
+DEFAULT_CHUNK_SECONDS = 60
+# recent outcomes of each mode used to correct the predictions
+OUTCOME_HISTORY = 50
+# completed chunks in the journal before batch timings are trusted
+MIN_HISTORY = 3
+
+
+def log_path():
+    return os.getenv("ROUTER_LOG", "router.jsonl")
+
+
+def probe_duration_ms(path):
+    """
+    Duration of the recording at `path` from ffprobe, without decoding it; decodes if the
+    container does not say.
+    """
+    duration = mediainfo(path).get("duration")
+    if duration:
+        return float(duration) * 1000
+    return len(AudioSegment.from_file(path))
+
+
+def _chunk_durations(duration_ms, chunk_seconds):
+    count = max(1, math.ceil(duration_ms / (chunk_seconds * 1000)))
+    return [duration_ms / count] * count
+
+
+def corrections(path=None, history=OUTCOME_HISTORY):
+    """
+    Median ratio of measured to predicted seconds of the last `history` successful outcomes
+    of each mode in the router log.
+    """
+    path = path or log_path()
+    ratios = {"batch": [], "realtime": []}
+    if os.path.exists(path):
+        with open(path, encoding="utf8") as f:
+            for line in f:
+                entry = json.loads(line)
+                predicted = entry.get(f"{entry['mode']}_seconds")
+                if entry.get("error") or not entry.get("actual_seconds") or not predicted:
+                    continue
+                ratios[entry["mode"]].append(entry["actual_seconds"] / predicted)
+    return {mode: statistics.median(values[-history:]) for mode, values in ratios.items() if values}
+
+
+class LatencyRouter:
+    """
+    Predicts the completion time of a recording on both paths and picks the faster one; see the
+    module docstring. `batch_slots` is the free share of the batch concurrency quota.
+    """
+
+    def __init__(self, batch_model=None, queue_shift_seconds=0.0, batch_slots=20, realtime_sessions=8,
+                 realtime_factor=DEFAULT_REALTIME_FACTOR, realtime_max_seconds=3600,
+                 chunk_seconds=DEFAULT_CHUNK_SECONDS, corrections=None, history=MIN_HISTORY):
+        self.batch_model = batch_model or chunking.CostModel()
+        self.queue_shift_seconds = queue_shift_seconds
+        self.batch_slots = max(1, batch_slots)
+        self.realtime_sessions = realtime_sessions
+        self.realtime_model = chunking.CostModel(REALTIME_START_SECONDS, realtime_factor)
+        self.realtime_max_seconds = realtime_max_seconds
+        self.chunk_seconds = chunk_seconds
+        self.corrections = corrections or {}
+        self.history = history
+
+    @classmethod
+    def from_journal(cls, journal, quota, realtime_sessions, window_seconds=None):
+        """
+        A router fitted to the timings in `journal`, with the queue latency and the chunks in
+        flight of the last `window_seconds` (ROUTER_WINDOW_SECONDS, one hour by default).
+        """
+        window_seconds = window_seconds or int(os.getenv("ROUTER_WINDOW_SECONDS", "3600"))
+        since = time.time() - window_seconds
+        timings = journal.timings()
+        waits = journal.queue_waits()
+        recent = journal.queue_waits(since)
+        # the fitted overhead already holds the average queue wait
+        shift = statistics.median(recent) - statistics.median(waits) if recent else 0.0
+        return cls(batch_model=chunking.CostModel.calibrate(timings),
+                   history=len(timings),
+                   queue_shift_seconds=shift,
+                   batch_slots=quota - journal.in_flight(since),
+                   realtime_sessions=realtime_sessions,
+                   realtime_factor=float(os.getenv("REALTIME_FACTOR", DEFAULT_REALTIME_FACTOR)),
+                   realtime_max_seconds=int(os.getenv("REALTIME_MAX_SECONDS", "3600")),
+                   corrections=corrections())
+
+    def estimate_batch(self, duration_ms):
+        durations = _chunk_durations(duration_ms, self.chunk_seconds)
+        return max(0.0, self.batch_model.makespan(durations, self.batch_slots) + self.queue_shift_seconds)
+
+    def estimate_realtime(self, duration_ms):
+        durations = _chunk_durations(duration_ms, self.chunk_seconds)
+        return self.realtime_model.makespan(durations, self.realtime_sessions)
+
+    def route(self, path, duration_ms, word_timestamps=False):
+        """
+        The `Route` of the recording `path` of `duration_ms`. `word_timestamps` is required by
+        the fixed chunker, which stitches overlapping windows by word offsets.
+        """
+        batch = self.estimate_batch(duration_ms)
+        realtime = self.estimate_realtime(duration_ms)
+        expected = {"batch": batch * self.corrections.get("batch", 1.0),
+                    "realtime": realtime * self.corrections.get("realtime", 1.0)}
+
+        if word_timestamps:
+            mode, reason = "batch", "word timestamps"
+        elif self.history < MIN_HISTORY:
+            mode, reason = "batch", "too little batch history in the journal"
+        elif duration_ms > self.realtime_max_seconds * 1000:
+            mode, reason = "batch", "longer than the real-time limit"
+        elif self.realtime_sessions < 1:
+            mode, reason = "batch", "no real-time sessions"
+        else:
+            mode = min(expected, key=expected.get)
+            reason = "lower expected time"
+
+        inputs = {"history": self.history, "queue_shift_seconds": self.queue_shift_seconds,
+                  "batch_slots": self.batch_slots, "realtime_sessions": self.realtime_sessions,
+                  "corrections": self.corrections,
+                  "overhead_seconds": self.batch_model.overhead_seconds,
+                  "seconds_per_audio_second": self.batch_model.seconds_per_audio_second}
+        route = Route(path, mode, reason, duration_ms, batch, realtime, expected[mode], inputs)
+        logging.info(f"Routing {path} ({duration_ms / 1000:.0f}s) to {mode}: {reason}, expected batch "
+                     f"{expected['batch']:.0f}s, real-time {expected['realtime']:.0f}s")
+        return route
+
+
+def record(route, actual_seconds, error=None, path=None):
+    """
+    Append the prediction `route` and its measured outcome to the router log.
+    """
+    entry = dict(route._asdict(), actual_seconds=actual_seconds, error=error, at=time.time())
+    with open(path or log_path(), "a", encoding="utf8") as f:
+        f.write(json.dumps(entry, default=str) + "\n")
@@ -10,13 +10,20 @@ import os
 import sys
 import requests
 import time
+import json
+import profiling
 import swagger_client
+import telemetry
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 
         
 # Your subscription key and region for the speech service
 SUBSCRIPTION_KEY = os.getenv('SPEECH_SUBSCRIPTION_KEY')
 SPEECH_ENDPOINT = os.getenv('SPEECH_ENDPOINT')
 SERVICE_REGION = os.getenv('SPEECH_SERVICE_REGION')
+# Overrides the regional endpoint, e.g. to point at benchmarks/fake_speech_service.py
+API_HOST = os.getenv('SPEECH_API_HOST')
 
 NAME = "Simple transcription"
 DESCRIPTION = "Simple transcription description"
@@ -32,6 +39,12 @@ LOCALE = os.getenv('LOCALE')
 # Set model information when doing transcription with custom models
 MODEL_REFERENCE = None  # guid of a custom model
 
+# File kinds downloaded by `collect_results`
+RESULT_KINDS = ("Transcription", "TranscriptionReport")
+
+# Seconds between status polls in `wait_for_completion`
+POLL_INTERVAL = 5
+
 
 def transcribe_from_single_blob(uri, properties):
     """
@@ -101,6 +114,7 @@ def _paginate(api, paginated_object):
         link = paginated_object.next_link[len(api.api_client.configuration.host):]
         paginated_object, status, headers = api.api_client.call_api(link, "GET",
             response_type=typename, auth_settings=auth_settings)
+        telemetry.count("api_calls", operation="next_page")
 
         if status == 200:
             yield from paginated_object.values
@@ -115,7 +129,7 @@ def delete_all_transcriptions(api):
     logging.info("Deleting all existing completed transcriptions.")
 
     # get all transcriptions for the subscription
-    transcriptions = list(_paginate(api, api.get_transcriptions()))
+    transcriptions = list(_paginate(api, api.transcriptions_list()))
 
     # Delete all pre-existing completed transcriptions.
     # If transcriptions are still running or not started, they will not be deleted.
@@ -123,28 +137,87 @@ def delete_all_transcriptions(api):
         transcription_id = transcription._self.split('/')[-1]
         logging.debug(f"Deleting transcription with id {transcription_id}")
         try:
-            api.delete_transcription(transcription_id)
+            api.transcriptions_delete(transcription_id)
         except swagger_client.rest.ApiException as exc:
             logging.error(f"Could not delete transcription {transcription_id}: {exc}")
 
 
-def transcribe(blob_uri: str, callback=None):
-    logging.info("Starting transcription client...")
-
+def create_api(pool_maxsize=None):
+    """
+    Create an authenticated instance of the transcription api class. `pool_maxsize` sizes its
+    connection pool for the number of threads that share it.
+    """
     # configure API key authorization: subscription_key
     configuration = swagger_client.Configuration()
     configuration.api_key["Ocp-Apim-Subscription-Key"] = SUBSCRIPTION_KEY
-    configuration.host = f"https://{SERVICE_REGION}.api.cognitive.microsoft.com/speechtotext/v3.1"
+    configuration.host = API_HOST or f"https://{SERVICE_REGION}.api.cognitive.microsoft.com/speechtotext/v3.1"
     # configuration.host = SPEECH_ENDPOINT
-
-    print(configuration.host, configuration.api_key["Ocp-Apim-Subscription-Key"], blob_uri)
+    if pool_maxsize:
+        configuration.connection_pool_maxsize = pool_maxsize
 
     # create the client object and authenticate
     client = swagger_client.ApiClient(configuration)
+    client.deserialize = profiling.wrap("deserialize", client.deserialize)
 
     # create an instance of the transcription api class
-    api = swagger_client.CustomSpeechTranscriptionsApi(api_client=client)
+    return swagger_client.CustomSpeechTranscriptionsApi(api_client=client)
+
+
+def create_session(pool_size=8):
+    """
+    Create a `requests` session whose connection pool can serve `pool_size` parallel downloads.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
+
+def _download_result(session, file_data):
+    """
+    Download and parse the content of a single result file.
+    """
+    with telemetry.span("download", kind=file_data.kind):
+        results = session.get(file_data.links.content_url)
+        results.raise_for_status()
+    telemetry.count("bytes_downloaded", len(results.content))
+    with telemetry.span("parse", kind=file_data.kind), profiling.stage("parse"):
+        parsed = json.loads(results.content.decode('utf-8'))
+
+    # transcription results carry the url of the audio they were created from
+    source = parsed.get("source") if file_data.kind == "Transcription" else None
+    audiofilename = source.split("?")[0].split("/")[-1] if source else file_data.name
+    return audiofilename, parsed
+
+
+def collect_results(api, transcription_id, kinds=RESULT_KINDS, max_workers=8, session=None):
+    """
+    List all files of the completed transcription `transcription_id` and download every file of
+    the given `kinds` in parallel. Yields (source audio name, parsed result) pairs in the order
+    the downloads finish.
+    """
+    pag_files = api.transcriptions_list_files(transcription_id)
+    telemetry.count("api_calls", operation="list_files")
+    files = [file_data for file_data in _paginate(api, pag_files) if file_data.kind in kinds]
+    if not files:
+        return
+
+    own_session = session is None
+    if own_session:
+        session = create_session(max_workers)
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(files))) as executor:
+            tasks = [executor.submit(_download_result, session, file_data) for file_data in files]
+            for task in as_completed(tasks):
+                yield task.result()
+    finally:
+        if own_session:
+            session.close()
+
+
+def _default_properties(destination_container_url=None, word_timestamps=False):
     # Specify transcription properties by passing a dict to the properties parameter. See
     # https://learn.microsoft.com/azure/cognitive-services/speech-service/batch-transcription-create?pivots=rest-api#request-configuration-options
     # for supported parameters.
@@ -155,6 +228,11 @@ def transcribe(blob_uri: str, callback=None):
     # properties.profanity_filter_mode = "Masked"
     # properties.destination_container_url = "<SAS Uri with at least write (w) permissions for an Azure Storage blob container that results should be written to>"
     # properties.time_to_live = "PT1H"
+    if destination_container_url:
+        properties.destination_container_url = destination_container_url
+    if word_timestamps:
+        properties.word_level_timestamps_enabled = True
+        properties.display_form_word_level_timestamps_enabled = True
 
     # uncomment the following block to enable and configure speaker separation
     properties.diarization_enabled = True
@@ -162,18 +240,13 @@ def transcribe(blob_uri: str, callback=None):
         swagger_client.DiarizationSpeakersProperties(min_count=1, max_count=10))
 
     # properties.language_identification = swagger_client.LanguageIdentificationProperties(["en-US", "ja-JP"])
+    return properties
 
-    # Use base models for transcription. Comment this block if you are using a custom model.
-    transcription_definition = transcribe_from_single_blob(blob_uri, properties)
 
-    # Uncomment this block to use custom models for transcription.
-    # transcription_definition = transcribe_with_custom_model(client, RECORDINGS_BLOB_URI, properties)
-
-    # uncomment the following block to enable and configure language identification prior to transcription
-    # Uncomment this block to transcribe all files from a container.
-    # transcription_definition = transcribe_from_container(RECORDINGS_CONTAINER_URI, properties)
-
-    created_transcription, status, headers = api.transcriptions_create_with_http_info(transcription=transcription_definition)
+def _submit(api, transcription_definition):
+    with telemetry.span("create"):
+        created_transcription, status, headers = api.transcriptions_create_with_http_info(transcription=transcription_definition)
+    telemetry.count("api_calls", operation="create")
 
     # get the transcription Id from the location URI
     transcription_id = headers["location"].split("/")[-1]
@@ -181,36 +254,178 @@ def transcribe(blob_uri: str, callback=None):
     # Log information about the created transcription. If you should ask for support, please
     # include this information.
     logging.info(f"Created new transcription with id '{transcription_id}' in region {SERVICE_REGION}")
+    return transcription_id
+
+
+def cancel(api, transcription_id):
+    """
+    Delete the transcription `transcription_id`, which also stops it on the service side.
+    """
+    try:
+        telemetry.count("api_calls", operation="delete")
+        api.transcriptions_delete(transcription_id)
+        logging.info(f"Canceled transcription {transcription_id}")
+    except swagger_client.rest.ApiException as exc:
+        logging.error(f"Could not delete transcription {transcription_id}: {exc}")
 
-    # logging.info("Checking status.")
 
-    completed = False
+def exists(api, transcription_id):
+    """
+    Whether the transcription `transcription_id` is still known to the service; deleted and
+    expired transcriptions answer 404.
+    """
+    try:
+        telemetry.count("api_calls", operation="get")
+        api.transcriptions_get(transcription_id)
+    except swagger_client.rest.ApiException as exc:
+        if exc.status == 404:
+            return False
+        raise
+    return True
+
+
+def pause(interval, deadline=None, cancel_event=None):
+    """
+    Sleep for `interval` seconds, cut short by `deadline` (a `time.time()` value) or by
+    `cancel_event` being set. Returns False if the caller should stop waiting.
+    """
+    if deadline is not None:
+        interval = min(interval, max(0, deadline - time.time()))
+    if cancel_event is not None:
+        cancel_event.wait(interval)
+    else:
+        time.sleep(interval)
+    return not ((deadline is not None and time.time() >= deadline)
+                or (cancel_event is not None and cancel_event.is_set()))
+
 
-    while not completed:
-        # wait for 5 seconds before refreshing the transcription status
-        time.sleep(5)
+def wait_for_completion(api, transcription_id, on_status=None, deadline=None, cancel_event=None):
+    """
+    Poll the transcription `transcription_id` until it is either failed or succeeded.
+    `on_status` is called with every new status the transcription moves to.
+
+    If `deadline` (a `time.time()` value) passes or `cancel_event` is set first, the
+    transcription is deleted on the service and None is returned.
+    """
+    last_status = None
+    # queue and run time are only known to the nearest poll
+    stage_start = time.time()
+    while True:
+        # wait for POLL_INTERVAL seconds before refreshing the transcription status
+        if not pause(POLL_INTERVAL, deadline, cancel_event):
+            cancel(api, transcription_id)
+            if on_status:
+                on_status("Canceled")
+            return None
 
         transcription = api.transcriptions_get(transcription_id)
+        telemetry.count("api_calls", operation="get")
+        telemetry.count("polls")
         # logging.info(f"Transcriptions status: {transcription.status}")
 
+        if on_status and transcription.status != last_status:
+            on_status(transcription.status)
+        if transcription.status != last_status and last_status in ("NotStarted", "Running"):
+            telemetry.record_span("queue" if last_status == "NotStarted" else "run", stage_start, time.time(),
+                                  transcription=transcription_id)
+            stage_start = time.time()
+        last_status = transcription.status
+
         if transcription.status in ("Failed", "Succeeded"):
-            completed = True
-
-        if transcription.status == "Succeeded":
-            pag_files = api.transcriptions_list_files(transcription_id)
-            for file_data in _paginate(api, pag_files):
-                if file_data.kind != "Transcription":
-                    continue
-
-                audiofilename = file_data.name
-                results_url = file_data.links.content_url
-                results = requests.get(results_url)
-                # logging.info(f"Results for {audiofilename}:\n{results.content.decode('utf-8')}")
-
-                if callback:
-                    callback()
-
-                return results.content.decode('utf-8')
-        elif transcription.status == "Failed":
-            logging.info(f"Transcription failed: {transcription.properties.error.message}")
-            return [transcription.properties.error.message]
\ No newline at end of file
+            return transcription
+
+
+def fetch_result(api, transcription):
+    """
+    Return the content of the transcription result of a completed single-file `transcription`,
+    or a list holding the error message if it failed. Jobs with several files are collected
+    with `collect_results`.
+    """
+    transcription_id = transcription._self.split("/")[-1]
+
+    if transcription.status == "Succeeded":
+        for _, parsed in collect_results(api, transcription_id, kinds=("Transcription",)):
+            return json.dumps(parsed, ensure_ascii=False, indent=2)
+    elif transcription.status == "Failed":
+        logging.info(f"Transcription failed: {transcription.properties.error.message}")
+        return [transcription.properties.error.message]
+
+
+def submit(blob_uri: str, destination_container_url=None, api=None, word_timestamps=False):
+    """
+    Create a transcription of `blob_uri` without waiting for it. When `destination_container_url`
+    is set the service writes the results into that container, where `harvest.Harvester` can
+    collect them in bulk. `word_timestamps` requests word level offsets in the result.
+    """
+    api = api or create_api()
+    properties = _default_properties(destination_container_url, word_timestamps)
+    transcription_definition = transcribe_from_single_blob(blob_uri, properties)
+    return _submit(api, transcription_definition)
+
+
+def transcribe(blob_uri: str, callback=None, timeout=None, cancel_event=None):
+    """
+    Transcribe the audio at `blob_uri` and return the content of its result. When `timeout`
+    seconds pass or `cancel_event` is set before the job completes, the job is deleted and
+    None is returned.
+    """
+    logging.info("Starting transcription client...")
+    deadline = time.time() + timeout if timeout is not None else None
+
+    api = create_api()
+    print(api.api_client.configuration.host, SUBSCRIPTION_KEY, blob_uri)
+
+    properties = _default_properties()
+
+    # Use base models for transcription. Comment this block if you are using a custom model.
+    transcription_definition = transcribe_from_single_blob(blob_uri, properties)
+
+    # Uncomment this block to use custom models for transcription.
+    # transcription_definition = transcribe_with_custom_model(api.api_client, RECORDINGS_BLOB_URI, properties)
+
+    # uncomment the following block to enable and configure language identification prior to transcription
+    # Uncomment this block to transcribe all files from a container; `transcribe_all` does so and
+    # downloads the result of every file.
+    # transcription_definition = transcribe_from_container(RECORDINGS_CONTAINER_URI, properties)
+
+    transcription_id = _submit(api, transcription_definition)
+
+    # logging.info("Checking status.")
+    transcription = wait_for_completion(api, transcription_id, deadline=deadline, cancel_event=cancel_event)
+    if transcription is None:
+        return None
+
+    contents = fetch_result(api, transcription)
+    if callback and transcription.status == "Succeeded":
+        callback()
+    return contents
+
+
+def transcribe_all(content, callback=None, max_workers=8):
+    """
+    Transcribe a list of audio uris or, if `content` is a string, every file of the container
+    located at `content`. Yields (source audio name, parsed result) pairs for every transcription
+    and report file of the job as soon as each download finishes.
+    """
+    logging.info("Starting transcription client...")
+
+    api = create_api()
+    properties = _default_properties()
+
+    if isinstance(content, str):
+        transcription_definition = transcribe_from_container(content, properties)
+    else:
+        transcription_definition = transcribe_from_single_blob(content[0], properties)
+        transcription_definition.content_urls = list(content)
+
+    transcription_id = _submit(api, transcription_definition)
+    transcription = wait_for_completion(api, transcription_id)
+
+    if transcription.status == "Failed":
+        logging.info(f"Transcription failed: {transcription.properties.error.message}")
+        return
+
+    yield from collect_results(api, transcription_id, max_workers=max_workers)
+
+    if callback:
+        callback()
@@ -0,0 +1,177 @@
+"""
+Per-stage tracing spans and counters for the transcription pipeline.
+
+Spans cover decoding, chunking, encoding, uploading, the service queue and run time, result
+downloads and parsing, per chunk and per job. Counters track API calls, retries, bytes
+uploaded and downloaded and poll iterations. Finished spans are appended to TRACE_FILE as
+JSON lines; `export` writes the counters and per-stage totals to METRICS_FILE in the
+Prometheus text format.
+
+Nothing is recorded until `configure` finds one of the two settings; until then `span`
+returns a shared no-op and `count` returns immediately.
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+_tracer = None
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """
+    A timed stage; use as a context manager. `set` adds attributes before it finishes.
+    """
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.id = next(tracer.ids)
+        self.parent = None
+        self.start = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = self.tracer.stack()
+        self.parent = stack[-1].id if stack else None
+        stack.append(self)
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.time()
+        self.tracer.stack().pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer.finish(self.name, self.start, end, self.attrs, self.id, self.parent)
+        return False
+
+
+class Tracer:
+    """
+    Collects spans and counters; see the module docstring.
+    """
+
+    def __init__(self, trace_path=None, metrics_path=None):
+        self.trace_path = trace_path
+        self.metrics_path = metrics_path
+        self.counters = Counter()
+        self.stage_seconds = defaultdict(float)
+        self.stage_count = Counter()
+        self.ids = itertools.count(1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._file = open(trace_path, "a", encoding="utf8") if trace_path else None
+
+    def stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def finish(self, name, start, end, attrs, span_id=None, parent=None):
+        line = {"name": name, "start": start, "end": end, "seconds": end - start, "pid": os.getpid(),
+                "thread": threading.current_thread().name, "id": span_id, "parent": parent, **attrs}
+        with self._lock:
+            self.stage_seconds[name] += end - start
+            self.stage_count[name] += 1
+            if self._file:
+                self._file.write(json.dumps(line, default=str) + "\n")
+
+    def count(self, name, value, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] += value
+
+    def prometheus(self):
+        lines = []
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append(f"# TYPE speech_{name}_total counter")
+            for (counter, labels), value in sorted(self.counters.items()):
+                if counter == name:
+                    lines.append(f"speech_{name}_total{_labels(labels)} {value}")
+        lines.append("# TYPE speech_stage_seconds summary")
+        for stage in sorted(self.stage_seconds):
+            lines.append(f'speech_stage_seconds_sum{{stage="{stage}"}} {self.stage_seconds[stage]:.6f}')
+            lines.append(f'speech_stage_seconds_count{{stage="{stage}"}} {self.stage_count[stage]}')
+        return "\n".join(lines) + "\n"
+
+    def export(self):
+        with self._lock:
+            if self._file:
+                self._file.flush()
+            if self.metrics_path:
+                with open(self.metrics_path, "w", encoding="utf8") as f:
+                    f.write(self.prometheus())
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def configure(trace_path=None, metrics_path=None):
+    """
+    Start recording if `trace_path` / `metrics_path` or TRACE_FILE / METRICS_FILE are set.
+    Returns whether recording is on.
+    """
+    global _tracer
+    trace_path = trace_path or os.getenv("TRACE_FILE")
+    metrics_path = metrics_path or os.getenv("METRICS_FILE")
+    if trace_path or metrics_path:
+        _tracer = Tracer(trace_path, metrics_path)
+    return _tracer is not None
+
+
+def enabled():
+    return _tracer is not None
+
+
+def span(name, **attrs):
+    """
+    Context manager timing the stage `name`, e.g. `with telemetry.span("upload", chunk=i):`.
+    """
+    if _tracer is None:
+        return _NOOP
+    return Span(_tracer, name, attrs)
+
+
+def record_span(name, start, end, **attrs):
+    """
+    Record a stage whose start and end (`time.time()` values) were observed separately, such as
+    the time a job spent queued on the service.
+    """
+    if _tracer is not None:
+        _tracer.finish(name, start, end, attrs)
+
+
+def count(name, value=1, **labels):
+    if _tracer is not None:
+        _tracer.count(name, value, labels)
+
+
+def export():
+    """
+    Flush the trace file and write the metrics file.
+    """
+    if _tracer is not None:
+        _tracer.export()
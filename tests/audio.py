@@ -0,0 +1,32 @@
+"""
+Synthetic 16 kHz mono test audio.
+"""
+import numpy as np
+from pydub import AudioSegment
+
+SAMPLE_RATE = 16000
+
+
+def segment(samples):
+    data = (np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes()
+    return AudioSegment(data, frame_rate=SAMPLE_RATE, sample_width=2, channels=1)
+
+
+def tone(seconds, frequency=220, amplitude=0.3):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return amplitude * np.sin(2 * np.pi * frequency * t)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE))
+
+
+def noise(seconds, amplitude=0.01, seed=0):
+    return amplitude * np.random.default_rng(seed).standard_normal(int(seconds * SAMPLE_RATE))
+
+
+def bursts(count, on_seconds, off_seconds):
+    """
+    `count` tone bursts separated by silence.
+    """
+    return np.concatenate([np.concatenate((tone(on_seconds), silence(off_seconds))) for _ in range(count)])
@@ -0,0 +1,96 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import audio_streams
+from audio_streams import AudioReaderCallback, _ReadAhead
+
+
+class SlowSource(io.BytesIO):
+    """
+    Returns at most `step` bytes per call, like a socket.
+    """
+
+    def __init__(self, data, step=7):
+        super().__init__(data)
+        self.step = step
+
+    def readinto(self, buffer):
+        return super().readinto(memoryview(buffer)[:self.step])
+
+
+class FailingSource:
+
+    def readinto(self, buffer):
+        raise OSError("connection reset")
+
+
+def read_all(reader, size):
+    buffer = memoryview(bytearray(size))
+    chunks = []
+    while True:
+        count = reader.readinto(buffer)
+        if not count:
+            return b"".join(chunks)
+        chunks.append(bytes(buffer[:count]))
+
+
+class TestReadAhead(unittest.TestCase):
+
+    def test_reads_the_whole_source_in_order(self):
+        data = bytes(range(256)) * 40
+        for blocks, block_size, read_size in ((1, 64, 100), (4, 1000, 33), (2, 4096, 8192)):
+            with self.subTest(blocks=blocks, block_size=block_size, read_size=read_size):
+                reader = _ReadAhead(SlowSource(data), blocks, block_size)
+                self.assertEqual(read_all(reader, read_size), data)
+                # stays at the end
+                self.assertEqual(reader.readinto(memoryview(bytearray(10))), 0)
+                reader.close()
+
+    def test_empty_source(self):
+        reader = _ReadAhead(io.BytesIO(b""), 2, 16)
+        self.assertEqual(reader.readinto(memoryview(bytearray(10))), 0)
+        reader.close()
+
+    def test_errors_reach_the_reader(self):
+        reader = _ReadAhead(FailingSource(), 2, 16)
+        with self.assertRaisesRegex(OSError, "connection reset"):
+            reader.readinto(memoryview(bytearray(10)))
+
+    def test_close_stops_the_thread_waiting_for_a_buffer(self):
+        reader = _ReadAhead(io.BytesIO(b"x" * 1000), 1, 10)
+        reader.readinto(memoryview(bytearray(5)))
+        reader.close()
+        reader._thread.join(5)
+        self.assertFalse(reader._thread.is_alive())
+
+
+class TestAudioReaderCallback(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "audio.wav")
+        with open(self.path, "wb") as f:
+            f.write(b"RIFF" + b"\0" * 1000)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_empty_readahead_setting_uses_the_default(self):
+        with mock.patch.dict(os.environ, {"READAHEAD_BLOCKS": ""}):
+            callback = AudioReaderCallback(self.path)
+        self.assertIs(callback._reader, callback._source)
+        callback.close()
+
+    def test_readahead_setting(self):
+        with mock.patch.dict(os.environ, {"READAHEAD_BLOCKS": "2"}):
+            callback = AudioReaderCallback(self.path, block_size=64)
+        self.assertIsInstance(callback._reader, audio_streams._ReadAhead)
+        self.assertEqual(read_all(callback._reader, 100), b"RIFF" + b"\0" * 1000)
+        callback.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import cli_batch
+import cli_multiproc
+from cli_batch import BatchScheduler, FileJob, expand_inputs
+from journal import JobJournal
+
+
+class TestExpandInputs(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        os.makedirs(os.path.join(self.root, "data"))
+        for name in ("data/b.mp3", "data/a.mp3", "data/notes.txt", "2023-01.mp3", "2023-02.mp3", "2024-01.mp3"):
+            open(os.path.join(self.root, name), "w").close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def test_directories_and_globs_are_expanded(self):
+        paths = expand_inputs([self.path("data"), self.path("2023-*.mp3")])
+        self.assertEqual(paths, [self.path("data/a.mp3"), self.path("data/b.mp3"),
+                                 self.path("2023-01.mp3"), self.path("2023-02.mp3")])
+
+    def test_manifest_lines_are_added_without_duplicates(self):
+        manifest = self.path("backlog.txt")
+        with open(manifest, "w", encoding="utf8") as f:
+            f.write(f"# backlog\n{self.path('data/a.mp3')}\n\n{self.path('2024-01.mp3')}\n")
+        paths = expand_inputs([self.path("data/a.mp3")], manifest)
+        self.assertEqual(paths, [self.path("data/a.mp3"), self.path("2024-01.mp3")])
+
+    def test_missing_files_are_kept(self):
+        # they fail when loaded, and show up in the summary
+        self.assertEqual(expand_inputs(["missing.mp3"]), ["missing.mp3"])
+
+
+class TestLoadFailure(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = JobJournal(os.path.join(self.directory.name, "batch.journal.db"))
+
+    def tearDown(self):
+        self.journal.close()
+        self.directory.cleanup()
+
+    def test_unreadable_recording_is_written_empty(self):
+        for chunk_mode in ("silence", "fixed", "planned"):
+            with self.subTest(chunk_mode=chunk_mode), mock.patch.object(cli_multiproc, "chunk_mode", chunk_mode), \
+                    mock.patch.object(cli_batch, "load_chunks", side_effect=OSError("not an mp3")):
+                job = FileJob(os.path.join(self.directory.name, f"{chunk_mode}.mp3"), self.directory.name)
+                scheduler = BatchScheduler([job], self.journal, encode_workers=1, transcribe_workers=1)
+
+                self.assertEqual(list(scheduler._work_items(encoder=None)), [])
+
+                self.assertIn("not an mp3", job.error)
+                self.assertEqual(scheduler.completed, 1)
+                with open(job.out_path, encoding="utf8") as f:
+                    self.assertEqual(f.read(), "")
+                self.assertIn("not an mp3", scheduler.summary())
+
+
+if __name__ == '__main__':
+    unittest.main()
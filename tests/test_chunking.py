@@ -0,0 +1,64 @@
+import unittest
+
+import chunking
+import vad
+from chunking import Window
+from tests.audio import bursts, segment
+
+
+def word(text, offset_ms):
+    return {"word": text, "displayText": text, "offsetInTicks": offset_ms * vad.TICKS_PER_MS}
+
+
+def phrase(words, display=None):
+    return {"recognitionStatus": "Success", "offsetInTicks": words[0]["offsetInTicks"],
+            "nBest": [{"display": display or " ".join(w["word"] for w in words), "displayWords": words}]}
+
+
+class TestStitch(unittest.TestCase):
+
+    def setUp(self):
+        # two windows cut at 10 s with 1 s of overlap on each side
+        self.windows = [Window(0, 0, 11000, 0, 10000), Window(1, 9000, 20000, 10000, 20000)]
+
+    def test_overlap_words_are_kept_once(self):
+        first = {"recognizedPhrases": [phrase([word("one", 8000), word("two", 9500), word("three", 10500)])]}
+        # the second window hears the overlap again, offsets relative to its own start
+        second = {"recognizedPhrases": [phrase([word("two", 500), word("three", 1500), word("four", 3000)])]}
+
+        lines = chunking.stitch(self.windows, [first, second])
+
+        self.assertEqual(lines, ["one two", "three four"])
+        self.assertEqual(" ".join(lines).split().count("two"), 1)
+        self.assertEqual(" ".join(lines).split().count("three"), 1)
+
+    def test_phrases_inside_the_owned_range_keep_their_display_text(self):
+        first = {"recognizedPhrases": [phrase([word("hello", 1000), word("world", 2000)], "Hello, world.")]}
+        self.assertEqual(chunking.stitch(self.windows, [first, None]), ["Hello, world."])
+
+    def test_phrases_without_words_are_assigned_by_offset(self):
+        overlap = {"recognitionStatus": "Success", "offsetInTicks": 10500 * vad.TICKS_PER_MS,
+                   "nBest": [{"display": "late"}]}
+        first = {"recognizedPhrases": [overlap]}
+        second = {"recognizedPhrases": [dict(overlap, offsetInTicks=1500 * vad.TICKS_PER_MS)]}
+        self.assertEqual(chunking.stitch(self.windows, [first, second]), ["late"])
+
+    def test_no_space_locales(self):
+        first = {"recognizedPhrases": [phrase([word("今日", 9000), word("は", 10500)])]}
+        self.assertEqual(chunking.stitch(self.windows, [first, None], locale="ja-JP"), ["今日"])
+
+
+class TestFixedWindows(unittest.TestCase):
+
+    def test_windows_cover_the_audio_and_overlap(self):
+        audio = segment(bursts(20, 4.0, 1.0))
+        windows = chunking.fixed_windows(audio, window_ms=20000, overlap_ms=2000)
+        self.assertEqual(windows[0].keep_from_ms, 0)
+        self.assertEqual(windows[-1].keep_to_ms, len(audio))
+        for previous, following in zip(windows, windows[1:]):
+            self.assertEqual(previous.keep_to_ms, following.keep_from_ms)
+            self.assertLess(following.start_ms, previous.end_ms)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from unittest import mock
+
+import conversation
+from conversation import FailedSession, SessionManager
+
+
+class FakeSession:
+    """
+    A `ConversationSession` that finishes at once with the lines of its audio config.
+    """
+
+    def __init__(self, name, speech_config, audio_config, on_line=None):
+        self.name = name
+        self.lines = audio_config
+        self.error = None
+
+    def run(self, timeout=None):
+        if self.lines == "hang up":
+            raise RuntimeError("connection closed")
+        return self
+
+
+def unreadable():
+    raise FileNotFoundError("missing.mp3")
+
+
+class TestSessionManager(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(conversation, "ConversationSession", FakeSession)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_failed_sessions_are_yielded_with_their_error(self):
+        recordings = [("first", lambda: [(1, "😀", "hello", 0)]), ("missing", unreadable),
+                      ("dropped", lambda: "hang up"), ("last", lambda: [])]
+
+        with SessionManager(speech_config=None, max_sessions=2) as manager:
+            sessions = {session.name: session for session in manager.run_all(recordings)}
+
+        self.assertEqual(set(sessions), {"first", "missing", "dropped", "last"})
+        self.assertIsNone(sessions["first"].error)
+        self.assertEqual(sessions["first"].lines, [(1, "😀", "hello", 0)])
+        self.assertIsInstance(sessions["missing"], FailedSession)
+        self.assertIn("missing.mp3", sessions["missing"].error)
+        self.assertEqual(sessions["missing"].lines, [])
+        self.assertIn("connection closed", sessions["dropped"].error)
+        self.assertIsNone(sessions["last"].error)
+
+
+if __name__ == '__main__':
+    unittest.main()
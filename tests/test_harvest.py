@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+import unittest
+from collections import Counter, namedtuple
+
+from harvest import Harvester
+
+BlobProperties = namedtuple("BlobProperties", ["name", "size"])
+
+
+class FakeDownload:
+
+    def __init__(self, data):
+        self.data = data
+
+    def readall(self):
+        return self.data
+
+
+class FakeContainerClient:
+    """
+    The `list_blobs` and `download_blob` calls of an `azure.storage.blob.ContainerClient`.
+    """
+
+    def __init__(self, blobs):
+        self.blobs = blobs
+        self.downloads = Counter()
+
+    def list_blobs(self):
+        return [BlobProperties(name, len(data)) for name, data in self.blobs.items()]
+
+    def download_blob(self, name):
+        self.downloads[name] += 1
+        return FakeDownload(self.blobs[name])
+
+
+def result(job_id, i):
+    return json.dumps({"source": f"chunk{i}.mp3", "job": job_id, "recognizedPhrases": []}).encode("utf8")
+
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.out_dir = self.directory.name
+        self.container = FakeContainerClient({
+            "job-1/contenturl_0.json": result("job-1", 0),
+            "job-1/report.json": b'{"successfulTranscriptionsCount": 1}',
+            "job-2/contenturl_0.json": result("job-2", 0),
+            "job-2/contenturl_0.txt": b"not a result",
+            "job-3/contenturl_0.json": result("job-3", 0),
+        })
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def harvester(self):
+        harvester = Harvester("https://fake.blob.core.windows.net/results?sig=fake", out_dir=self.out_dir)
+        harvester.container_client = self.container
+        return harvester
+
+    def sweep(self, job_ids):
+        return {blob_name: (job_id, parsed) for job_id, blob_name, parsed in self.harvester().sweep(job_ids)}
+
+    def test_results_of_the_given_jobs_are_downloaded(self):
+        results = self.sweep(["job-1", "job-2"])
+
+        self.assertEqual(set(results), {"job-1/contenturl_0.json", "job-1/report.json", "job-2/contenturl_0.json"})
+        self.assertEqual(results["job-2/contenturl_0.json"], ("job-2", json.loads(result("job-2", 0))))
+        with open(os.path.join(self.out_dir, "job-1", "contenturl_0.json"), "rb") as f:
+            self.assertEqual(f.read(), result("job-1", 0))
+        self.assertFalse([name for _, _, names in os.walk(self.out_dir) for name in names if name.endswith(".part")])
+
+    def test_pulled_blobs_are_read_from_disk(self):
+        self.sweep(["job-1", "job-2"])
+        results = self.sweep(["job-1", "job-2"])
+
+        # yielded again, without downloading them again
+        self.assertEqual(len(results), 3)
+        self.assertEqual(set(self.container.downloads.values()), {1})
+
+    def test_partial_files_are_downloaded_again(self):
+        self.sweep(["job-1"])
+        with open(os.path.join(self.out_dir, "job-1", "contenturl_0.json"), "wb") as f:
+            f.write(b'{"source"')
+
+        results = self.sweep(["job-1"])
+
+        self.assertEqual(results["job-1/contenturl_0.json"][1]["job"], "job-1")
+        self.assertEqual(self.container.downloads["job-1/contenturl_0.json"], 2)
+        self.assertEqual(self.container.downloads["job-1/report.json"], 1)
+
+    def test_no_jobs(self):
+        self.assertEqual(self.sweep([]), {})
+        self.assertEqual(self.container.downloads, Counter())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+import speech
+from hedging import HedgePolicy, wait_hedged
+from tests.test_journal import JournalTestCase
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from fake_speech_service import FakeSpeechService  # noqa: E402
+
+AUDIO_URL = "https://fake.blob.core.windows.net/audio/chunk0.mp3"
+
+
+class TestWaitHedged(unittest.TestCase):
+
+    def setUp(self):
+        self.service = FakeSpeechService(queue_delay=0, run_seconds=0.1, seed=1).start()
+        self.saved = speech.API_HOST, speech.SUBSCRIPTION_KEY, speech.LOCALE, speech.POLL_INTERVAL
+        speech.API_HOST = self.service.host
+        speech.SUBSCRIPTION_KEY = "fake"
+        speech.LOCALE = "en-US"
+        speech.POLL_INTERVAL = 0.05
+        self.api = speech.create_api()
+
+    def tearDown(self):
+        speech.API_HOST, speech.SUBSCRIPTION_KEY, speech.LOCALE, speech.POLL_INTERVAL = self.saved
+        self.service.stop()
+
+    def straggler(self, delay=60):
+        transcription_id = speech.submit(AUDIO_URL, api=self.api)
+        job = self.service.jobs[transcription_id]
+        job.started += delay
+        job.finished += delay
+        return transcription_id
+
+    def hedge_now(self):
+        # one recorded duration of 0 s makes every running job a straggler
+        policy = HedgePolicy(percentile=0.5, min_samples=1, max_duplicates=1)
+        policy.record(0.0)
+        return policy
+
+    def test_duplicate_wins_and_straggler_is_deleted(self):
+        transcription_id = self.straggler()
+        hedges = []
+        winners = []
+
+        def on_winner(job_id):
+            # the original is still there when the winner is recorded
+            self.assertIn(transcription_id, self.service.jobs)
+            winners.append(job_id)
+
+        transcription = wait_hedged(self.api, transcription_id, lambda: speech.submit(AUDIO_URL, api=self.api),
+                                    self.hedge_now(), on_hedge=hedges.append, on_winner=on_winner,
+                                    deadline=time.time() + 30)
+
+        self.assertEqual(transcription.status, "Succeeded")
+        winner = transcription._self.split("/")[-1]
+        self.assertEqual([winner], hedges)
+        self.assertEqual([winner], winners)
+        # the straggler is gone from the service, the winner is still there
+        self.assertNotIn(transcription_id, self.service.jobs)
+        self.assertIn(winner, self.service.jobs)
+        self.assertEqual(self.service.stats["deleted"], 1)
+
+    def test_no_duplicate_without_a_straggler(self):
+        transcription_id = speech.submit(AUDIO_URL, api=self.api)
+        hedges = []
+        policy = HedgePolicy(min_samples=5)
+
+        transcription = wait_hedged(self.api, transcription_id, lambda: speech.submit(AUDIO_URL, api=self.api),
+                                    policy, on_hedge=hedges.append, on_winner=hedges.append,
+                                    deadline=time.time() + 30)
+
+        self.assertEqual(transcription._self.split("/")[-1], transcription_id)
+        self.assertEqual(hedges, [])
+        self.assertEqual(self.service.stats["created"], 1)
+
+    def test_deadline_deletes_every_job(self):
+        transcription_id = self.straggler()
+        statuses = []
+
+        def resubmit():
+            return self.straggler()
+
+        transcription = wait_hedged(self.api, transcription_id, resubmit, self.hedge_now(),
+                                    on_status=statuses.append, deadline=time.time() + 0.5)
+
+        self.assertIsNone(transcription)
+        self.assertEqual(statuses[-1], "Canceled")
+        self.assertEqual(self.service.jobs, {})
+        self.assertEqual(self.service.stats["deleted"], 2)
+
+    def test_cancel_event_deletes_the_job(self):
+        transcription_id = self.straggler()
+        cancel_event = threading.Event()
+        cancel_event.set()
+
+        transcription = wait_hedged(self.api, transcription_id, lambda: speech.submit(AUDIO_URL, api=self.api),
+                                    HedgePolicy(), cancel_event=cancel_event)
+
+        self.assertIsNone(transcription)
+        self.assertNotIn(transcription_id, self.service.jobs)
+
+    def test_requests_after_a_delete_reuse_the_connection(self):
+        for _ in range(3):
+            transcription_id = speech.submit(AUDIO_URL, api=self.api)
+            speech.cancel(self.api, transcription_id)
+        self.assertEqual(self.service.stats["deleted"], 3)
+        self.assertEqual(self.service.jobs, {})
+
+
+class TestHedgeJournal(JournalTestCase):
+
+    def test_hedges_survive_a_restart_until_cleared(self):
+        self.journal.mark_submitted("a.mp3", 0, "job-0")
+        self.journal.mark_hedged("a.mp3", 0, "job-0-duplicate")
+        self.reopen()
+        self.assertEqual(self.journal.hedges("a.mp3", 0), ["job-0-duplicate"])
+        self.journal.clear_hedges("a.mp3", 0)
+        self.assertEqual(self.journal.hedges("a.mp3", 0), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
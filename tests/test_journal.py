@@ -0,0 +1,141 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from pydub import AudioSegment
+
+import cli_multiproc
+import speech
+from journal import JobJournal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from fake_speech_service import FakeSpeechService  # noqa: E402
+
+
+class JournalTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "test.journal.db")
+        self.journal = JobJournal(self.path)
+
+    def tearDown(self):
+        self.journal.close()
+        self.directory.cleanup()
+
+    def reopen(self):
+        self.journal.close()
+        self.journal = JobJournal(self.path)
+
+
+class TestResume(JournalTestCase):
+
+    def test_progress_survives_a_restart(self):
+        self.journal.mark_uploaded("a.mp3", 0, "chunk0.mp3", 30000)
+        self.journal.mark_submitted("a.mp3", 0, "job-0")
+        self.journal.mark_uploaded("a.mp3", 1, "chunk1.mp3", 20000)
+        self.journal.mark_submitted("a.mp3", 1, "job-1")
+        self.journal.mark_status("a.mp3", 1, "Running")
+        self.journal.mark_downloaded("a.mp3", 1, '{"recognizedPhrases": []}')
+        self.journal.mark_uploaded("a.mp3", 2, "chunk2.mp3", 10000)
+        self.reopen()
+
+        first, second, third = self.journal.chunks("a.mp3")
+        self.assertEqual((first["status"], first["transcription_id"]), ("Submitted", "job-0"))
+        self.assertEqual((second["status"], second["result"]), ("Downloaded", '{"recognizedPhrases": []}'))
+        self.assertEqual((third["status"], third["transcription_id"]), ("Uploaded", None))
+        self.assertIsNone(self.journal.get("a.mp3", 3))
+
+    def test_sources_are_kept_apart(self):
+        self.journal.mark_submitted("a.mp3#silence", 0, "job-a")
+        self.journal.mark_submitted("a.mp3#planned", 0, "job-b")
+        self.assertEqual(self.journal.get("a.mp3#silence", 0)["transcription_id"], "job-a")
+        self.assertEqual(self.journal.get("a.mp3#planned", 0)["transcription_id"], "job-b")
+
+    def test_timings_and_queue_waits(self):
+        self.journal.mark_uploaded("a.mp3", 0, "chunk0.mp3", 30000)
+        self.journal.mark_submitted("a.mp3", 0, "job-0")
+        self.journal.mark_status("a.mp3", 0, "Running")
+        self.journal.mark_downloaded("a.mp3", 0, "{}")
+        self.journal.mark_uploaded("a.mp3", 1, "chunk1.mp3", 30000)
+        self.journal.mark_submitted("a.mp3", 1, "job-1")
+
+        timings = self.journal.timings()
+        self.assertEqual(len(timings), 1)
+        self.assertEqual(timings[0][0], 30000)
+        self.assertGreaterEqual(timings[0][1], 0)
+        self.assertEqual(len(self.journal.queue_waits()), 1)
+        self.assertEqual(self.journal.queue_waits(since=time.time() + 60), [])
+        self.assertEqual(self.journal.in_flight(), 1)
+
+
+class TestChangedAudio(JournalTestCase):
+
+    def test_chunks_with_other_boundaries_are_discarded(self):
+        self.journal.mark_uploaded("a.mp3", 0, "chunk0.mp3", 30000)
+        self.journal.mark_submitted("a.mp3", 0, "job-0")
+        self.journal.mark_uploaded("a.mp3", 1, "chunk1.mp3", 20000)
+        self.journal.mark_uploaded("a.mp3", 2, "chunk2.mp3", 10000)
+        chunks = [AudioSegment.silent(30000), AudioSegment.silent(25000)]
+
+        cli_multiproc.discard_changed(self.journal, "a.mp3", chunks)
+
+        self.assertEqual([entry["idx"] for entry in self.journal.chunks("a.mp3")], [0])
+        self.assertEqual(self.journal.get("a.mp3", 0)["transcription_id"], "job-0")
+
+    def test_edited_recording_gets_another_source(self):
+        path = os.path.join(self.directory.name, "a.mp3")
+        with open(path, "wb") as f:
+            f.write(b"first")
+        source = cli_multiproc.journal_source(path)
+        self.assertEqual(cli_multiproc.journal_source(path), source)
+
+        with open(path, "wb") as f:
+            f.write(b"second take")
+        self.assertNotEqual(cli_multiproc.journal_source(path), source)
+
+
+class TestReattach(JournalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = FakeSpeechService(queue_delay=0, run_seconds=0.1, seed=1).start()
+        self.saved = speech.API_HOST, speech.SUBSCRIPTION_KEY, speech.LOCALE
+        speech.API_HOST = self.service.host
+        speech.SUBSCRIPTION_KEY = "fake"
+        speech.LOCALE = "en-US"
+        self.api = speech.create_api()
+        patcher = mock.patch.object(cli_multiproc, "connection_string", self.service.connection_string())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        speech.API_HOST, speech.SUBSCRIPTION_KEY, speech.LOCALE = self.saved
+        self.service.stop()
+        super().tearDown()
+
+    def test_running_transcription_is_reattached(self):
+        self.journal.mark_uploaded("a.mp3", 0, "chunk0.mp3", 30000)
+        transcription_id = speech.submit(cli_multiproc.chunk_url(0), api=self.api)
+        self.journal.mark_submitted("a.mp3", 0, transcription_id)
+
+        self.assertEqual(cli_multiproc._ensure_submitted(self.journal, "a.mp3", self.api, 0, None, 30000),
+                         transcription_id)
+        self.assertEqual(self.service.stats["created"], 1)
+
+    def test_deleted_transcription_is_resubmitted(self):
+        self.journal.mark_uploaded("a.mp3", 0, "chunk0.mp3", 30000)
+        self.journal.mark_submitted("a.mp3", 0, "deleted-job")
+
+        transcription_id = cli_multiproc._ensure_submitted(self.journal, "a.mp3", self.api, 0, None, 30000)
+
+        self.assertNotEqual(transcription_id, "deleted-job")
+        self.assertIn(transcription_id, self.service.jobs)
+        self.assertEqual(self.journal.get("a.mp3", 0)["transcription_id"], transcription_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import threading
+import time
+import unittest
+
+from membudget import MemoryBudget
+
+
+class TestMemoryBudget(unittest.TestCase):
+
+    def test_small_chunks_stay_in_memory(self):
+        budget = MemoryBudget(limit_bytes=1000, spill_bytes=500)
+        buffer = budget.store(b"x" * 100)
+        self.assertEqual(len(buffer), 100)
+        self.assertEqual(buffer.read(), b"x" * 100)
+        self.assertEqual(budget.used_bytes, 100)
+        self.assertEqual(budget.spilled_bytes, 0)
+        self.assertFalse(buffer._rolled)
+
+        buffer.close()
+        self.assertEqual(budget.used_bytes, 0)
+
+    def test_large_chunks_spill_to_disk(self):
+        budget = MemoryBudget(limit_bytes=1000, spill_bytes=500)
+        buffer = budget.store(b"y" * 600)
+        self.assertTrue(buffer._rolled)
+        self.assertEqual(budget.used_bytes, 0)
+        self.assertEqual(budget.spilled_bytes, 600)
+        self.assertEqual(buffer.read(), b"y" * 600)
+        buffer.close()
+
+    def test_close_twice_releases_once(self):
+        budget = MemoryBudget(limit_bytes=1000, spill_bytes=500)
+        buffer = budget.store(b"x" * 100)
+        other = budget.store(b"x" * 100)
+        buffer.close()
+        buffer.close()
+        self.assertEqual(budget.used_bytes, 100)
+        other.close()
+
+    def test_store_blocks_until_released(self):
+        budget = MemoryBudget(limit_bytes=300, spill_bytes=200)
+        held = [budget.store(b"x" * 200), budget.store(b"x" * 100)]
+        stored = threading.Event()
+
+        def store():
+            held.append(budget.store(b"x" * 150))
+            stored.set()
+
+        thread = threading.Thread(target=store)
+        thread.start()
+        self.assertFalse(stored.wait(0.2))
+
+        held[0].close()
+        self.assertTrue(stored.wait(5))
+        thread.join()
+        self.assertEqual(budget.used_bytes, 250)
+        self.assertEqual(budget.peak_bytes, 300)
+        for buffer in held[1:]:
+            buffer.close()
+        self.assertEqual(budget.used_bytes, 0)
+
+    def test_chunk_larger_than_the_budget_is_admitted_alone(self):
+        budget = MemoryBudget(limit_bytes=100, spill_bytes=1000)
+        start = time.time()
+        buffer = budget.store(b"x" * 500)
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(budget.used_bytes, 500)
+        buffer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import chunking
+import cli_multiproc
+from tests.audio import bursts, noise, segment
+from tests.test_journal import JournalTestCase
+
+
+class TestPlannedResume(JournalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.chunk_mode = cli_multiproc.chunk_mode
+        cli_multiproc.chunk_mode = "planned"
+        samples = bursts(12, 6.0, 2.5)
+        self.audio = segment(samples + noise(len(samples) / 16000, amplitude=0.001))
+
+    def tearDown(self):
+        cli_multiproc.chunk_mode = self.chunk_mode
+        super().tearDown()
+
+    def set_timings(self, overhead_seconds, count=10):
+        # replace the history with completed chunks whose timings fit `overhead_seconds` per job
+        self.journal._execute("DELETE FROM events WHERE source LIKE 'old-%'")
+        self.journal._execute("DELETE FROM chunks WHERE source LIKE 'old-%'")
+        for i in range(count):
+            source = f"old-{overhead_seconds}"
+            self.journal.mark_uploaded(source, i, f"chunk{i}.mp3", 10000 * (i + 1))
+            self.journal.mark_submitted(source, i, f"job-{i}")
+        self.journal._execute(
+            "UPDATE events SET at = at - ? - 0.2 * (SELECT duration_ms FROM chunks c WHERE c.source = events.source "
+            "AND c.idx = events.idx) / 1000 WHERE status = 'Submitted' AND source = ?",
+            (overhead_seconds, f"old-{overhead_seconds}"))
+        for i in range(count):
+            self.journal.mark_downloaded(f"old-{overhead_seconds}", i, "{}")
+
+    def spans(self, chunks):
+        return [len(chunk) for chunk in chunks]
+
+    def test_changed_timings_replan_without_a_saved_plan(self):
+        self.set_timings(0)
+        cheap, _ = cli_multiproc.split_audio(self.audio, self.journal)
+        self.set_timings(60)
+        expensive, _ = cli_multiproc.split_audio(self.audio, self.journal)
+        # the precondition of the resume test: the plan depends on the timings
+        self.assertNotEqual(self.spans(cheap), self.spans(expensive))
+
+    def test_resume_replays_the_saved_plan(self):
+        self.set_timings(0)
+        first, _ = cli_multiproc.split_audio(self.audio, self.journal, "a.mp3#planned")
+        self.reopen()
+        self.set_timings(60)
+        resumed, _ = cli_multiproc.split_audio(self.audio, self.journal, "a.mp3#planned")
+
+        self.assertEqual(self.spans(resumed), self.spans(first))
+        self.assertTrue(all(np.array_equal(a.get_array_of_samples(), b.get_array_of_samples())
+                            for a, b in zip(first, resumed)))
+
+
+class TestTargetJobs(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # 12 bursts of 6 s with 2.5 s of silence between them
+        samples = bursts(12, 6.0, 2.5)
+        cls.planner = chunking.ChunkPlanner(segment(samples + noise(len(samples) / 16000, amplitude=0.001)))
+
+    def test_plan_has_the_target_number_of_jobs(self):
+        for target_jobs in (1, 2, 3, 4, 12):
+            with self.subTest(target_jobs=target_jobs):
+                spans = self.planner.optimize(chunking.CostModel(), 5, target_jobs=target_jobs)
+                self.assertEqual(len(spans), target_jobs)
+
+    def test_plan_never_has_more_jobs_than_the_target(self):
+        # pieces shorter than min_ms are merged, so 8 jobs cannot be planned exactly
+        spans = self.planner.optimize(chunking.CostModel(), 5, target_jobs=8)
+        self.assertLessEqual(len(spans), 8)
+        self.assertGreaterEqual(len(spans), 6)
+        # more jobs than speech ranges gives one chunk per range
+        self.assertEqual(len(self.planner.optimize(chunking.CostModel(), 5, target_jobs=20)), 12)
+
+
+class TestPlannerConcurrency(JournalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(cli_multiproc, "chunk_mode", "planned")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.audio = segment(bursts(3, 6.0, 2.5))
+
+    def planned_concurrency(self, **kwargs):
+        with mock.patch.object(chunking.ChunkPlanner, "optimize", return_value=[(0, 1000)]) as optimize:
+            cli_multiproc.split_audio(self.audio, self.journal, **kwargs)
+        return optimize.call_args.args[1]
+
+    def test_default_pool_size_without_auto_tune(self):
+        with mock.patch.dict(os.environ, {"AUTO_TUNE": "", "SPEECH_CONCURRENCY_QUOTA": "40"}):
+            self.assertEqual(self.planned_concurrency(), 5)
+
+    def test_service_quota_with_auto_tune(self):
+        with mock.patch.dict(os.environ, {"AUTO_TUNE": "1", "SPEECH_CONCURRENCY_QUOTA": "40"}):
+            self.assertEqual(self.planned_concurrency(), 40)
+
+    def test_explicit_concurrency(self):
+        self.assertEqual(self.planned_concurrency(concurrency=12), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
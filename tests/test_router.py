@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import router
+from chunking import CostModel
+from journal import JobJournal
+from router import LatencyRouter
+
+TEN_MINUTES_MS = 600000
+
+
+class TestRoute(unittest.TestCase):
+
+    def router(self, **kwargs):
+        # batch chunks take 30 s plus 0.1 s per audio second; real-time sessions 3 s plus real time
+        kwargs.setdefault("batch_model", CostModel(30, 0.1))
+        kwargs.setdefault("history", 10)
+        return LatencyRouter(**kwargs)
+
+    def test_free_quota_goes_to_batch(self):
+        route = self.router(batch_slots=20).route("a.mp3", TEN_MINUTES_MS)
+        self.assertEqual((route.mode, route.reason), ("batch", "lower expected time"))
+        # ten 60 s chunks side by side
+        self.assertAlmostEqual(route.batch_seconds, 36)
+        # two rounds on eight sessions
+        self.assertAlmostEqual(route.realtime_seconds, 126)
+        self.assertEqual(route.expected_seconds, route.batch_seconds)
+
+    def test_busy_quota_goes_to_real_time(self):
+        route = self.router(batch_slots=1).route("a.mp3", TEN_MINUTES_MS)
+        self.assertEqual(route.mode, "realtime")
+        self.assertAlmostEqual(route.batch_seconds, 360)
+
+    def test_long_queue_goes_to_real_time(self):
+        route = self.router(queue_shift_seconds=600).route("a.mp3", TEN_MINUTES_MS)
+        self.assertEqual(route.mode, "realtime")
+
+    def test_corrections_scale_the_predictions(self):
+        route = self.router(corrections={"batch": 5.0}).route("a.mp3", TEN_MINUTES_MS)
+        self.assertEqual(route.mode, "realtime")
+        self.assertAlmostEqual(route.batch_seconds, 36)
+
+    def test_batch_only_cases(self):
+        cases = [
+            ("word timestamps", self.router(), {"word_timestamps": True}),
+            ("too little batch history in the journal", self.router(history=2), {}),
+            ("longer than the real-time limit", self.router(batch_slots=1, realtime_max_seconds=300), {}),
+            ("no real-time sessions", self.router(batch_slots=1, realtime_sessions=0), {}),
+        ]
+        for reason, latency_router, kwargs in cases:
+            with self.subTest(reason=reason):
+                route = latency_router.route("a.mp3", TEN_MINUTES_MS, **kwargs)
+                self.assertEqual((route.mode, route.reason), ("batch", reason))
+
+
+class TestJournalAndLog(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = JobJournal(os.path.join(self.directory.name, "test.journal.db"))
+        self.log = os.path.join(self.directory.name, "router.jsonl")
+
+    def tearDown(self):
+        self.journal.close()
+        self.directory.cleanup()
+
+    def test_from_journal_counts_history_and_load(self):
+        for i in range(4):
+            self.journal.mark_uploaded("a.mp3", i, f"chunk{i}.mp3", 30000 * (i + 1))
+            self.journal.mark_submitted("a.mp3", i, f"job-{i}")
+            self.journal.mark_downloaded("a.mp3", i, "{}")
+        self.journal.mark_uploaded("b.mp3", 0, "chunk0.mp3", 30000)
+        self.journal.mark_submitted("b.mp3", 0, "job-b")
+
+        with mock.patch.dict(os.environ, {"ROUTER_LOG": self.log}):
+            latency_router = LatencyRouter.from_journal(self.journal, quota=20, realtime_sessions=8)
+
+        self.assertEqual(latency_router.history, 4)
+        self.assertEqual(latency_router.batch_slots, 19)
+
+    def test_outcomes_correct_later_predictions(self):
+        route = LatencyRouter(CostModel(30, 0.1), history=10).route("a.mp3", TEN_MINUTES_MS)
+        router.record(route, route.batch_seconds * 2, path=self.log)
+        router.record(route, 1, error="failed", path=self.log)
+        self.assertEqual(router.corrections(self.log), {"batch": 2.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
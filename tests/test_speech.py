@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+import unittest
+
+import speech
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from fake_speech_service import FakeSpeechService  # noqa: E402
+
+AUDIO_URLS = [f"https://fake.blob.core.windows.net/audio/audio{i}.wav" for i in range(3)]
+
+
+class TestResults(unittest.TestCase):
+
+    def setUp(self):
+        self.service = FakeSpeechService(queue_delay=0, run_seconds=0.1, files_page_size=2, seed=1).start()
+        self.saved = speech.API_HOST, speech.SUBSCRIPTION_KEY, speech.LOCALE, speech.POLL_INTERVAL
+        speech.API_HOST = self.service.host
+        speech.SUBSCRIPTION_KEY = "fake"
+        speech.LOCALE = "en-US"
+        speech.POLL_INTERVAL = 0.05
+
+    def tearDown(self):
+        speech.API_HOST, speech.SUBSCRIPTION_KEY, speech.LOCALE, speech.POLL_INTERVAL = self.saved
+        self.service.stop()
+
+    def test_transcribe_returns_the_transcription_result(self):
+        callbacks = []
+        contents = speech.transcribe(AUDIO_URLS[0], callback=lambda: callbacks.append(True))
+
+        result = json.loads(contents)
+        self.assertEqual(result["source"], AUDIO_URLS[0])
+        self.assertIn("recognizedPhrases", result)
+        self.assertEqual(callbacks, [True])
+
+    def test_transcribe_all_collects_every_file(self):
+        results = list(speech.transcribe_all(AUDIO_URLS))
+
+        names = sorted(name for name, parsed in results if "recognizedPhrases" in parsed)
+        self.assertEqual(names, ["audio0.wav", "audio1.wav", "audio2.wav"])
+        # and the report of the job
+        self.assertEqual(len(results), len(AUDIO_URLS) + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
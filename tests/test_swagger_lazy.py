@@ -0,0 +1,68 @@
+import importlib
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+
+import swagger_client
+
+
+class TestLazyAttributes(unittest.TestCase):
+
+    def setUp(self):
+        # a package set up like the generated ones
+        self.directory = tempfile.TemporaryDirectory()
+        package = os.path.join(self.directory.name, "lazypkg")
+        os.makedirs(package)
+        files = {
+            "__init__.py": """
+                from swagger_client._lazy import install
+
+                _LAZY_ATTRS = {'Thing': 'lazypkg.thing'}
+
+                install(globals(), _LAZY_ATTRS)
+            """,
+            "thing.py": "class Thing:\n    pass\n",
+            "plain.py": "VALUE = 1\n",
+            "broken.py": "import lazypkg_missing_dependency\n",
+        }
+        for name, content in files.items():
+            with open(os.path.join(package, name), "w") as f:
+                f.write(textwrap.dedent(content))
+        sys.path.insert(0, self.directory.name)
+
+    def tearDown(self):
+        sys.path.remove(self.directory.name)
+        for name in [name for name in sys.modules if name.split(".")[0] == "lazypkg"]:
+            del sys.modules[name]
+        self.directory.cleanup()
+
+    def test_names_are_imported_on_first_access(self):
+        package = importlib.import_module("lazypkg")
+        self.assertEqual(package.__all__, ["Thing"])
+        self.assertIn("Thing", dir(package))
+        self.assertNotIn("lazypkg.thing", sys.modules)
+        self.assertEqual(package.Thing.__module__, "lazypkg.thing")
+        self.assertEqual(package.plain.VALUE, 1)
+
+    def test_missing_names_raise_attribute_error(self):
+        package = importlib.import_module("lazypkg")
+        with self.assertRaises(AttributeError):
+            package.Nothing
+        self.assertFalse(hasattr(package, "__wrapped__"))
+
+    def test_failing_imports_inside_a_submodule_propagate(self):
+        package = importlib.import_module("lazypkg")
+        with self.assertRaises(ModuleNotFoundError) as raised:
+            package.broken
+        self.assertEqual(raised.exception.name, "lazypkg_missing_dependency")
+
+    def test_generated_packages(self):
+        self.assertEqual(swagger_client.Transcription.__name__, "Transcription")
+        self.assertIs(swagger_client.models.Transcription, swagger_client.Transcription)
+        self.assertIn("CustomSpeechTranscriptionsApi", dir(swagger_client.api))
+
+
+if __name__ == '__main__':
+    unittest.main()
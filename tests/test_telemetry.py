@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import telemetry
+from telemetry import Tracer
+
+
+class TestPrometheus(unittest.TestCase):
+
+    def test_counters_and_stages(self):
+        tracer = Tracer()
+        tracer.count("api_calls", 1, {"op": "submit"})
+        tracer.count("api_calls", 2, {"op": "poll"})
+        tracer.count("api_calls", 1, {"op": "poll"})
+        tracer.count("bytes_uploaded", 4096, {})
+        tracer.finish("upload", 10.0, 10.5, {})
+        tracer.finish("upload", 20.0, 20.25, {})
+        tracer.finish("decode", 0.0, 2.0, {})
+
+        self.assertEqual(tracer.prometheus().splitlines(), [
+            "# TYPE speech_api_calls_total counter",
+            'speech_api_calls_total{op="poll"} 3',
+            'speech_api_calls_total{op="submit"} 1',
+            "# TYPE speech_bytes_uploaded_total counter",
+            "speech_bytes_uploaded_total 4096",
+            "# TYPE speech_stage_seconds summary",
+            'speech_stage_seconds_sum{stage="decode"} 2.000000',
+            'speech_stage_seconds_count{stage="decode"} 1',
+            'speech_stage_seconds_sum{stage="upload"} 0.750000',
+            'speech_stage_seconds_count{stage="upload"} 2',
+        ])
+
+    def test_labels_are_sorted(self):
+        tracer = Tracer()
+        tracer.count("retries", 1, {"status": "429", "op": "submit"})
+        tracer.count("retries", 1, {"op": "submit", "status": "429"})
+        self.assertIn('speech_retries_total{op="submit",status="429"} 2', tracer.prometheus())
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.trace_path = os.path.join(self.directory.name, "trace.jsonl")
+        self.metrics_path = os.path.join(self.directory.name, "metrics.prom")
+        patcher = mock.patch.object(telemetry, "_tracer", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        if telemetry._tracer is not None and telemetry._tracer._file:
+            telemetry._tracer._file.close()
+        self.directory.cleanup()
+
+    def test_nothing_is_recorded_until_configured(self):
+        with mock.patch.dict(os.environ, {"TRACE_FILE": "", "METRICS_FILE": ""}):
+            self.assertFalse(telemetry.configure())
+        with telemetry.span("upload") as span:
+            span.set(chunk=0)
+        telemetry.count("api_calls")
+        telemetry.export()
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_spans_and_metrics_are_written(self):
+        self.assertTrue(telemetry.configure(self.trace_path, self.metrics_path))
+        with telemetry.span("job", file="a.mp3"):
+            with telemetry.span("upload", chunk=0) as span:
+                span.set(bytes=1024)
+        telemetry.record_span("queue", 100.0, 103.0, chunk=0)
+        telemetry.count("api_calls", op="submit")
+        telemetry.export()
+
+        with open(self.trace_path, encoding="utf8") as f:
+            upload, job, queue = [json.loads(line) for line in f]
+        self.assertEqual((upload["name"], upload["chunk"], upload["bytes"]), ("upload", 0, 1024))
+        self.assertEqual(upload["parent"], job["id"])
+        self.assertIsNone(job["parent"])
+        self.assertEqual((queue["name"], queue["seconds"]), ("queue", 3.0))
+
+        with open(self.metrics_path, encoding="utf8") as f:
+            metrics = f.read()
+        self.assertIn('speech_api_calls_total{op="submit"} 1', metrics)
+        self.assertIn('speech_stage_seconds_count{stage="upload"} 1', metrics)
+        self.assertIn('speech_stage_seconds_sum{stage="queue"} 3.000000', metrics)
+
+    def test_failed_span_records_the_error(self):
+        telemetry.configure(self.trace_path)
+        with self.assertRaises(ValueError):
+            with telemetry.span("parse"):
+                raise ValueError("bad json")
+        telemetry.export()
+        with open(self.trace_path, encoding="utf8") as f:
+            self.assertEqual(json.loads(f.readline())["error"], "ValueError")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import tuning
+from tuning import PoolSizes, auto_tune
+
+
+class TestAutoTune(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(os, "cpu_count", return_value=8)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_long_recording_uses_every_cpu_and_the_quota(self):
+        # one hour in 60 chunks takes 72 s to encode at the default rate
+        sizes = auto_tune([60000] * 60, quota=20)
+        self.assertEqual(sizes, PoolSizes(encode_workers=8, transcribe_workers=20, upload_slots=7,
+                                          connection_pool_maxsize=20))
+
+    def test_short_recording_starts_few_workers(self):
+        # 6 s of encoding, so starting more than 20 workers would not pay off, nor more than chunks
+        self.assertEqual(auto_tune([60000] * 5, quota=20).encode_workers, 5)
+        # 0.24 s of encoding is not worth a second worker
+        sizes = auto_tune([12000], quota=20)
+        self.assertEqual((sizes.encode_workers, sizes.transcribe_workers, sizes.upload_slots), (1, 1, 1))
+
+    def test_measured_rates(self):
+        sizes = auto_tune([60000] * 60, encode_seconds_per_audio_second=0.001, upload_mbps=16, quota=20)
+        # 3.6 s of encoding, so at most 12 worker starts pay off
+        self.assertEqual(sizes.encode_workers, 8)
+        self.assertEqual(sizes.upload_slots, 2)
+
+    def test_quota_from_the_environment(self):
+        with mock.patch.dict(os.environ, {"SPEECH_CONCURRENCY_QUOTA": "3"}):
+            sizes = auto_tune([60000] * 60)
+        self.assertEqual((sizes.transcribe_workers, sizes.upload_slots, sizes.connection_pool_maxsize), (3, 3, 3))
+
+    def test_no_chunks(self):
+        self.assertEqual(auto_tune([], quota=20), PoolSizes(1, 1, 1, 1))
+
+    def test_record_writes_sizes_and_inputs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "a.mp3.tuning.json")
+            tuning.record(auto_tune([60000], quota=20), path, chunks=1, quota=20)
+            with open(path, encoding="utf8") as f:
+                recorded = json.load(f)
+        self.assertEqual(recorded["sizes"]["transcribe_workers"], 1)
+        self.assertEqual(recorded["inputs"], {"chunks": 1, "quota": 20})
+
+
+class TestCalibrateUpload(unittest.TestCase):
+
+    def test_cleanup_runs_after_a_failed_upload(self):
+        cleaned = []
+
+        def upload(data):
+            raise OSError("network down")
+
+        with self.assertRaises(OSError):
+            tuning.calibrate_upload(upload, size=1024, cleanup=lambda: cleaned.append(True))
+        self.assertEqual(cleaned, [True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+
+import vad
+from tests.audio import bursts, noise, segment, silence, tone
+
+
+class TestSpeechSpans(unittest.TestCase):
+
+    def test_steady_tone_is_kept(self):
+        # no quiet stretch, so the noise floor estimate is the signal itself
+        audio = segment(tone(60))
+        self.assertEqual(vad.speech_spans(audio), [(0, 60000)])
+
+    def test_digital_silence_has_no_spans(self):
+        self.assertEqual(vad.speech_spans(segment(silence(5))), [])
+
+    def test_noise_only_is_not_trimmed_to_nothing(self):
+        spans = vad.speech_spans(segment(noise(5)))
+        self.assertTrue(spans)
+        self.assertGreater(sum(end - start for start, end in spans), 0)
+
+    def test_speech_between_silences(self):
+        samples = np.concatenate((silence(10), tone(10), silence(10))) + noise(30, amplitude=0.001)
+        spans = vad.speech_spans(segment(samples))
+        self.assertEqual(len(spans), 1)
+        start, end = spans[0]
+        self.assertAlmostEqual(start, 10000, delta=300)
+        self.assertAlmostEqual(end, 20000, delta=300)
+
+    def test_short_gaps_are_bridged(self):
+        spans = vad.speech_spans(segment(bursts(3, 1.0, 0.3)), min_silence_ms=700)
+        self.assertEqual(len(spans), 1)
+
+    def test_empty_segment(self):
+        self.assertEqual(vad.speech_spans(segment(silence(0))), [])
+
+
+class TestTrim(unittest.TestCase):
+
+    def test_silence_is_passed_through(self):
+        audio = segment(silence(5))
+        trimmed, _ = vad.trim(audio)
+        self.assertEqual(len(trimmed), len(audio))
+
+    def test_offsets_map_back_to_the_original(self):
+        samples = np.concatenate((silence(10), tone(5), silence(10), tone(5)))
+        trimmed, offset_map = vad.trim(segment(samples))
+        self.assertLess(len(trimmed), 15000)
+        # the start of the second burst in the trimmed audio
+        second = offset_map.trimmed_starts[1]
+        self.assertAlmostEqual(offset_map.to_original(second + 1000), 26000, delta=300)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Pool sizes for the encode and transcribe stages of `cli_multiproc`.
+
+Without auto-tuning the historical fixed sizes are used. With AUTO_TUNE=1 they are derived
+from the CPU count, the encode throughput, the upload bandwidth and the service concurrency
+quota; AUTO_TUNE_CALIBRATE=1 measures encode throughput and bandwidth with a short
+calibration run instead of assuming them. The chosen values and their inputs are logged and
+written next to the output.
+"""
+import json
+import logging
+import math
+import os
+import time
+from collections import namedtuple
+
+PoolSizes = namedtuple("PoolSizes", ["encode_workers", "transcribe_workers", "upload_slots", "connection_pool_maxsize"])
+
+DEFAULT_SIZES = PoolSizes(encode_workers=4, transcribe_workers=5, upload_slots=5, connection_pool_maxsize=5)
+
+# assumptions used when nothing was measured
+DEFAULT_ENCODE_SECONDS_PER_AUDIO_SECOND = 0.02
+DEFAULT_UPLOAD_MBPS = 50.0
+# bandwidth a single upload stream can use before more streams stop helping
+PER_STREAM_MBPS = 8.0
+# spawning and importing one encoder process costs roughly this much
+WORKER_START_SECONDS = 0.3
+
+
+def enabled():
+    return os.getenv("AUTO_TUNE", "").strip().lower() in ("1", "true", "yes")
+
+
+def calibration_enabled():
+    return os.getenv("AUTO_TUNE_CALIBRATE", "").strip().lower() in ("1", "true", "yes")
+
+
+def service_quota():
+    """
+    Number of transcriptions that may run at once on the speech resource.
+    """
+    return int(os.getenv("SPEECH_CONCURRENCY_QUOTA", "20"))
+
+
+def transcribe_workers():
+    """
+    Transcriptions in flight during a run: the service quota when AUTO_TUNE sizes the pools
+    (`auto_tune` caps it at one per chunk), the default pool size otherwise.
+    """
+    return service_quota() if enabled() else DEFAULT_SIZES.transcribe_workers
+
+
+def calibrate_encode(sample_chunk, encode):
+    """
+    Encode seconds per audio second, measured by running `encode(sample_chunk)` in-process.
+    """
+    start_time = time.perf_counter()
+    encode(sample_chunk)
+    return (time.perf_counter() - start_time) / max(0.001, len(sample_chunk) / 1000)
+
+
+def calibrate_upload(upload, size=1024 * 1024, cleanup=None):
+    """
+    Upload bandwidth in Mbps, measured by timing `upload(data)` of `size` random bytes.
+    `cleanup()` is called afterwards, also on failure, to remove the probe upload.
+    """
+    data = os.urandom(size)
+    try:
+        start_time = time.perf_counter()
+        upload(data)
+        return size * 8 / 1000000 / max(0.001, time.perf_counter() - start_time)
+    finally:
+        if cleanup:
+            cleanup()
+
+
+def auto_tune(durations_ms, encode_seconds_per_audio_second=None, upload_mbps=None, quota=None):
+    """
+    Derive pool sizes for chunks of `durations_ms`.
+
+    Encoding is CPU bound, so it never uses more workers than CPUs or chunks, and no more than
+    it takes to amortize the start-up of each worker process. Transcription threads mostly wait
+    on the service and are limited by the concurrency quota; concurrent uploads are limited to
+    what the bandwidth can feed.
+    """
+    cpu = os.cpu_count() or 1
+    chunks = max(1, len(durations_ms))
+    encode_rate = encode_seconds_per_audio_second or DEFAULT_ENCODE_SECONDS_PER_AUDIO_SECOND
+    upload_mbps = upload_mbps or DEFAULT_UPLOAD_MBPS
+    quota = quota or service_quota()
+
+    encode_seconds = encode_rate * sum(durations_ms) / 1000
+    encode_workers = max(1, min(cpu, chunks, math.ceil(encode_seconds / WORKER_START_SECONDS)))
+    transcribe_workers = max(1, min(chunks, quota))
+    upload_slots = max(1, min(transcribe_workers, math.ceil(upload_mbps / PER_STREAM_MBPS)))
+
+    return PoolSizes(encode_workers, transcribe_workers, upload_slots, transcribe_workers)
+
+
+def record(sizes, path, **inputs):
+    """
+    Log the chosen sizes and write them with their `inputs` to `path` as JSON.
+    """
+    logging.info(f"Pool sizes: {dict(sizes._asdict())} from {inputs}")
+    with open(path, "w", encoding="utf8") as f:
+        json.dump({"sizes": sizes._asdict(), "inputs": inputs, "time": time.time()}, f, indent=2)
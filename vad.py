@@ -0,0 +1,158 @@
+"""
+Voice-activity trimming before submission.
+
+Non-speech spans (long silences, noise) are found with vectorized frame energy and
+zero-crossing statistics and cut out of the audio, so less audio is uploaded and billed.
+`OffsetMap` translates offsets in the trimmed audio back to the original timeline, and
+`remap_result` applies it to a batch transcription result.
+
+Enabled with VAD_TRIM=1.
+"""
+import bisect
+import os
+import numpy as np
+
+# one millisecond in the 100 ns ticks used by the transcription results
+TICKS_PER_MS = 10000
+
+
+def enabled():
+    return os.getenv("VAD_TRIM", "").strip().lower() in ("1", "true", "yes")
+
+
+def _frames(segment, frame_ms):
+    samples = np.asarray(segment.get_array_of_samples(), dtype=np.float32)
+    if segment.channels > 1:
+        samples = samples.reshape(-1, segment.channels).mean(axis=1)
+    samples /= float(1 << (8 * segment.sample_width - 1))
+
+    frame_len = max(1, int(segment.frame_rate * frame_ms / 1000))
+    count = len(samples) // frame_len
+    return samples[:count * frame_len].reshape(count, frame_len)
+
+
+def _energy_db(frames):
+    return 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10)
+
+
+def frame_energy_db(segment, frame_ms=30):
+    """
+    Energy in dBFS of each `frame_ms` frame of `segment`.
+    """
+    return _energy_db(_frames(segment, frame_ms))
+
+
+def speech_frames(segment, frame_ms=30, energy_margin_db=12, min_energy_db=-50, max_energy_db=-30,
+                  max_zcr=0.35):
+    """
+    Classify each `frame_ms` frame of `segment` as speech (True) or not.
+
+    A frame is speech when its energy is `energy_margin_db` above the estimated noise floor and
+    its zero-crossing rate is below `max_zcr`, which filters out broadband noise. Frames far
+    above the threshold count as speech regardless of their zero-crossing rate. The threshold
+    stays between `min_energy_db` and `max_energy_db`, a normal speech level, so audio without
+    quiet stretches, whose "noise floor" is the signal itself, is not classified as silence.
+    """
+    frames = _frames(segment, frame_ms)
+    if len(frames) == 0:
+        return np.zeros(0, dtype=bool)
+
+    energy_db = _energy_db(frames)
+    noise_floor = np.percentile(energy_db, 10)
+    threshold = min(max(noise_floor + energy_margin_db, min_energy_db), max_energy_db)
+
+    signs = np.signbit(frames)
+    zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+    return ((energy_db > threshold) & (zcr < max_zcr)) | (energy_db > threshold + 10)
+
+
+def speech_spans(segment, frame_ms=30, padding_ms=200, min_silence_ms=700, min_speech_ms=250, **kwargs):
+    """
+    Return the (start_ms, end_ms) spans of `segment` that contain speech. Spans are padded by
+    `padding_ms`, gaps shorter than `min_silence_ms` are bridged and spans shorter than
+    `min_speech_ms` are dropped. Audio that is not silent always keeps at least one span: when
+    nothing passes as speech, the whole of it is returned rather than nothing.
+    """
+    is_speech = speech_frames(segment, frame_ms, **kwargs)
+    edges = np.diff(np.concatenate(([0], is_speech.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1) * frame_ms
+    ends = np.flatnonzero(edges == -1) * frame_ms
+
+    spans = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        start, end = max(0, start - padding_ms), min(len(segment), end + padding_ms)
+        if spans and start - spans[-1][1] < min_silence_ms:
+            spans[-1][1] = end
+        else:
+            spans.append([start, end])
+    spans = [(start, end) for start, end in spans if end - start >= min_speech_ms]
+    if not spans and len(segment) and segment.max > 0:
+        return [(0, len(segment))]
+    return spans
+
+
+class OffsetMap:
+    """
+    Maps offsets in trimmed audio back to the original timeline.
+    """
+
+    def __init__(self, spans):
+        # start of every kept span in the trimmed and in the original audio
+        self.trimmed_starts = []
+        self.original_starts = []
+        position = 0
+        for start, end in spans:
+            self.trimmed_starts.append(position)
+            self.original_starts.append(start)
+            position += end - start
+        self.trimmed_length = position
+
+    def to_original(self, ms):
+        index = bisect.bisect_right(self.trimmed_starts, ms) - 1
+        if index < 0:
+            return ms
+        return self.original_starts[index] + ms - self.trimmed_starts[index]
+
+
+def trim(segment, **kwargs):
+    """
+    Cut the non-speech spans out of `segment`. Returns the trimmed segment and its `OffsetMap`.
+    Digital silence is returned as it is, so an empty recording is never passed on.
+    """
+    spans = speech_spans(segment, **kwargs) or [(0, len(segment))]
+    trimmed = segment._spawn(b"".join(segment[start:end].raw_data for start, end in spans))
+    return trimmed, OffsetMap(spans)
+
+
+def _format_duration(ticks):
+    seconds = ticks / 10000000
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    text = "PT"
+    if hours:
+        text += f"{int(hours)}H"
+    if minutes:
+        text += f"{int(minutes)}M"
+    return text + f"{round(seconds, 2):g}S"
+
+
+def _remap_item(item, offset_map):
+    if "offsetInTicks" not in item:
+        return
+    ticks = offset_map.to_original(item["offsetInTicks"] / TICKS_PER_MS) * TICKS_PER_MS
+    item["offsetInTicks"] = float(ticks)
+    item["offset"] = _format_duration(ticks)
+
+
+def remap_result(results, offset_map):
+    """
+    Translate the phrase and word offsets of a parsed transcription result to the original
+    timeline, in place.
+    """
+    for phrase in results.get("recognizedPhrases", []):
+        _remap_item(phrase, offset_map)
+        for best in phrase.get("nBest", []):
+            for word in best.get("words", []) + best.get("displayWords", []):
+                _remap_item(word, offset_map)
+    return results
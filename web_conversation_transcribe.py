@@ -38,6 +38,8 @@ except ImportError:
     import sys
     sys.exit(1)
 
+from audio_streams import AudioReaderCallback
+
 # Set up the subscription info for the Speech Service:
 # Replace with your own subscription key and service region (e.g., "centralus").
 # See the limitations in supported regions,
@@ -54,35 +56,10 @@ st.set_page_config(page_title="Azure Speech to Text")
 st.header("Azure Speech to Text (Batch)")
 
 
-class BinaryFileReaderCallback(speechsdk.audio.PullAudioInputStreamCallback):
-    def __init__(self, filename: str):
-        super().__init__()
-        self._file_h = open(filename, "rb")
-
-    def read(self, buffer: memoryview) -> int:
-        try:
-            size = buffer.nbytes
-            frames = self._file_h.read(size)
-            buffer[:len(frames)] = frames
-
-            return len(frames)
-        except Exception as ex:
-            logging.info('Exception in `read`: {}'.format(ex))
-            raise
-
-    def close(self) -> None:
-        logging.info('closing file')
-        try:
-            self._file_h.close()
-        except Exception as ex:
-            logging.info('Exception in `close`: {}'.format(ex))
-            raise
-
-
 def compressed_stream_helper(compressed_format,
                              mp3_file_path,
                              default_speech_auth):
-    callback = BinaryFileReaderCallback(mp3_file_path)
+    callback = AudioReaderCallback(mp3_file_path)
     stream = speechsdk.audio.PullAudioInputStream(
         stream_format=compressed_format, pull_stream_callback=callback)
 
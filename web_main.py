@@ -2,6 +2,7 @@ import json
 import os
 import streamlit as st
 import speech
+import preprocess
 from os import path
 from dotenv import load_dotenv
 from azure.storage.blob import BlobServiceClient
@@ -56,8 +57,13 @@ def main():
     if mp3file is not None:
         filename = mp3file.name
 
+        codec = preprocess.enabled_codec()
         with mp3file as audio:
-            audio_data = audio.read()
+            if codec:
+                audio_data, extension = preprocess.preprocess_file(audio, codec)
+                filename = path.splitext(filename)[0] + extension
+            else:
+                audio_data = audio.read()
             upload_audio_file(audio_data, filename)
 
         primary_endpoint = f"https://{blob_service_client.account_name}.blob.core.windows.net"